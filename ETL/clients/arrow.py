@@ -0,0 +1,68 @@
+import logging
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+logger = logging.getLogger(__name__)
+
+
+def cast_columns(table, types):
+    """
+    Cast Arrow table columns to the requested types.
+
+    Numeric strings (BigQuery autodetect stores some columns as STRING) are
+    parsed at the Arrow level. Values that cannot be parsed become null, which
+    mirrors pd.to_numeric(errors='coerce'); non-integral values headed for an
+    integer column (e.g. '4.5') are rounded rather than failing the query.
+
+    Parameters:
+    -----------
+    table : pa.Table
+        Table returned by a query
+    types : dict
+        Mapping of column name -> pyarrow DataType. Missing columns are ignored.
+
+    Returns:
+    --------
+    pa.Table
+        Table with the requested columns cast
+    """
+    if not types:
+        return table
+
+    for name, target_type in types.items():
+        index = table.schema.get_field_index(name)
+        if index < 0:
+            continue
+
+        column = table.column(index)
+        if column.type == target_type:
+            continue
+
+        try:
+            casted = pc.cast(column, target_type)
+        except (pa.ArrowInvalid, pa.ArrowNotImplementedError):
+            # Fall back to a coercing parse for the odd non-numeric value
+            logger.debug(f"Strict cast failed for column {name}, coercing invalid values to null")
+            coerced = pd.to_numeric(column.to_pandas(), errors='coerce')
+            if pa.types.is_integer(target_type):
+                coerced = coerced.astype('float64').round()
+                coerced = coerced.where(np.isfinite(coerced))
+            casted = pa.chunked_array([pa.array(coerced, type=target_type, from_pandas=True)])
+
+        table = table.set_column(index, pa.field(name, target_type), casted)
+
+    return table
+
+
+def to_dataframe(table):
+    """
+    Materialize an Arrow table as a pandas DataFrame.
+
+    Uses split blocks so numeric columns without nulls are handed to pandas
+    zero-copy, and self_destruct so Arrow buffers are released column by column
+    instead of holding both copies at peak. The table must not be used afterwards.
+    """
+    return table.to_pandas(split_blocks=True, self_destruct=True)
@@ -1,4 +1,5 @@
 import pandas as pd
+import pyarrow as pa
 from google.oauth2 import service_account
 from google.cloud import bigquery
 import numpy as np
@@ -8,19 +9,79 @@ import json
 from datetime import datetime, date
 import re
 import gc
+import threading
 import weakref
+from concurrent.futures import TimeoutError as FutureTimeoutError
 from contextlib import contextmanager
 
+from ETL import tracing
+from ETL.clients.arrow import cast_columns, to_dataframe
+from ETL.storage.cost import ByteBudgetExceeded
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
 )
 
+# Forced collections by call site: how many ran and how long they took
+_gc_stats = {}
+_gc_lock = threading.Lock()
+
+
+def _forced_gc(site):
+    """gc.collect(), timed and counted under `site`; runs also record it as a 'forced_gc' span"""
+    started = time.perf_counter()
+    gc.collect()
+    seconds = time.perf_counter() - started
+    with _gc_lock:
+        stats = _gc_stats.setdefault(site, {'calls': 0, 'seconds': 0.0})
+        stats['calls'] += 1
+        stats['seconds'] += seconds
+    tracing.record('forced_gc', seconds, site=site)
+
+
+def forced_gc_stats():
+    """Calls and seconds of the client's forced gc.collect() per call site, since process start"""
+    with _gc_lock:
+        return {site: {'calls': stats['calls'], 'seconds': round(stats['seconds'], 4)}
+                for site, stats in _gc_stats.items()}
+
+
+# Legacy type names reported by table schemas -> their standard SQL spelling
+_STANDARD_SQL_TYPES = {'INTEGER': 'INT64', 'FLOAT': 'FLOAT64', 'BOOLEAN': 'BOOL', 'RECORD': 'STRUCT'}
+
+
+def merge_query(target, staging, key, columns, column_types):
+    """
+    MERGE statement updating `columns` of `target` rows from `staging` on `key`
+    
+    Each staged value is SAFE_CAST to the target column's type (`column_types`,
+    as reported by the table schema), and null or uncastable values keep the
+    target's existing value.
+    """
+    assignments = ', '.join(
+        f"{col} = COALESCE(SAFE_CAST(S.{col} AS "
+        f"{_STANDARD_SQL_TYPES.get(column_types[col], column_types[col])}), T.{col})"
+        for col in columns
+    )
+    return f"""
+    MERGE `{target}` T
+    USING `{staging}` S
+    ON T.{key} = S.{key}
+    WHEN MATCHED THEN UPDATE SET {assignments}
+    """
+
+
 class Client:
-    def __init__(self, credentials_json, project_id):
+    def __init__(self, credentials_json, project_id, ledger=None):
         """
         Initialize the BigQuery API with memory management
+        
+        Args:
+            credentials_json: Service account info dict
+            project_id: GCP project ID
+            ledger: Optional QueryLedger that receives per-query cost statistics
         """
         self.logger = logging.getLogger(self.__class__.__name__)
         self.logger.debug("Initializing BigQuery API")
@@ -29,6 +90,16 @@ class Client:
         self.project_id = project_id
         self.client = self._build_client()
         self.batch_size = 10000
+        self.ledger = ledger
+        
+        # Server-side timeout applied to query jobs (None = no limit)
+        self.job_timeout_ms = None
+        
+        # Queries may be issued from several threads; the health check and
+        # client refresh are serialized and a passing check is reused briefly
+        self._client_lock = threading.Lock()
+        self._healthy_until = 0.0
+        self.health_check_ttl = 30
         
         # Track active jobs for cleanup - USE WEAKREFS TO PREVENT REFERENCE CYCLES
         self._active_jobs = weakref.WeakSet()
@@ -43,19 +114,57 @@ class Client:
             self.credentials_json,
             scopes=['https://www.googleapis.com/auth/bigquery']
         )
+        self.credentials = credentials
         
         client = bigquery.Client(project=self.project_id, credentials=credentials)
         self.logger.debug("BigQuery client built successfully")
         return client
     
+    def estimate_query_bytes(self, query):
+        """Dry-run a query and return the bytes it would process"""
+        job_config = bigquery.QueryJobConfig(dry_run=True, use_query_cache=False)
+        job = self.client.query(query, job_config=job_config)
+        return job.total_bytes_processed
+    
+    def _record_job_stats(self, query_name, job, estimated_bytes, wall_seconds):
+        """Record cost statistics of a finished query job in the ledger"""
+        try:
+            self.ledger.record(
+                query_name,
+                estimated_bytes=estimated_bytes,
+                bytes_processed=job.total_bytes_processed,
+                bytes_billed=job.total_bytes_billed,
+                slot_ms=job.slot_millis,
+                cache_hit=job.cache_hit,
+                wall_seconds=wall_seconds
+            )
+        except Exception as e:
+            self.logger.warning(f"Failed to record stats for query '{query_name}': {e}")
+    
     @contextmanager
-    def _managed_query_job(self, query, job_config=None):
-        """Context manager for query jobs with automatic cleanup"""
+    def _managed_query_job(self, query, job_config=None, query_name=None, track_cost=True):
+        """
+        Context manager for query jobs with automatic cleanup
+        
+        When a ledger is attached the query is checked against the byte budget
+        (dry run) before it is submitted, and its cost statistics are recorded
+        once the caller is done with the job.
+        """
         job = None
+        ledger = self.ledger if track_cost else None
         try:
+            estimated_bytes = None
+            if ledger is not None and ledger.dry_run:
+                estimated_bytes = self.estimate_query_bytes(query)
+                ledger.check(query_name, estimated_bytes)
+            
+            started = time.monotonic()
             job = self.client.query(query, job_config=job_config)
             self._active_jobs.add(job)  # Track with weak reference
             yield job
+            
+            if ledger is not None:
+                self._record_job_stats(query_name, job, estimated_bytes, time.monotonic() - started)
         finally:
             # EXPLICIT CLEANUP
             if job:
@@ -70,7 +179,7 @@ class Client:
                 job = None
             
             # Force garbage collection
-            gc.collect()
+            _forced_gc('query_job')
     
     @contextmanager
     def _managed_load_job(self, table_ref, job_config=None):
@@ -98,7 +207,20 @@ class Client:
                 job = None
             
             # Force garbage collection
-            gc.collect()
+            _forced_gc('load_job')
+    
+    def _wait(self, job):
+        """
+        Wait for a job's result, bounded by job_timeout_ms
+        
+        A job still running when the timeout passes raises TimeoutError; the
+        enclosing _managed_query_job then cancels it server-side.
+        """
+        timeout = self.job_timeout_ms / 1000 if self.job_timeout_ms else None
+        try:
+            return job.result(timeout=timeout)
+        except FutureTimeoutError as e:
+            raise TimeoutError(f"BigQuery job {job.job_id} timed out after {timeout}s") from e
     
     def _cleanup_jobs(self):
         """Manually cleanup any remaining job references"""
@@ -109,15 +231,16 @@ class Client:
                 self.logger.warning(f"Found {active_count} active jobs during cleanup")
             
             # Force garbage collection
-            gc.collect()
+            _forced_gc('cleanup')
             
         except Exception as e:
             self.logger.warning(f"Error during job cleanup: {e}")
     
     def __del__(self):
-        """Cleanup on destruction"""
+        """Close the client on destruction"""
+        # No forced collection here: at interpreter exit the module globals it
+        # uses may already be torn down, and the process is freeing everything anyway
         try:
-            self._cleanup_jobs()
             if hasattr(self, 'client'):
                 self.client.close()
         except Exception:
@@ -127,7 +250,7 @@ class Client:
         """Check if the BigQuery client connection is still healthy"""
         try:
             test_query = "SELECT 1 as test_connection"
-            with self._managed_query_job(test_query) as job:
+            with self._managed_query_job(test_query, track_cost=False) as job:
                 job.result(timeout=5)
                 return True
         except Exception as e:
@@ -154,10 +277,23 @@ class Client:
 
     def get_healthy_client(self):
         """Get a healthy BigQuery client, refreshing if necessary"""
-        if not self._is_client_healthy():
-            self.logger.info("Client unhealthy, refreshing connection")
-            self._refresh_client()
-        return self.client
+        with self._client_lock:
+            if time.monotonic() < self._healthy_until:
+                return self.client
+            
+            if not self._is_client_healthy():
+                self.logger.info("Client unhealthy, refreshing connection")
+                self._refresh_client()
+            
+            self._healthy_until = time.monotonic() + self.health_check_ttl
+            return self.client
+    
+    def _query_job_config(self):
+        """Job config shared by result-returning queries"""
+        job_config = bigquery.QueryJobConfig(use_query_cache=True)
+        if self.job_timeout_ms:
+            job_config.job_timeout_ms = self.job_timeout_ms
+        return job_config
     
     def _sanitize_dataframe(self, df):
         """Sanitize entire dataframe for BigQuery upload"""
@@ -261,7 +397,7 @@ class Client:
                 
                 # Clean up chunk
                 del chunk
-                gc.collect()
+                _forced_gc('append_chunk')
             
             self.logger.info(f"Append operation completed. Total rows appended: {rows_processed}")
             
@@ -272,7 +408,7 @@ class Client:
             # Clean up
             if 'df_clean' in locals():
                 del df_clean
-            gc.collect()
+            _forced_gc('append')
     
     def replace(self, dataframe, dataset_id, table_id, chunk_size=None, max_retries=3):
         """
@@ -356,7 +492,7 @@ class Client:
                 
                 # Clean up chunk
                 del chunk
-                gc.collect()
+                _forced_gc('replace_chunk')
             
             self.logger.info(f"Replace operation completed. Total rows in new table: {rows_processed}")
             
@@ -367,44 +503,149 @@ class Client:
             # Clean up
             if 'df_clean' in locals():
                 del df_clean
-            gc.collect()
+            _forced_gc('replace')
+    
+    def merge_update(self, dataframe, dataset_id, table_id, key, columns, query_name=None):
+        """
+        Update columns of existing rows from a DataFrame with a single MERGE
+        
+        The DataFrame is loaded into a staging table (`<table_id>_staging`,
+        dropped once the MERGE finishes) and merged into the target on `key`.
+        Rows whose key isn't in the target are ignored, every target row sharing
+        a key is updated, and null staged values leave the target value unchanged.
+        Staged values are cast to the target columns' own types, so legacy tables
+        whose counts were stored as STRING merge as cleanly as INT64 ones.
+        
+        Args:
+            dataframe: pandas DataFrame with the key and update columns, one row per key
+            dataset_id: BigQuery dataset ID
+            table_id: BigQuery table ID to update
+            key: Column joining staging rows to target rows
+            columns: Columns to overwrite in matched rows
+            query_name: Name used to tag the MERGE's cost statistics
+            
+        Returns:
+            Number of target rows updated
+        """
+        staging_table_id = f"{table_id}_staging"
+        target = f"{self.project_id}.{dataset_id}.{table_id}"
+        staging = f"{self.project_id}.{dataset_id}.{staging_table_id}"
+        
+        client = self.get_healthy_client()
+        column_types = {field.name: field.field_type for field in client.get_table(target).schema}
+        
+        try:
+            self.replace(dataframe[[key] + list(columns)], dataset_id, staging_table_id)
+            
+            job_config = bigquery.QueryJobConfig()
+            if self.job_timeout_ms:
+                job_config.job_timeout_ms = self.job_timeout_ms
+            
+            query = merge_query(target, staging, key, columns, column_types)
+            with self._managed_query_job(query, job_config=job_config, query_name=query_name) as job:
+                self._wait(job)
+                updated = job.num_dml_affected_rows or 0
+        finally:
+            try:
+                self.client.delete_table(staging, not_found_ok=True)
+            except Exception as e:
+                self.logger.warning(f"Could not drop staging table {staging_table_id}: {e}")
+        
+        self.logger.info(f"Merged {len(dataframe)} rows into {table_id}, updated {updated}")
+        return updated
+    
+    def _build_bqstorage_client(self):
+        """Build a BigQuery Storage read client, or None if the package is unavailable"""
+        try:
+            from google.cloud import bigquery_storage
+        except ImportError:
+            self.logger.debug("google-cloud-bigquery-storage not installed, using REST pagination")
+            return None
+        
+        return bigquery_storage.BigQueryReadClient(credentials=self.credentials)
     
-    def execute_query(self, query, use_storage_api=True):
-        """Execute query with proper memory management"""
+    def execute_query_arrow(self, query, types=None, use_storage_api=True, query_name=None):
+        """
+        Execute query and return results as a pyarrow Table
+        
+        Args:
+            query: SQL query string
+            types: Optional mapping of column name -> pyarrow DataType applied at the Arrow level
+            use_storage_api: Download results through the BigQuery Storage read API
+            query_name: Name used to tag the query's cost statistics
+            
+        Returns:
+            pyarrow Table with typed columns
+        """
         try:
             # Ensure we have a healthy client
-            client = self.get_healthy_client()
+            self.get_healthy_client()
             
-            job_config = bigquery.QueryJobConfig(use_query_cache=True)
+            job_config = self._query_job_config()
             
-            # Use context manager for automatic cleanup
-            with self._managed_query_job(query, job_config) as query_job:
+            with self._managed_query_job(query, job_config, query_name=query_name) as query_job:
+                self._wait(query_job)
                 
                 if use_storage_api:
                     try:
-                        df = query_job.to_dataframe(create_bqstorage_client=True)
+                        table = query_job.to_arrow(create_bqstorage_client=True)
                     except Exception as e:
                         self.logger.warning(f"Storage API failed, using standard API: {e}")
-                        df = query_job.to_dataframe()
+                        table = query_job.to_arrow(create_bqstorage_client=False)
                 else:
-                    df = query_job.to_dataframe()
-                
-                # IMPORTANT: Make a copy to break references to the job
-                df_copy = df.copy()
+                    table = query_job.to_arrow(create_bqstorage_client=False)
                 
-                # Clear original dataframe reference
-                del df
-                
-                return df_copy
+                # Arrow buffers are owned by the table, not the job, so no copy is needed
+                table = cast_columns(table, types)
+                self.logger.debug(f"Query returned {table.num_rows} rows ({table.nbytes} bytes)")
+                return table
                 
+        except ByteBudgetExceeded:
+            raise
         except Exception as e:
             self.logger.error(f"Error executing query: {str(e)}")
             raise
-        finally:
-            # Force cleanup
-            gc.collect()
     
-    def read(self, dataset_id, table_id, query=None, limit=None, use_db_dtypes=True):
+    def iter_query_batches(self, query, types=None, use_storage_api=True, query_name=None):
+        """
+        Execute query and stream results as pyarrow RecordBatches
+        
+        Batches are read one at a time from the storage read path so only a single
+        batch is resident in memory while the caller processes it.
+        
+        Args:
+            query: SQL query string
+            types: Optional mapping of column name -> pyarrow DataType applied per batch
+            use_storage_api: Stream results through the BigQuery Storage read API
+            query_name: Name used to tag the query's cost statistics
+            
+        Yields:
+            pyarrow RecordBatch
+        """
+        # Ensure we have a healthy client
+        self.get_healthy_client()
+        job_config = self._query_job_config()
+        
+        with self._managed_query_job(query, job_config, query_name=query_name) as query_job:
+            rows = self._wait(query_job)
+            bqstorage_client = self._build_bqstorage_client() if use_storage_api else None
+            
+            for batch in rows.to_arrow_iterable(bqstorage_client=bqstorage_client):
+                if types:
+                    table = cast_columns(pa.Table.from_batches([batch]), types)
+                    for typed_batch in table.to_batches():
+                        yield typed_batch
+                else:
+                    yield batch
+    
+    def execute_query(self, query, use_storage_api=True, types=None, query_name=None):
+        """Execute query and return results as a pandas DataFrame"""
+        table = self.execute_query_arrow(
+            query, types=types, use_storage_api=use_storage_api, query_name=query_name
+        )
+        return to_dataframe(table)
+    
+    def read(self, dataset_id, table_id, query=None, limit=None, use_db_dtypes=True, query_name=None):
         """
         Reads data with proper memory management
         """
@@ -426,7 +667,7 @@ class Client:
             self.logger.info(f"Executing query: {sql_query}")
             
             # Use context manager for automatic cleanup
-            with self._managed_query_job(sql_query) as query_job:
+            with self._managed_query_job(sql_query, query_name=query_name or f"read:{table_id}") as query_job:
                 
                 try:
                     if use_db_dtypes:
@@ -461,7 +702,7 @@ class Client:
                                 
                                 # Periodic garbage collection
                                 if len(all_chunks) % 10 == 0:
-                                    gc.collect()
+                                    _forced_gc('read_chunks')
                         
                         # Add remaining rows
                         if current_chunk:
@@ -488,7 +729,7 @@ class Client:
             self.logger.error(f"Error reading data: {str(e)}")
             raise
         finally:
-            gc.collect()
+            _forced_gc('read')
     
     def _sanitize_cell_value(self, value):
         """Comprehensive sanitization of individual cell values for BigQuery"""
@@ -568,12 +809,13 @@ class Client:
             self.logger.warning(f"Failed to convert value {type(value)} to string: {e}")
             return None
     
-    def query(self, sql: str) -> pd.DataFrame:
+    def query(self, sql: str, query_name: str = None) -> pd.DataFrame:
         """
         Execute a BigQuery SQL query and return results as DataFrame
         
         Args:
             sql: SQL query string
+            query_name: Name used to tag the query's cost statistics
             
         Returns:
             DataFrame with query results, empty DataFrame on error
@@ -582,12 +824,14 @@ class Client:
             self.logger.info(f"Executing BigQuery query")
             
             # Execute query and convert to DataFrame
-            query_job = self.client.query(sql)
-            result_df = query_job.to_dataframe()
+            with self._managed_query_job(sql, query_name=query_name) as query_job:
+                result_df = query_job.to_dataframe()
             
             self.logger.info(f"Query returned {len(result_df)} rows")
             return result_df
             
+        except ByteBudgetExceeded:
+            raise
         except Exception as e:
             self.logger.error(f"Query execution failed: {e}")
             return pd.DataFrame()  # Return empty DataFrame on error
@@ -596,6 +840,9 @@ class Client:
         """
         Create a table to store the last processed timestamp
         
+        Rows are keyed; each key holds a timestamp and an optional string value
+        (e.g. a pagination cursor).
+        
         Args:
             dataset_id: BigQuery dataset ID
             table_id: BigQuery table ID
@@ -609,7 +856,8 @@ class Client:
             schema = [
                 bigquery.SchemaField("key", "STRING", mode="REQUIRED"),
                 bigquery.SchemaField("timestamp", "TIMESTAMP", mode="REQUIRED"),
-                bigquery.SchemaField("updated_at", "TIMESTAMP", mode="REQUIRED")
+                bigquery.SchemaField("updated_at", "TIMESTAMP", mode="REQUIRED"),
+                bigquery.SchemaField("value", "STRING", mode="NULLABLE")
             ]
             
             table_ref = self.client.dataset(dataset_id).table(table_id)
@@ -638,13 +886,36 @@ class Client:
             self.logger.error(f"Error creating timestamp table: {e}")
             return False
     
-    def get_last_processed_timestamp(self, dataset_id: str, table_id: str) -> pd.Timestamp:
+    def get_timestamps(self, dataset_id: str, table_id: str) -> pd.DataFrame:
+        """
+        Get the latest timestamp and value for every key in one query
+        
+        Args:
+            dataset_id: BigQuery dataset ID
+            table_id: BigQuery table ID
+            
+        Returns:
+            DataFrame with key, timestamp, value and updated_at columns;
+            empty DataFrame if the table is missing or unreadable
+        """
+        query = f"""
+        SELECT key, timestamp, value, updated_at
+        FROM `{self.project_id}.{dataset_id}.{table_id}`
+        WHERE TRUE
+        QUALIFY ROW_NUMBER() OVER (PARTITION BY key ORDER BY updated_at DESC) = 1
+        """
+        
+        return self.query(query, query_name='state_read')
+    
+    def get_last_processed_timestamp(self, dataset_id: str, table_id: str,
+                                     key: str = 'last_processed_mention') -> pd.Timestamp:
         """
         Get the last processed timestamp
         
         Args:
             dataset_id: BigQuery dataset ID
             table_id: BigQuery table ID
+            key: State key to read
             
         Returns:
             Last processed timestamp or epoch if not found
@@ -653,7 +924,7 @@ class Client:
             query = f"""
             SELECT timestamp
             FROM `{self.project_id}.{dataset_id}.{table_id}`
-            WHERE key = 'last_processed_mention'
+            WHERE key = '{key}'
             ORDER BY updated_at DESC
             LIMIT 1
             """
@@ -675,7 +946,58 @@ class Client:
             # Return epoch time on error
             return pd.Timestamp('1970-01-01', tz='UTC')
     
-    def update_last_processed_timestamp(self, dataset_id: str, table_id: str, timestamp: pd.Timestamp) -> bool:
+    def upsert_state(self, dataset_id: str, table_id: str, entries: dict) -> int:
+        """
+        Write several state keys with a single MERGE
+        
+        The entries are passed as one array-of-STRUCT query parameter and
+        UNNESTed as the MERGE source, so a run's state costs one DML job
+        however many keys changed. Existing keys are updated, new ones inserted.
+        
+        Args:
+            dataset_id: BigQuery dataset ID
+            table_id: BigQuery table ID
+            entries: Mapping of key -> {'timestamp', 'value'}
+            
+        Returns:
+            Number of state rows written
+        """
+        merge_query = f"""
+        MERGE `{self.project_id}.{dataset_id}.{table_id}` T
+        USING (SELECT * FROM UNNEST(@entries)) S
+        ON T.key = S.key
+        WHEN MATCHED THEN
+            UPDATE SET timestamp = S.timestamp, value = S.value, updated_at = CURRENT_TIMESTAMP()
+        WHEN NOT MATCHED THEN
+            INSERT (key, timestamp, value, updated_at)
+            VALUES (S.key, S.timestamp, S.value, CURRENT_TIMESTAMP())
+        """
+        
+        job_config = bigquery.QueryJobConfig(
+            query_parameters=[
+                bigquery.ArrayQueryParameter('entries', 'STRUCT', [
+                    bigquery.StructQueryParameter(
+                        None,
+                        bigquery.ScalarQueryParameter('key', 'STRING', key),
+                        bigquery.ScalarQueryParameter('timestamp', 'TIMESTAMP', entry['timestamp']),
+                        bigquery.ScalarQueryParameter('value', 'STRING', entry.get('value'))
+                    )
+                    for key, entry in entries.items()
+                ])
+            ]
+        )
+        if self.job_timeout_ms:
+            job_config.job_timeout_ms = self.job_timeout_ms
+        
+        with self._managed_query_job(merge_query, job_config=job_config, query_name='state_write') as job:
+            self._wait(job)
+            written = job.num_dml_affected_rows or 0
+        
+        self.logger.info(f"Wrote {len(entries)} state keys to {table_id}")
+        return written
+    
+    def update_last_processed_timestamp(self, dataset_id: str, table_id: str, timestamp: pd.Timestamp,
+                                        key: str = 'last_processed_mention', value: str = None) -> bool:
         """
         Update the last processed timestamp
         
@@ -683,6 +1005,8 @@ class Client:
             dataset_id: BigQuery dataset ID
             table_id: BigQuery table ID
             timestamp: New timestamp to store
+            key: State key to update
+            value: Optional string value stored alongside the timestamp
             
         Returns:
             True if successful, False otherwise
@@ -691,14 +1015,15 @@ class Client:
             # First, try to update existing record
             update_query = f"""
             UPDATE `{self.project_id}.{dataset_id}.{table_id}`
-            SET timestamp = @new_timestamp, updated_at = CURRENT_TIMESTAMP()
-            WHERE key = 'last_processed_mention'
+            SET timestamp = @new_timestamp, value = @new_value, updated_at = CURRENT_TIMESTAMP()
+            WHERE key = @key
             """
             
-            from google.cloud import bigquery
             job_config = bigquery.QueryJobConfig(
                 query_parameters=[
-                    bigquery.ScalarQueryParameter("new_timestamp", "TIMESTAMP", timestamp)
+                    bigquery.ScalarQueryParameter("new_timestamp", "TIMESTAMP", timestamp),
+                    bigquery.ScalarQueryParameter("new_value", "STRING", value),
+                    bigquery.ScalarQueryParameter("key", "STRING", key)
                 ]
             )
             
@@ -711,14 +1036,15 @@ class Client:
                 self.logger.info("No existing record found, inserting new timestamp")
                 
                 new_data = pd.DataFrame({
-                    'key': ['last_processed_mention'],
+                    'key': [key],
                     'timestamp': [timestamp],
-                    'updated_at': [pd.Timestamp.now(tz='UTC')]
+                    'updated_at': [pd.Timestamp.now(tz='UTC')],
+                    'value': [value]
                 })
                 
                 self.append(new_data, dataset_id, table_id, create_if_not_exists=False)
             
-            self.logger.info(f"Updated last processed timestamp to: {timestamp}")
+            self.logger.info(f"Updated {key} timestamp to: {timestamp}")
             return True
             
         except Exception as e:
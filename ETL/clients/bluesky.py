@@ -1,134 +1,147 @@
 import os
-import re
+import json
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import List, Dict, Any
+from typing import Callable, Iterator, List, Optional, Tuple
 from dotenv import load_dotenv
-from atproto import Client as AtProtoClient
-from langdetect import detect, DetectorFactory
+from atproto import Client as AtProtoClient, Session, SessionEvent
 
-# Set seed for consistent results
-DetectorFactory.seed = 0
+from ETL.clients.filters import PostFilter, is_english_text, remove_emojis, simple_english_detection
+from ETL.clients.records import PostRecord, parse_feed_item
+from ETL.clients.transport import RateLimitedRequest
 
 load_dotenv()
 
+# Refresh the access token when it has less than this many seconds left
+SESSION_REFRESH_MARGIN_SECONDS = 15 * 60
+
 class Client:
-    def __init__(self):
-        self.client = AtProtoClient()
+    def __init__(self, client=None, session_path=None):
+        # An injected client (e.g. a recorded-feed stand-in) replaces the live API
+        self.client = client or AtProtoClient(request=RateLimitedRequest(
+            max_retries=int(os.getenv('BLUESKY_MAX_RETRIES', '4'))
+        ))
         self.handle = os.getenv('BLUESKY_USERNAME')
         self.password = os.getenv('BLUESKY_PASSWORD')
         self.posts = []
+        self.last_cursor = None
+        self.last_cursors = {}
+        # Shared language/content filter; stats() reports per-stage counts and timings
+        self.post_filter = PostFilter()
+        
+        # Session string (access + refresh JWTs) persisted between runs, readable only by its owner
+        self.session_path = session_path or os.getenv('BLUESKY_SESSION_PATH', 'data/local/bluesky_session')
+        self.auth_method = None
+        self.auth_seconds = None
+        if hasattr(self.client, 'on_session_change'):
+            self.client.on_session_change(self._on_session_change)
         
     def authenticate(self):
-        """Authenticate with Bluesky"""
+        """
+        Authenticate with Bluesky, reusing the saved session when possible
+        
+        A saved session whose access token is still valid is imported without
+        any request; one close to expiry is refreshed. A full login (which
+        counts against the createSession rate limit) only happens when there
+        is no usable session or the refresh fails.
+        """
+        started = time.perf_counter()
         try:
-            self.client.login(self.handle, self.password)
-            print(f"Successfully authenticated as {self.handle}")
+            method = self._resume_session()
+            if method is None:
+                self.client.login(self.handle, self.password)
+                method = 'login'
+            
+            self.auth_method = method
+            self.auth_seconds = time.perf_counter() - started
+            print(f"Successfully authenticated as {self.handle} via {method} in {self.auth_seconds:.3f}s")
             return True
         except Exception as e:
             print(f"Authentication failed: {e}")
             return False
     
+    def _resume_session(self) -> Optional[str]:
+        """Resume the saved session; returns 'session' or 'refresh', or None if a login is needed"""
+        session_string = self._load_session()
+        if not session_string:
+            return None
+        
+        try:
+            session = Session.decode(session_string)
+            if session.handle != self.handle:
+                return None
+            
+            now = time.time()
+            if session.refresh_jwt_payload.exp <= now:
+                print("Saved Bluesky session has expired, logging in")
+                return None
+            
+            self.client.login(session_string=session_string, fetch_bsky_profile=False)
+            if session.access_jwt_payload.exp - now > SESSION_REFRESH_MARGIN_SECONDS:
+                return 'session'
+            
+            # Any authenticated call refreshes a token that is about to expire
+            self.client.com.atproto.server.get_session()
+            return 'refresh'
+            
+        except Exception as e:
+            print(f"Could not resume saved Bluesky session, logging in: {e}")
+            return None
+    
+    def _load_session(self) -> Optional[str]:
+        try:
+            with open(self.session_path, 'r') as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            return None
+    
+    def _on_session_change(self, event, session):
+        """Persist newly created or refreshed sessions (mode 600, written atomically)"""
+        if event == SessionEvent.IMPORT:
+            return
+        
+        try:
+            os.makedirs(os.path.dirname(self.session_path) or '.', exist_ok=True)
+            tmp_path = self.session_path + '.tmp'
+            fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            os.fchmod(fd, 0o600)
+            with os.fdopen(fd, 'w') as f:
+                f.write(session.export())
+            os.replace(tmp_path, self.session_path)
+        except OSError as e:
+            print(f"Could not save Bluesky session: {e}")
+    
+    def transport_stats(self) -> Optional[dict]:
+        """Retry, rate-limit and pacing counters of the HTTP layer, if it keeps them"""
+        request = getattr(self.client, 'request', None)
+        if isinstance(request, RateLimitedRequest):
+            return request.stats()
+        return None
+    
     def remove_emojis(self, text: str) -> str:
         """Remove emojis from text"""
-        emoji_pattern = re.compile(
-            "["
-            "\U0001F600-\U0001F64F"  # emoticons
-            "\U0001F300-\U0001F5FF"  # symbols & pictographs
-            "\U0001F680-\U0001F6FF"  # transport & map symbols
-            "\U0001F1E0-\U0001F1FF"  # flags (iOS)
-            "\U00002702-\U000027B0"
-            "\U000024C2-\U0001F251"
-            "]+", flags=re.UNICODE)
-        return emoji_pattern.sub(r'', text)
+        return remove_emojis(text)
 
     def is_english(self, text: str) -> bool:
         """Robust English detection using langdetect"""
-        clean_text = self.remove_emojis(text).strip()
-        
-        if not clean_text or len(clean_text) < 20:
-            return False
-        
-        try:
-            detected_lang = detect(clean_text)
-            return detected_lang == 'en'
-        except:
-            # Fallback to simple detection if langdetect fails
-            return self._simple_english_detection(clean_text)
+        return is_english_text(remove_emojis(text).strip())
     
     def _simple_english_detection(self, text: str) -> bool:
         """Fallback simple English detection"""
-        text_lower = text.lower()
-        english_indicators = ['the', 'and', 'for', 'are', 'but', 'not', 'you', 'all', 'can', 'had', 'her', 'was', 'one', 'our', 'out', 'day', 'get', 'has', 'him', 'his', 'how', 'its', 'may', 'new', 'now', 'old', 'see', 'two', 'who', 'boy', 'did', 'has', 'let', 'put', 'say', 'she', 'too', 'use']
-        english_word_count = sum(1 for word in english_indicators if word in text_lower)
-        
-        # Check for Spanish indicators
-        spanish_words = ['que', 'del', 'los', 'las', 'para', 'con', 'más', 'pero', 'qué', 'está']
-        spanish_count = sum(1 for word in spanish_words if word in text_lower)
-        
-        # Check for Spanish accents
-        spanish_chars = re.findall(r'[áéíóúüñ¿¡]', text_lower)
-        
-        # Reject if Spanish indicators
-        if spanish_count >= 2 or len(spanish_chars) >= 1:
-            return False
-        
-        return english_word_count >= 2
-
+        return simple_english_detection(text)
 
-    def fetch_popular_posts(self, limit: int = 100, min_length: int = 50) -> List[Dict[str, Any]]:
+    def fetch_popular_posts(self, limit: int = 100, min_length: int = 50) -> List[PostRecord]:
         """Fetch popular posts from Hot Classic feed - trending posts across Bluesky"""
-        posts = []
         try:
             # Use Hot Classic feed - curated trending/popular posts
-            hot_classic_feed = "at://did:plc:z72i7hdynmk6r22z27h6tvur/app.bsky.feed.generator/hot-classic"
-            from atproto import models
-            response = self.client.app.bsky.feed.get_feed(
-                models.AppBskyFeedGetFeed.Params(feed=hot_classic_feed, limit=limit)
+            hot_classic = self.POPULAR_FEEDS['hot_classic']
+            posts, self.last_cursor = self._fetch_feed_page(
+                hot_classic, limit=limit, min_length=min_length, source=self.FEED_SOURCES[hot_classic]
             )
             
-            for post in response.feed:
-                if post.post.record.text:
-                    text = post.post.record.text
-                    
-                    # Check if post has language metadata (most reliable)
-                    post_langs = getattr(post.post.record, 'langs', [])
-                    is_english_by_api = any(lang.startswith('en') for lang in post_langs) if post_langs else None
-                    
-                    # Filter: English (by API or fallback detection), minimum length, not just URLs/mentions
-                    is_english_post = (
-                        is_english_by_api if is_english_by_api is not None 
-                        else self.is_english(text)
-                    )
-                    
-                    if (len(text) >= min_length and 
-                        is_english_post and
-                        not re.match(r'^[@#\s]*$', text)):  # Not just mentions/hashtags
-                        
-                        clean_text = self.remove_emojis(text).strip()
-                        
-                        # Only save if the cleaned text is meaningful (not empty after cleaning)
-                        if clean_text and len(clean_text) >= min_length:
-                            engagement_score = (
-                                (post.post.like_count or 0) + 
-                                (post.post.repost_count or 0) + 
-                                (post.post.reply_count or 0)
-                            )
-                            
-                            post_data = {
-                                'uri': post.post.uri,
-                                'text': clean_text,
-                                'author': post.post.author.handle,
-                                'created_at': post.post.record.created_at,
-                                'like_count': post.post.like_count or 0,
-                                'repost_count': post.post.repost_count or 0,
-                                'reply_count': post.post.reply_count or 0,
-                                'engagement_score': engagement_score,
-                                'text_length': len(clean_text),
-                                'fetched_at': datetime.now().isoformat(),
-                                'source': 'hot_classic_feed'
-                            }
-                            posts.append(post_data)
-            
             self.posts = posts
             print(f"Fetched {len(posts)} trending English posts from Hot Classic feed (min {min_length} chars)")
             return posts
@@ -137,77 +150,182 @@ class Client:
             print(f"Error fetching Hot Classic feed: {e}")
             return []
     
-    def get_posts_data(self) -> List[Dict[str, Any]]:
+    def get_posts_data(self) -> List[PostRecord]:
         """Return the stored posts data"""
         return self.posts
     
-    def get_top_posts(self, n: int = 10) -> List[Dict[str, Any]]:
+    def get_top_posts(self, n: int = 10) -> List[PostRecord]:
         """Get top N most popular posts"""
         return self.posts[:n]
     
-    def fetch_from_custom_feed(self, feed_uri: str, limit: int = 100, min_length: int = 50) -> List[Dict[str, Any]]:
-        """Fetch posts from any custom feed URI"""
+    def _fetch_feed_page(self, feed_uri: str, limit: int = 100, min_length: int = 50,
+                         cursor: Optional[str] = None,
+                         source: str = 'custom_feed') -> Tuple[List[PostRecord], Optional[str]]:
+        """Fetch and filter one page of a feed, returning (posts, next_cursor)"""
+        from atproto import models
+        response = self.client.app.bsky.feed.get_feed(
+            models.AppBskyFeedGetFeed.Params(feed=feed_uri, limit=limit, cursor=cursor)
+        )
+        
+        fetched_at = datetime.now().isoformat()
+        record_feed_uri = feed_uri if source == 'custom_feed' else None
+        
         posts = []
+        for item in response.feed:
+            post = parse_feed_item(item, self.post_filter, min_length, source,
+                                   feed_uri=record_feed_uri, fetched_at=fetched_at)
+            if post is not None:
+                posts.append(post)
+        
+        return posts, getattr(response, 'cursor', None)
+    
+    def fetch_from_custom_feed(self, feed_uri: str, limit: int = 100, min_length: int = 50) -> List[PostRecord]:
+        """Fetch posts from any custom feed URI"""
         try:
-            from atproto import models
-            response = self.client.app.bsky.feed.get_feed(
-                models.AppBskyFeedGetFeed.Params(feed=feed_uri, limit=limit)
-            )
-            
-            for post in response.feed:
-                if post.post.record.text:
-                    text = post.post.record.text
-                    
-                    # Check if post has language metadata (most reliable)
-                    post_langs = getattr(post.post.record, 'langs', [])
-                    is_english_by_api = any(lang.startswith('en') for lang in post_langs) if post_langs else None
-                    
-                    # Filter: English (by API or fallback detection), minimum length, not just URLs/mentions
-                    is_english_post = (
-                        is_english_by_api if is_english_by_api is not None 
-                        else self.is_english(text)
-                    )
-                    
-                    if (len(text) >= min_length and 
-                        is_english_post and
-                        not re.match(r'^[@#\s]*$', text)):
-                        
-                        clean_text = self.remove_emojis(text).strip()
-                        
-                        # Only save if the cleaned text is meaningful (not empty after cleaning)
-                        if clean_text and len(clean_text) >= min_length:
-                            engagement_score = (
-                                (post.post.like_count or 0) + 
-                                (post.post.repost_count or 0) + 
-                                (post.post.reply_count or 0)
-                            )
-                            
-                            post_data = {
-                                'uri': post.post.uri,
-                                'text': clean_text,
-                                'author': post.post.author.handle,
-                                'created_at': post.post.record.created_at,
-                                'like_count': post.post.like_count or 0,
-                                'repost_count': post.post.repost_count or 0,
-                                'reply_count': post.post.reply_count or 0,
-                                'engagement_score': engagement_score,
-                                'text_length': len(clean_text),
-                                'fetched_at': datetime.now().isoformat(),
-                                'source': 'custom_feed',
-                                'feed_uri': feed_uri
-                            }
-                            posts.append(post_data)
-            
+            posts, _ = self._fetch_feed_page(feed_uri, limit=limit, min_length=min_length)
             print(f"Fetched {len(posts)} posts from custom feed")
             return posts
             
         except Exception as e:
             print(f"Error fetching custom feed: {e}")
             return []
+    
+    def _walk_feed(self, feed_uri: str, pages: int, limit: int, min_length: int,
+                   on_page: Optional[Callable[[List[PostRecord]], None]] = None
+                   ) -> Tuple[List[PostRecord], Optional[str]]:
+        """Follow a feed's cursor for up to `pages` pages, passing each page to `on_page` if given"""
+        posts = []
+        cursor = None
+        source = self.FEED_SOURCES.get(feed_uri, 'custom_feed')
+        for page in range(pages):
+            try:
+                page_posts, cursor = self._fetch_feed_page(
+                    feed_uri, limit=limit, min_length=min_length, cursor=cursor, source=source
+                )
+            except Exception as e:
+                print(f"Error fetching page {page + 1} of {feed_uri}: {e}")
+                break
+            
+            if on_page is not None:
+                on_page(page_posts)
+            else:
+                posts.extend(page_posts)
+            if not cursor:
+                break
+        
+        return posts, cursor
+    
+    def iter_feed_pages(self, feed_uris: Optional[List[str]] = None, pages: int = 1, limit: int = 100,
+                        min_length: int = 50, max_workers: int = 4,
+                        max_pending: int = 4) -> Iterator[List[PostRecord]]:
+        """
+        Yield pages of posts as they arrive from several feeds, de-duplicated by URI
+        
+        Feeds are walked concurrently like `fetch_feeds`, but each page is handed
+        over as soon as it is fetched so downstream work can start on it. At most
+        `max_pending` fetched pages wait to be consumed; beyond that the feed
+        workers pause. `last_cursors` is set once every feed has finished.
+        """
+        feed_uris = [self.POPULAR_FEEDS.get(feed, feed) for feed in (feed_uris or ['hot_classic'])]
+        pages_ready = queue.Queue(maxsize=max_pending)
+        done = object()
+        stopped = threading.Event()
+        
+        def hand_over(item):
+            while not stopped.is_set():
+                try:
+                    return pages_ready.put(item, timeout=0.1)
+                except queue.Full:
+                    continue
+            # The consumer went away; abandon the rest of this feed
+            raise RuntimeError("feed page consumer stopped")
+        
+        def walk(feed_uri):
+            try:
+                return self._walk_feed(feed_uri, pages, limit, min_length, on_page=hand_over)
+            finally:
+                if not stopped.is_set():
+                    hand_over(done)
+        
+        seen_uris = set()
+        collected = 0
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(feed_uris))),
+                                thread_name_prefix='bluesky-feed') as pool:
+            futures = [pool.submit(walk, feed_uri) for feed_uri in feed_uris]
+            try:
+                remaining = len(futures)
+                while remaining:
+                    page_posts = pages_ready.get()
+                    if page_posts is done:
+                        remaining -= 1
+                        continue
+                    
+                    collected += len(page_posts)
+                    unique = [post for post in page_posts if post.uri not in seen_uris]
+                    seen_uris.update(post.uri for post in unique)
+                    if unique:
+                        yield unique
+            finally:
+                stopped.set()
+            
+            cursors = {feed_uri: future.result()[1] for feed_uri, future in zip(feed_uris, futures)}
+        
+        self.last_cursors = cursors
+        self.last_cursor = json.dumps(cursors)
+        print(f"Fetched {len(seen_uris)} unique posts ({collected - len(seen_uris)} duplicates) "
+              f"from {len(feed_uris)} feeds, up to {pages} pages each")
+    
+    def fetch_feeds(self, feed_uris: Optional[List[str]] = None, pages: int = 1, limit: int = 100,
+                    min_length: int = 50, max_workers: int = 4) -> List[PostRecord]:
+        """
+        Collect posts from several feeds concurrently, walking each feed's cursor
+        
+        Feeds are fetched in parallel (at most `max_workers` at a time); pages of a
+        single feed are fetched in order since each needs the previous cursor.
+        Posts are merged in feed order and de-duplicated by URI.
+        
+        Args:
+            feed_uris: Feed URIs or POPULAR_FEEDS names (default: Hot Classic)
+            pages: Maximum number of pages to walk per feed
+            limit: Page size requested from each feed
+            min_length: Minimum cleaned text length
+            max_workers: Maximum number of feeds fetched at once
+        """
+        feed_uris = [self.POPULAR_FEEDS.get(feed, feed) for feed in (feed_uris or ['hot_classic'])]
+        
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(feed_uris))),
+                                thread_name_prefix='bluesky-feed') as pool:
+            results = list(pool.map(
+                lambda feed_uri: self._walk_feed(feed_uri, pages, limit, min_length),
+                feed_uris
+            ))
+        
+        posts = []
+        seen_uris = set()
+        cursors = {}
+        for feed_uri, (feed_posts, cursor) in zip(feed_uris, results):
+            cursors[feed_uri] = cursor
+            for post in feed_posts:
+                if post.uri not in seen_uris:
+                    seen_uris.add(post.uri)
+                    posts.append(post)
+        
+        collected = sum(len(feed_posts) for feed_posts, _ in results)
+        self.posts = posts
+        self.last_cursors = cursors
+        self.last_cursor = json.dumps(cursors)
+        print(f"Fetched {len(posts)} unique posts ({collected - len(posts)} duplicates) "
+              f"from {len(feed_uris)} feeds, up to {pages} pages each")
+        return posts
 
     # Popular feed URIs for easy access
     POPULAR_FEEDS = {
         'hot_classic': "at://did:plc:z72i7hdynmk6r22z27h6tvur/app.bsky.feed.generator/hot-classic",
         'discover': "at://did:plc:z72i7hdynmk6r22z27h6tvur/app.bsky.feed.generator/bsky-team-discover",
         # Add more popular feed URIs as discovered
+    }
+    # Source tag stored on posts from these feeds; posts from any other feed are
+    # tagged 'custom_feed' and keep the feed URI
+    FEED_SOURCES = {
+        POPULAR_FEEDS['hot_classic']: 'hot_classic_feed',
     }
\ No newline at end of file
@@ -0,0 +1,195 @@
+import re
+import threading
+import time
+from functools import lru_cache
+from typing import Dict, Optional, Sequence
+
+from langdetect import detect, DetectorFactory
+from langdetect.lang_detect_exception import LangDetectException
+
+# Set seed for consistent results
+DetectorFactory.seed = 0
+
+EMOJI_PATTERN = re.compile(
+    "["
+    "\U0001F600-\U0001F64F"  # emoticons
+    "\U0001F300-\U0001F5FF"  # symbols & pictographs
+    "\U0001F680-\U0001F6FF"  # transport & map symbols
+    "\U0001F1E0-\U0001F1FF"  # flags (iOS)
+    "\U00002702-\U000027B0"
+    "\U000024C2-\U0001F251"
+    "]+", flags=re.UNICODE)
+MENTIONS_ONLY_PATTERN = re.compile(r'^[@#\s]*$')
+SPANISH_CHARS_PATTERN = re.compile(r'[áéíóúüñ¿¡]')
+
+ENGLISH_INDICATORS = ('the', 'and', 'for', 'are', 'but', 'not', 'you', 'all', 'can', 'had', 'her', 'was',
+                      'one', 'our', 'out', 'day', 'get', 'has', 'him', 'his', 'how', 'its', 'may', 'new',
+                      'now', 'old', 'see', 'two', 'who', 'boy', 'did', 'has', 'let', 'put', 'say', 'she',
+                      'too', 'use')
+SPANISH_WORDS = ('que', 'del', 'los', 'las', 'para', 'con', 'más', 'pero', 'qué', 'está')
+
+# Filter stages in the order they run: cheapest checks first, langdetect last
+STAGES = ('empty', 'length', 'mentions_only', 'language_tag', 'clean_length', 'langdetect')
+
+
+def remove_emojis(text: str) -> str:
+    """Remove emojis from text"""
+    return EMOJI_PATTERN.sub(r'', text)
+
+
+def simple_english_detection(text: str) -> bool:
+    """Fallback keyword-based English detection"""
+    text_lower = text.lower()
+    english_word_count = sum(1 for word in ENGLISH_INDICATORS if word in text_lower)
+
+    # Reject if Spanish indicators
+    spanish_count = sum(1 for word in SPANISH_WORDS if word in text_lower)
+    if spanish_count >= 2 or SPANISH_CHARS_PATTERN.search(text_lower):
+        return False
+
+    return english_word_count >= 2
+
+
+@lru_cache(maxsize=8192)
+def detect_language(text: str) -> Optional[str]:
+    """langdetect language code for text (cached), or None if detection fails"""
+    try:
+        return detect(text)
+    except LangDetectException:
+        return None
+
+
+def is_english_text(clean_text: str) -> bool:
+    """English detection on emoji-free text: langdetect, falling back to keywords"""
+    if not clean_text or len(clean_text) < 20:
+        return False
+
+    language = detect_language(clean_text)
+    if language is None:
+        return simple_english_detection(clean_text)
+    return language == 'en'
+
+
+class PostFilter:
+    """
+    Language and content filter applied to every collected post.
+
+    `clean()` runs the stages in STAGES order and stops at the first rejection,
+    so the cheap length and pattern checks screen out most posts before emoji
+    stripping, and langdetect only runs for posts without a language tag.
+    Per-stage call counts, rejections and time are kept for `stats()`.
+    """
+
+    def __init__(self, min_length: int = 50, language: str = 'en', detect_untagged: bool = True):
+        self.min_length = min_length
+        self.language = language
+        # When False, posts without a language tag are rejected rather than detected
+        self.detect_untagged = detect_untagged
+        self._lock = threading.Lock()
+        self.reset_stats()
+
+    def reset_stats(self):
+        with self._lock:
+            self._stats = {stage: {'checked': 0, 'rejected': 0, 'seconds': 0.0} for stage in STAGES}
+            self._accepted = 0
+
+    def _record(self, timings, rejected_at):
+        with self._lock:
+            for stage, seconds in timings.items():
+                entry = self._stats[stage]
+                entry['checked'] += 1
+                entry['seconds'] += seconds
+            if rejected_at is None:
+                self._accepted += 1
+            else:
+                self._stats[rejected_at]['rejected'] += 1
+
+    def clean(self, text: Optional[str], langs: Optional[Sequence[str]] = None,
+              min_length: Optional[int] = None) -> Optional[str]:
+        """
+        Return the emoji-free text if the post passes every check, else None
+
+        Args:
+            text: Raw post text
+            langs: Language tags from the post record, if any
+            min_length: Override of the minimum cleaned text length
+        """
+        min_length = self.min_length if min_length is None else min_length
+        timings = {}
+        clock = time.perf_counter
+
+        started = clock()
+        passed = bool(text)
+        timings['empty'] = clock() - started
+        if not passed:
+            self._record(timings, 'empty')
+            return None
+
+        started = clock()
+        passed = len(text) >= min_length
+        timings['length'] = clock() - started
+        if not passed:
+            self._record(timings, 'length')
+            return None
+
+        started = clock()
+        passed = MENTIONS_ONLY_PATTERN.match(text) is None
+        timings['mentions_only'] = clock() - started
+        if not passed:
+            self._record(timings, 'mentions_only')
+            return None
+
+        # The record's language tag is authoritative when present
+        started = clock()
+        tagged = None
+        if langs:
+            tagged = any(lang.startswith(self.language) for lang in langs)
+        elif not self.detect_untagged:
+            tagged = False
+        timings['language_tag'] = clock() - started
+        if tagged is False:
+            self._record(timings, 'language_tag')
+            return None
+
+        started = clock()
+        clean_text = remove_emojis(text).strip()
+        passed = len(clean_text) >= min_length
+        timings['clean_length'] = clock() - started
+        if not passed:
+            self._record(timings, 'clean_length')
+            return None
+
+        if tagged is None:
+            started = clock()
+            if self.language == 'en':
+                passed = is_english_text(clean_text)
+            else:
+                passed = detect_language(clean_text) == self.language
+            timings['langdetect'] = clock() - started
+            if not passed:
+                self._record(timings, 'langdetect')
+                return None
+
+        self._record(timings, None)
+        return clean_text
+
+    def stats(self) -> Dict:
+        """Per-stage counts, rejections and milliseconds, plus langdetect cache hits"""
+        with self._lock:
+            stages = {
+                stage: {
+                    'checked': entry['checked'],
+                    'rejected': entry['rejected'],
+                    'ms': round(entry['seconds'] * 1000, 3)
+                }
+                for stage, entry in self._stats.items()
+            }
+            accepted = self._accepted
+
+        cache = detect_language.cache_info()
+        return {
+            'accepted': accepted,
+            'rejected': sum(entry['rejected'] for entry in stages.values()),
+            'stages': stages,
+            'langdetect_cache': {'hits': cache.hits, 'misses': cache.misses, 'size': cache.currsize}
+        }
@@ -0,0 +1,276 @@
+import asyncio
+import json
+import logging
+import time
+from datetime import datetime
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional
+
+from ETL.clients.filters import PostFilter
+from ETL.clients.records import PostRecord
+
+JETSTREAM_URL = "wss://jetstream2.us-east.bsky.network/subscribe"
+POST_COLLECTION = "app.bsky.feed.post"
+
+
+def parse_event(event: Dict[str, Any], post_filter: PostFilter) -> Optional[PostRecord]:
+    """
+    Turn a Jetstream commit event into a post record, or None if it is filtered out
+
+    Only newly created posts that pass `post_filter` are kept. The firehose
+    carries DIDs, not handles, so `author` is the author's DID.
+    """
+    if event.get('kind') != 'commit':
+        return None
+
+    commit = event.get('commit') or {}
+    if commit.get('operation') != 'create' or commit.get('collection') != POST_COLLECTION:
+        return None
+
+    record = commit.get('record') or {}
+    clean_text = post_filter.clean(record.get('text'), record.get('langs'))
+    if clean_text is None:
+        return None
+
+    return PostRecord(
+        uri=f"at://{event['did']}/{POST_COLLECTION}/{commit['rkey']}",
+        text=clean_text,
+        author=event['did'],
+        created_at=record.get('createdAt'),
+        fetched_at=datetime.now().isoformat(),
+        source='jetstream',
+        event_time_us=event.get('time_us')
+    )
+
+
+def _percentile(values: List[float], pct: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return round(ordered[min(len(ordered) - 1, int(len(ordered) * pct))], 4)
+
+
+async def replay_capture(path: str, speed: Optional[float] = None) -> AsyncIterator[str]:
+    """
+    Yield raw messages from a recorded capture file (one Jetstream JSON message per line)
+
+    With `speed` set, messages are paced by their recorded `time_us` gaps
+    divided by `speed`; otherwise they are replayed as fast as they are consumed.
+    """
+    previous_us = None
+    with open(path, 'r') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+
+            if speed:
+                time_us = json.loads(line).get('time_us')
+                if previous_us is not None and time_us:
+                    await asyncio.sleep(max(0.0, (time_us - previous_us) / 1e6 / speed))
+                previous_us = time_us or previous_us
+
+            yield line
+            # Let the batcher run between messages
+            await asyncio.sleep(0)
+
+
+class JetstreamConsumer:
+    """
+    Asyncio consumer for the Bluesky Jetstream event stream.
+
+    A reader task parses and filters events into a bounded queue; a batcher
+    task drains it into batches of `batch_size` posts or whatever arrived
+    within `batch_seconds`, and hands each batch to the synchronous `sink`
+    in a worker thread, one batch at a time. When the sink falls behind the
+    queue fills and the reader stops pulling from the socket, so backpressure
+    reaches the server instead of growing memory.
+
+    `source` can be any async iterator of raw JSON messages (e.g.
+    `replay_capture(path)`); by default the live websocket is used, resuming
+    from `cursor` (a Jetstream `time_us`) after reconnects.
+    """
+
+    def __init__(self, sink: Callable[[List[PostRecord]], Any], url: str = JETSTREAM_URL,
+                 batch_size: int = 100, batch_seconds: float = 5.0, queue_size: int = 1000,
+                 min_length: int = 30, cursor: Optional[int] = None, source=None):
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.sink = sink
+        self.url = url
+        self.batch_size = batch_size
+        self.batch_seconds = batch_seconds
+        self.queue_size = queue_size
+        # Untagged posts are rejected rather than run through langdetect at firehose rates
+        self.post_filter = PostFilter(min_length=min_length, detect_untagged=False)
+        # Read position used for reconnects, and the newest event time loaded by the sink
+        self.cursor = cursor
+        self.committed_cursor = cursor
+        self.source = source
+        self.reconnect_delay = 1.0
+        self._reset_metrics()
+
+    def _reset_metrics(self):
+        self.post_filter.reset_stats()
+        self.events_received = 0
+        self.posts_accepted = 0
+        self.posts_loaded = 0
+        self.batches = 0
+        self.sink_seconds = 0.0
+        self.queue_high_water = 0
+        self.latencies = []
+        self.event_lags = []
+        self._started = None
+
+    async def _websocket_messages(self) -> AsyncIterator[str]:
+        """Yield raw messages from the live Jetstream socket, reconnecting on errors"""
+        import websockets
+
+        while True:
+            url = f"{self.url}?wantedCollections={POST_COLLECTION}"
+            if self.cursor:
+                url += f"&cursor={self.cursor}"
+
+            try:
+                async with websockets.connect(url, max_queue=self.queue_size) as socket:
+                    self.logger.info(f"Connected to Jetstream (cursor={self.cursor})")
+                    self.reconnect_delay = 1.0
+                    async for message in socket:
+                        yield message
+            except (OSError, websockets.ConnectionClosed) as e:
+                self.logger.warning(f"Jetstream connection lost: {e}; "
+                                    f"reconnecting in {self.reconnect_delay:.0f}s")
+                await asyncio.sleep(self.reconnect_delay)
+                self.reconnect_delay = min(self.reconnect_delay * 2, 60.0)
+
+    async def _read(self, queue: asyncio.Queue, max_events: Optional[int]):
+        """Parse and filter messages into the queue (blocks while the queue is full)"""
+        source = self.source if self.source is not None else self._websocket_messages()
+        async for message in source:
+            try:
+                event = json.loads(message)
+            except ValueError:
+                continue
+
+            self.events_received += 1
+            if event.get('time_us'):
+                self.cursor = event['time_us']
+
+            post = parse_event(event, self.post_filter)
+            if post is not None:
+                self.posts_accepted += 1
+                await queue.put((time.monotonic(), post))
+                self.queue_high_water = max(self.queue_high_water, queue.qsize())
+
+            if max_events is not None and self.events_received >= max_events:
+                break
+
+    async def _batch(self, queue: asyncio.Queue):
+        """Drain the queue into batches and pass them to the sink"""
+        done = False
+        while not done:
+            batch = []
+            deadline = None
+            while len(batch) < self.batch_size:
+                timeout = None if deadline is None else deadline - time.monotonic()
+                if timeout is not None and timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                if item is None:
+                    done = True
+                    break
+                batch.append(item)
+                if deadline is None:
+                    deadline = time.monotonic() + self.batch_seconds
+
+            if batch:
+                await self._flush(batch)
+
+    async def _flush(self, batch):
+        posts = [post for _, post in batch]
+        started = time.monotonic()
+        await asyncio.to_thread(self.sink, posts)
+        finished = time.monotonic()
+
+        self.batches += 1
+        self.posts_loaded += len(posts)
+        self.committed_cursor = batch[-1][1].event_time_us or self.committed_cursor
+        self.sink_seconds += finished - started
+
+        # Receipt-to-loaded latency, and event-time lag (meaningful on the live stream)
+        now_us = time.time() * 1e6
+        for received_at, post in batch:
+            self.latencies.append(finished - received_at)
+            if post.event_time_us:
+                self.event_lags.append((now_us - post.event_time_us) / 1e6)
+
+        self.logger.info(f"Loaded batch of {len(posts)} posts in {finished - started:.2f}s")
+
+    async def run(self, max_events: Optional[int] = None, duration: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Consume the stream until the source ends, `max_events` events were read,
+        or `duration` seconds passed; returns the run metrics
+        """
+        self._reset_metrics()
+        self._started = time.monotonic()
+        queue = asyncio.Queue(maxsize=self.queue_size)
+
+        reader = asyncio.create_task(self._read(queue, max_events))
+        batcher = asyncio.create_task(self._batch(queue))
+        try:
+            done, _ = await asyncio.wait({reader, batcher}, timeout=duration,
+                                         return_when=asyncio.FIRST_COMPLETED)
+            if batcher in done:
+                # The batcher only stops early if the sink raised
+                reader.cancel()
+                batcher.result()
+            if reader in done:
+                reader.result()
+            else:
+                self.logger.info(f"Stream duration of {duration}s reached")
+                reader.cancel()
+        finally:
+            await asyncio.gather(reader, return_exceptions=True)
+            if not batcher.done():
+                # End marker: the batcher flushes what is queued and stops
+                await queue.put(None)
+                await batcher
+
+        return self.metrics()
+
+    def metrics(self) -> Dict[str, Any]:
+        """Throughput and latency of the current or last run"""
+        elapsed = time.monotonic() - self._started if self._started else 0.0
+        return {
+            'events_received': self.events_received,
+            'posts_accepted': self.posts_accepted,
+            'posts_loaded': self.posts_loaded,
+            'batches': self.batches,
+            'seconds': round(elapsed, 3),
+            'events_per_second': round(self.events_received / elapsed, 1) if elapsed else None,
+            'posts_per_second': round(self.posts_loaded / elapsed, 1) if elapsed else None,
+            'sink_seconds': round(self.sink_seconds, 3),
+            'queue_high_water': self.queue_high_water,
+            'latency_p50': _percentile(self.latencies, 0.5),
+            'latency_p95': _percentile(self.latencies, 0.95),
+            'latency_max': round(max(self.latencies), 4) if self.latencies else None,
+            'event_lag_p50': _percentile(self.event_lags, 0.5),
+            'cursor': self.committed_cursor,
+            'filter': self.post_filter.stats()
+        }
+
+
+async def record_capture(path: str, max_events: int = 10000, url: str = JETSTREAM_URL):
+    """Record raw Jetstream post messages to a capture file for offline replay"""
+    import websockets
+
+    written = 0
+    async with websockets.connect(f"{url}?wantedCollections={POST_COLLECTION}") as socket:
+        with open(path, 'w') as f:
+            async for message in socket:
+                f.write(message.strip() + '\n')
+                written += 1
+                if written >= max_events:
+                    break
+    return written
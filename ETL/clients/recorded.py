@@ -0,0 +1,204 @@
+import hashlib
+import json
+import random
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+
+def load_recorded_posts(path='data/posts.json'):
+    """Load the exported posts corpus (list of post records)"""
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+def retime_posts(posts, end=None):
+    """
+    Copy posts with created_at shifted so the newest lands at `end` (default: now)
+
+    Spacing between posts is kept; posts without a parseable created_at are copied as is.
+    """
+    def parse(value):
+        try:
+            return datetime.fromisoformat(value.replace('Z', '+00:00'))
+        except (AttributeError, ValueError):
+            return None
+
+    times = [parse(post.get('created_at')) for post in posts]
+    known = [t for t in times if t is not None]
+    if not known:
+        return [dict(post) for post in posts]
+
+    shift = (end or datetime.now(timezone.utc)) - max(known)
+    return [
+        dict(post, created_at=(t + shift).strftime('%Y-%m-%dT%H:%M:%S.%fZ')) if t is not None else dict(post)
+        for post, t in zip(posts, times)
+    ]
+
+
+def _feed_item(post):
+    """Build an object shaped like an atproto FeedViewPost from an exported post record"""
+    record = SimpleNamespace(
+        text=post.get('text'),
+        langs=post.get('langs', ['en']),
+        created_at=post.get('created_at')
+    )
+    return SimpleNamespace(post=SimpleNamespace(
+        uri=post['uri'],
+        record=record,
+        author=SimpleNamespace(handle=post.get('author')),
+        like_count=post.get('like_count'),
+        repost_count=post.get('repost_count'),
+        reply_count=post.get('reply_count')
+    ))
+
+
+class RecordedFeedAPI:
+    """
+    Replays recorded posts through the `client.app.bsky.feed.get_feed` call shape.
+
+    Pass an instance as the `client` of ETL.clients.bluesky.Client. Each feed
+    URI sees its own rotation of the corpus, with `overlap` of its posts shared
+    with the next feed so de-duplication is exercised. Cursors are page offsets
+    and `latency` seconds are slept per call to stand in for network time.
+
+    With `fresh_walks`, every walk from the top of a feed (no cursor) serves
+    the corpus under new URIs, like a live feed turning over between runs.
+    `login` accepts any credentials so the client's authenticate() succeeds.
+    """
+
+    def __init__(self, posts=None, path='data/posts.json', latency=0.0, overlap=0.25,
+                 max_pages=None, fresh_walks=False):
+        self.posts = posts if posts is not None else load_recorded_posts(path)
+        self.latency = latency
+        self.overlap = overlap
+        self.max_pages = max_pages
+        self.fresh_walks = fresh_walks
+        self.calls = 0
+        self._feeds = {}
+        self._walks = Counter()
+
+        # Mirror the attribute chain used by the real client
+        self.app = SimpleNamespace(bsky=SimpleNamespace(feed=SimpleNamespace(get_feed=self.get_feed)))
+
+    def _offset(self, feed_uri):
+        """Starting offset of a feed's rotation of the corpus"""
+        if feed_uri not in self._feeds:
+            self._feeds[feed_uri] = len(self._feeds)
+        step = max(1, int(len(self.posts) * (1 - self.overlap) / 4))
+        return (self._feeds[feed_uri] * step) % max(1, len(self.posts))
+
+    def login(self, login=None, password=None, session_string=None, **kwargs):
+        return SimpleNamespace(handle=login or 'recorded.test', did='did:plc:recorded')
+
+    def get_feed(self, params):
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+        limit = params.limit or 50
+        page = int(params.cursor) if params.cursor else 0
+        offset = self._offset(params.feed)
+        if page == 0:
+            self._walks[params.feed] += 1
+        walk = self._walks[params.feed]
+
+        items = []
+        for i in range(page * limit, (page + 1) * limit):
+            if i >= len(self.posts):
+                break
+            post = self.posts[(offset + i) % len(self.posts)]
+            if self.fresh_walks and walk > 1:
+                post = dict(post, uri=f"{post['uri']}-{walk - 1}")
+            items.append(_feed_item(post))
+
+        has_more = (page + 1) * limit < len(self.posts)
+        if self.max_pages is not None and page + 1 >= self.max_pages:
+            has_more = False
+
+        return SimpleNamespace(feed=items, cursor=str(page + 1) if has_more else None)
+
+
+class RecordedEncoder:
+    """
+    Stands in for ETL.feature_engineering.encoder without loading any model.
+
+    `transform` has the encoder's signature and return shape. Texts from the
+    recorded corpus get their exported UMAP1/UMAP2 back (so density and the
+    exported map look like the real thing); other texts and the remaining
+    components are drawn from a generator seeded by a hash of the text, so
+    the same text always lands in the same place. `seconds_per_text` is slept
+    per batch to stand in for the model's encoding time.
+    """
+
+    def __init__(self, posts=None, path='data/posts.json', seconds_per_text=0.0):
+        posts = posts if posts is not None else load_recorded_posts(path)
+        self.recorded = {
+            post['text']: (post['UMAP1'], post['UMAP2'])
+            for post in posts
+            if post.get('text') and post.get('UMAP1') is not None and post.get('UMAP2') is not None
+        }
+        self.seconds_per_text = seconds_per_text
+        self.texts_encoded = 0
+
+    def _coordinates(self, text, components):
+        seed = int.from_bytes(hashlib.blake2b(text.encode('utf-8'), digest_size=8).digest(), 'little')
+        rng = random.Random(seed)
+        coordinates = [rng.uniform(-10.0, 10.0) for _ in range(components)]
+        recorded = self.recorded.get(text)
+        if recorded is not None:
+            coordinates[:len(recorded)] = recorded[:components]
+        return coordinates
+
+    def transform(self, texts, umap_components=5, **kwargs):
+        import numpy as np
+
+        valid_indices = [i for i, text in enumerate(texts)
+                         if text and isinstance(text, str) and text.strip()]
+        if not valid_indices:
+            return valid_indices, None
+        if self.seconds_per_text:
+            time.sleep(self.seconds_per_text * len(valid_indices))
+        self.texts_encoded += len(valid_indices)
+        return valid_indices, np.array([self._coordinates(texts[i], umap_components) for i in valid_indices])
+
+
+def jetstream_message(post, time_us, did='did:plc:recorded'):
+    """Build a raw Jetstream commit message (JSON string) for an exported post record"""
+    rkey = post['uri'].rsplit('/', 1)[-1]
+    return json.dumps({
+        'did': did,
+        'time_us': time_us,
+        'kind': 'commit',
+        'commit': {
+            'rev': rkey,
+            'operation': 'create',
+            'collection': 'app.bsky.feed.post',
+            'rkey': rkey,
+            'record': {
+                '$type': 'app.bsky.feed.post',
+                'createdAt': post.get('created_at'),
+                'langs': post.get('langs', ['en']),
+                'text': post.get('text')
+            }
+        }
+    })
+
+
+def write_capture(path, posts=None, events=10000, rate=50.0, start_us=None):
+    """
+    Write a Jetstream capture file replaying recorded posts at `rate` events/second
+
+    Posts are cycled (with distinct record keys) until `events` messages are written.
+    """
+    posts = posts if posts is not None else load_recorded_posts()
+    start_us = start_us or int(time.time() * 1e6)
+    step_us = int(1e6 / rate)
+
+    with open(path, 'w') as f:
+        for i in range(events):
+            post = dict(posts[i % len(posts)])
+            post['uri'] = f"{post['uri']}-{i // len(posts)}"
+            f.write(jetstream_message(post, start_us + i * step_us) + '\n')
+    return events
@@ -0,0 +1,130 @@
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+import pandas as pd
+import pyarrow as pa
+
+
+class PostRecord:
+    """
+    One collected post.
+
+    Uses `__slots__` so a page of posts costs one small object each instead
+    of an 11-key dict. Mapping-style access (`post['uri']`, `post.get(...)`)
+    still works for callers written against the old dict records.
+    """
+
+    __slots__ = ('uri', 'text', 'author', 'created_at', 'like_count', 'repost_count',
+                 'reply_count', 'fetched_at', 'source', 'feed_uri', 'event_time_us')
+
+    def __init__(self, uri: str, text: str, author: Optional[str], created_at: Optional[str],
+                 like_count: int = 0, repost_count: int = 0, reply_count: int = 0,
+                 fetched_at: Optional[str] = None, source: Optional[str] = None,
+                 feed_uri: Optional[str] = None, event_time_us: Optional[int] = None):
+        self.uri = uri
+        self.text = text
+        self.author = author
+        self.created_at = created_at
+        self.like_count = like_count
+        self.repost_count = repost_count
+        self.reply_count = reply_count
+        self.fetched_at = fetched_at
+        self.source = source
+        self.feed_uri = feed_uri
+        self.event_time_us = event_time_us
+
+    @property
+    def engagement_score(self) -> int:
+        return self.like_count + self.repost_count + self.reply_count
+
+    @property
+    def text_length(self) -> int:
+        return len(self.text)
+
+    def __getitem__(self, key: str) -> Any:
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return getattr(self, key, default)
+
+    def to_dict(self) -> Dict[str, Any]:
+        record = {name: getattr(self, name) for name in self.__slots__}
+        record['engagement_score'] = self.engagement_score
+        record['text_length'] = self.text_length
+        return record
+
+    def __repr__(self) -> str:
+        return f"<PostRecord {self.uri}>"
+
+
+def parse_feed_item(item, post_filter, min_length: Optional[int] = None, source: str = 'custom_feed',
+                    feed_uri: Optional[str] = None, fetched_at: Optional[str] = None) -> Optional[PostRecord]:
+    """
+    Filter one FeedViewPost and build its PostRecord, or None if it is rejected
+
+    Shared by every feed collection path so filtering and field mapping live
+    in one place. Pass `fetched_at` once per page rather than per post.
+    """
+    post = item.post
+    record = post.record
+    clean_text = post_filter.clean(record.text, getattr(record, 'langs', None), min_length=min_length)
+    if clean_text is None:
+        return None
+
+    return PostRecord(
+        uri=post.uri,
+        text=clean_text,
+        author=post.author.handle,
+        created_at=record.created_at,
+        like_count=post.like_count or 0,
+        repost_count=post.repost_count or 0,
+        reply_count=post.reply_count or 0,
+        fetched_at=fetched_at or datetime.now().isoformat(),
+        source=source,
+        feed_uri=feed_uri
+    )
+
+
+class PostBatch:
+    """
+    Column-oriented view of a list of posts, for the encoder and the loader.
+
+    Built once from PostRecords (or legacy dict records) with one list per
+    field, so texts go to the encoder and columns go to pandas/Arrow without
+    per-row dict round trips.
+    """
+
+    FIELDS = PostRecord.__slots__
+
+    def __init__(self, columns: Dict[str, List[Any]]):
+        self.columns = columns
+
+    @classmethod
+    def from_records(cls, records: Sequence, fields: Iterable[str] = FIELDS) -> 'PostBatch':
+        fields = tuple(fields)
+        if records and isinstance(records[0], dict):
+            columns = {name: [record.get(name) for record in records] for name in fields}
+        else:
+            columns = {name: [getattr(record, name) for record in records] for name in fields}
+        return cls(columns)
+
+    def __len__(self) -> int:
+        return len(next(iter(self.columns.values()), []))
+
+    def column(self, name: str) -> List[Any]:
+        return self.columns[name]
+
+    @property
+    def texts(self) -> List[str]:
+        return self.columns['text']
+
+    def to_dataframe(self, columns: Optional[Iterable[str]] = None) -> pd.DataFrame:
+        names = [name for name in (columns or self.columns) if name in self.columns]
+        return pd.DataFrame({name: self.columns[name] for name in names})
+
+    def to_arrow(self, columns: Optional[Iterable[str]] = None) -> pa.Table:
+        names = [name for name in (columns or self.columns) if name in self.columns]
+        return pa.table({name: self.columns[name] for name in names})
@@ -0,0 +1,198 @@
+import logging
+import random
+import threading
+import time
+from typing import Any, Dict, Optional
+
+import httpx
+from atproto_client.request import Request, _handle_request_errors, _handle_response
+
+# Statuses worth retrying: rate limited, or a transient server/proxy failure
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+RETRY_EXCEPTIONS = (httpx.TimeoutException, httpx.NetworkError, httpx.RemoteProtocolError)
+
+
+class RateLimitPacer:
+    """
+    Tracks the server's RateLimit-* headers and spaces requests out before the limit is hit.
+
+    While more than `reserve` of the window's quota remains, requests go out
+    immediately. Below that, each request waits its share of the time left
+    until the window resets (remaining quota spread evenly over the rest of
+    the window), and with nothing left it waits for the reset itself.
+    """
+
+    def __init__(self, reserve: float = 0.1, max_wait: float = 60.0):
+        self.reserve = reserve
+        self.max_wait = max_wait
+        self.limit = None
+        self.remaining = None
+        self.reset_at = None
+        self._next_at = 0.0
+        self._lock = threading.Lock()
+
+    def update(self, headers: httpx.Headers):
+        """Record the quota reported by a response"""
+        try:
+            limit = int(headers['ratelimit-limit'])
+            remaining = int(headers['ratelimit-remaining'])
+            reset = float(headers['ratelimit-reset'])
+        except (KeyError, ValueError):
+            return
+
+        # Bluesky sends the reset as a Unix timestamp; treat small values as seconds from now
+        reset_at = reset if reset > 1e9 else time.time() + reset
+        with self._lock:
+            self.limit, self.remaining, self.reset_at = limit, remaining, reset_at
+
+    def block_until(self, reset_at: float):
+        """Hold all requests until `reset_at` (e.g. after a 429)"""
+        with self._lock:
+            self.remaining = 0
+            self.reset_at = max(self.reset_at or 0.0, reset_at)
+
+    def delay(self) -> float:
+        """Seconds the next request should wait; reserves its slot in the schedule"""
+        with self._lock:
+            now = time.time()
+            if self.reset_at is None or self.reset_at <= now:
+                return 0.0
+
+            window_left = self.reset_at - now
+            if self.remaining <= 0:
+                wait = window_left
+            elif self.remaining > self.limit * self.reserve:
+                return 0.0
+            else:
+                # Spread what is left of the quota over what is left of the window
+                interval = window_left / self.remaining
+                start = max(now, self._next_at)
+                self._next_at = start + interval
+                self.remaining -= 1
+                wait = start - now
+
+            return min(wait, self.max_wait)
+
+
+class RateLimitedRequest(Request):
+    """
+    atproto request layer with a pooled httpx client, retries and rate-limit pacing.
+
+    Drop-in `request` for `atproto.Client`: every XRPC call goes through
+    `_send_request`, which waits on the pacer, retries 429s and transient
+    5xx/network errors with full-jitter exponential backoff (honouring
+    Retry-After and RateLimit-Reset), and then hands the final response to
+    atproto's usual error mapping. `stats()` reports requests, retries and
+    time spent waiting.
+    """
+
+    def __init__(self, max_retries: int = 4, backoff_base: float = 0.5, backoff_max: float = 30.0,
+                 max_connections: int = 10, timeout: float = 10.0, pacer: Optional[RateLimitPacer] = None,
+                 **kwargs: Any):
+        self._transport_options = dict(max_retries=max_retries, backoff_base=backoff_base,
+                                       backoff_max=backoff_max, max_connections=max_connections,
+                                       timeout=timeout)
+        client_kwargs = dict(kwargs)
+        kwargs.setdefault('limits', httpx.Limits(max_connections=max_connections,
+                                                 max_keepalive_connections=max_connections))
+        kwargs.setdefault('timeout', timeout)
+        super().__init__(**kwargs)
+        # clone() rebuilds the defaults from the transport options
+        self._client_kwargs = client_kwargs
+
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.pacer = pacer or RateLimitPacer()
+        self._stats_lock = threading.Lock()
+        self.reset_stats()
+
+    def _new_instance(self):
+        # Clones share the pacer: the quota belongs to the account, not the connection pool
+        return type(self)(pacer=self.pacer, **self._transport_options, **self._client_kwargs)
+
+    def reset_stats(self):
+        with self._stats_lock:
+            self._stats = {'requests': 0, 'attempts': 0, 'retries': 0, 'rate_limited': 0,
+                           'server_errors': 0, 'network_errors': 0, 'failures': 0,
+                           'pacing_seconds': 0.0, 'backoff_seconds': 0.0}
+
+    def _count(self, key: str, amount=1):
+        with self._stats_lock:
+            self._stats[key] += amount
+
+    def stats(self) -> Dict[str, Any]:
+        """Request, retry and wait counters since the last reset, plus the last known quota"""
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats['pacing_seconds'] = round(stats['pacing_seconds'], 3)
+        stats['backoff_seconds'] = round(stats['backoff_seconds'], 3)
+        stats['ratelimit_remaining'] = self.pacer.remaining
+        stats['ratelimit_limit'] = self.pacer.limit
+        return stats
+
+    def _backoff(self, attempt: int, response: Optional[httpx.Response] = None) -> float:
+        """Seconds to wait before retry `attempt` (1-based)"""
+        if response is not None:
+            retry_after = response.headers.get('retry-after')
+            if retry_after:
+                try:
+                    return min(float(retry_after), self.backoff_max)
+                except ValueError:
+                    pass
+            if response.status_code == 429 and self.pacer.reset_at:
+                return min(max(0.0, self.pacer.reset_at - time.time()), self.backoff_max)
+
+        # Full jitter keeps concurrent feed workers from retrying in lockstep
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** (attempt - 1)))
+
+    def _send_request(self, method: str, url: str, **kwargs: Any) -> httpx.Response:
+        headers = self.get_headers(kwargs.pop('headers', None))
+        self._count('requests')
+
+        attempt = 0
+        while True:
+            wait = self.pacer.delay()
+            if wait > 0:
+                self._count('pacing_seconds', wait)
+                time.sleep(wait)
+
+            attempt += 1
+            self._count('attempts')
+            try:
+                response = self._client.request(method=method, url=url, headers=headers, **kwargs)
+            except RETRY_EXCEPTIONS as e:
+                self._count('network_errors')
+                if attempt > self.max_retries:
+                    self._count('failures')
+                    _handle_request_errors(e)
+                    raise
+                self._retry(method, url, attempt, f"{type(e).__name__}")
+                continue
+
+            self.pacer.update(response.headers)
+            if response.status_code not in RETRY_STATUSES:
+                return _handle_response(response)
+
+            if response.status_code == 429:
+                self._count('rate_limited')
+            else:
+                self._count('server_errors')
+            if attempt > self.max_retries:
+                self._count('failures')
+                return _handle_response(response)
+
+            delay = self._backoff(attempt, response)
+            if response.status_code == 429:
+                self.pacer.block_until(time.time() + delay)
+            self._retry(method, url, attempt, f"HTTP {response.status_code}", delay)
+
+    def _retry(self, method: str, url: str, attempt: int, reason: str, delay: Optional[float] = None):
+        if delay is None:
+            delay = self._backoff(attempt)
+        self._count('retries')
+        self._count('backoff_seconds', delay)
+        self.logger.warning(f"{method} {url.rsplit('/', 1)[-1]} failed ({reason}); "
+                            f"retry {attempt}/{self.max_retries} in {delay:.2f}s")
+        time.sleep(delay)
@@ -1,14 +1,30 @@
 import os
 import json
+import asyncio
 import logging
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
 import pandas as pd
+import pyarrow as pa
 from datetime import datetime, timedelta
 import sys
+import time
 
-from ETL.clients.bluesky import Client as BlueskyClient
-from ETL.clients.bigQuery import Client as BigQueryClient
-from ETL.feature_engineering import encoder
-from ETL.feature_engineering import density
+from ETL.clients.arrow import to_dataframe
+from ETL.clients.records import PostBatch
+from ETL.export import ExportWriter, lod_tiers
+from ETL.pipeline import Pipeline, Stage
+from ETL import tracing
+from ETL.tracing import Tracer, traced
+from ETL.storage.cost import ByteBudgetExceeded, QueryLedger
+from ETL.storage.state import (
+    StateStore, LAST_DENSITY_SLICE, LAST_EXPORT, LAST_STREAM_CURSOR
+)
+from ETL.storage.seen import SeenIndex
+# Only light dependencies at module level: the Bluesky client (atproto) and
+# density (scipy) are imported by the stages that use them, and the encoder
+# defers torch/sentence-transformers/UMAP until posts are embedded
+from ETL.feature_engineering import encoder as default_encoder
 from dotenv import load_dotenv
 
 # Load environment variables from .env file
@@ -17,28 +33,85 @@ load_dotenv()
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 
+# Column types applied at the Arrow level (BigQuery returns some of these as strings)
+UMAP_TYPES = {f'UMAP{i}': pa.float64() for i in range(1, 6)}
+DENSITY_TYPES = {
+    'x': pa.float64(),
+    'y': pa.float64(),
+    'density': pa.float64(),
+    'posts_count': pa.int64()
+}
+POSTS_EXPORT_TYPES = {
+    'like_count': pa.int64(),
+    'reply_count': pa.int64(),
+    'repost_count': pa.int64(),
+    'UMAP1': pa.float64(),
+    'UMAP2': pa.float64()
+}
+# Counts refreshed in place for posts that are already stored
+ENGAGEMENT_COLUMNS = ['like_count', 'repost_count', 'reply_count']
+
 class ATProtoETL:
     """
     AT Proto Synoptic Chart ETL Pipeline
     Collects Bluesky posts, generates UMAP embeddings, and calculates density grids.
     """
     
-    def __init__(self):
+    def __init__(self, storage=None, bluesky_client=None, encoder=None):
         self.logger = logging.getLogger(self.__class__.__name__)
         
-        # Load environment variables
-        self.bigquery_credentials = json.loads(os.environ['BIGQUERY_CREDENTIALS_JSON'])
-        self.project_id = os.environ['BIGQUERY_PROJECT_ID']
-        self.dataset_id = os.environ['BIGQUERY_DATASET_ID']
-        self.posts_table = os.environ['BIGQUERY_TABLE_ID_POSTS']
-        self.density_table = os.environ['BIGQUERY_TABLE_ID_DENSITY']
+        # Storage backend: 'bigquery' (default) or 'duckdb' for a local embedded database
+        self.storage_backend = os.environ.get('ETL_STORAGE_BACKEND', 'bigquery').lower()
+        self.posts_table = os.environ.get('BIGQUERY_TABLE_ID_POSTS', 'posts')
+        self.density_table = os.environ.get('BIGQUERY_TABLE_ID_DENSITY', 'density')
+        self.state_table = os.environ.get('BIGQUERY_TABLE_ID_STATE', 'etl_state')
+        
+        # Optional per-run cap on bytes scanned by queries.
+        # 'degrade' skips the stage that would exceed it, 'abort' fails the run.
+        byte_budget = os.environ.get('ETL_QUERY_BYTE_BUDGET')
+        self.query_byte_budget = int(byte_budget) if byte_budget else None
+        self.query_budget_mode = os.environ.get('ETL_QUERY_BUDGET_MODE', 'degrade').lower()
+        
+        # Independent queries run concurrently, each bounded by a timeout
+        self.query_workers = int(os.environ.get('ETL_QUERY_WORKERS', 4))
+        self.query_timeout_seconds = float(os.environ.get('ETL_QUERY_TIMEOUT_SECONDS', 300))
         
-        # Initialize clients
-        self.bluesky_client = None
-        self.bigquery_client = None
+        # Initialize clients; injected ones (e.g. the offline fakes) are used as given
+        self.bluesky_client = bluesky_client
+        self.storage = storage
+        self.state = None
+        self.encoder = encoder or default_encoder
+        
+        # Seen-URI index persisted between runs; rebuilt from the posts table
+        # (last seen_rebuild_hours of collections) when the file is missing
+        self.seen_index = None
+        self.seen_index_path = os.environ.get('ETL_SEEN_INDEX_PATH', 'data/local/seen_uris.bin')
+        self.seen_rebuild_hours = int(os.environ.get('ETL_SEEN_REBUILD_HOURS', 24))
         
         # ETL configuration
         self.batch_size = 100
+        # Feeds (POPULAR_FEEDS names or URIs) collected concurrently, each walked up to feed_pages pages
+        self.feeds = [f.strip() for f in os.environ.get('BLUESKY_FEEDS', 'hot_classic').split(',') if f.strip()]
+        self.feed_pages = int(os.environ.get('BLUESKY_FEED_PAGES', 1))
+        self.feed_workers = int(os.environ.get('BLUESKY_FEED_WORKERS', 4))
+        # Streaming mode (Jetstream): posts are batched by count or age before transform/load
+        self.stream_batch_size = int(os.environ.get('ETL_STREAM_BATCH_SIZE', 100))
+        self.stream_batch_seconds = float(os.environ.get('ETL_STREAM_BATCH_SECONDS', 30))
+        self.stream_queue_size = int(os.environ.get('ETL_STREAM_QUEUE_SIZE', 1000))
+        # Posts from stream batches whose load failed, retried with the next batch
+        self.stream_pending = []
+        # Exported visualization files (manifest.json, density/, posts/, last_update.json)
+        self.data_dir = os.environ.get('ETL_DATA_DIR', 'data')
+        # Hours of history exported (older density slices are kept at lower detail, see
+        # ETL.export.lod_tiers), most recent posts exported, and what the latest export wrote
+        self.export_window_hours = float(os.environ.get('ETL_EXPORT_WINDOW_HOURS', 24))
+        self.export_posts_limit = 5000
+        self.export_stats = None
+        # Per-run span reports (JSON) and optional Prometheus textfile metrics
+        self.trace_dir = os.environ.get('ETL_TRACE_DIR', 'data/local/traces')
+        self.metrics_dir = os.environ.get('ETL_METRICS_DIR')
+        # Pages buffered between pipelined collection stages (fetch, filter, encode, load)
+        self.pipeline_queue_size = int(os.environ.get('ETL_PIPELINE_QUEUE_SIZE', 2))
         self.density_interval_minutes = 30
         self.export_interval_minutes = 60
         self.essential_columns = [
@@ -46,15 +119,54 @@ class ATProtoETL:
             'created_at', 'collected_at', 'UMAP1', 'UMAP2', 'UMAP3', 'UMAP4', 'UMAP5'
         ]
     
+    def now(self):
+        """Current pipeline time (UTC)"""
+        return pd.Timestamp.now(tz='UTC')
+    
+    def _build_storage(self):
+        """Build the configured storage backend"""
+        ledger = QueryLedger(byte_budget=self.query_byte_budget)
+        
+        if self.storage_backend == 'duckdb':
+            from ETL.storage.local import DuckDBStorage
+            return DuckDBStorage(
+                os.environ.get('ETL_DUCKDB_PATH', 'data/local/warehouse.duckdb'),
+                ledger=ledger
+            )
+        
+        if self.storage_backend == 'bigquery':
+            from ETL.storage.bigquery import BigQueryStorage
+            return BigQueryStorage(
+                json.loads(os.environ['BIGQUERY_CREDENTIALS_JSON']),
+                os.environ['BIGQUERY_PROJECT_ID'],
+                os.environ['BIGQUERY_DATASET_ID'],
+                ledger=ledger
+            )
+        
+        raise ValueError(f"Unknown storage backend: {self.storage_backend}")
+    
+    def initialize_storage(self):
+        """Initialize the storage backend and state store"""
+        if self.storage is None:
+            self.storage = self._build_storage()
+        self.storage.set_query_timeout(self.query_timeout_seconds)
+        if self.state is None:
+            self.state = StateStore(self.storage, self.state_table)
+    
     def initialize_clients(self):
-        """Initialize Bluesky and BigQuery clients"""
+        """Initialize Bluesky client and storage backend"""
         self.logger.info("Initializing clients")
         
-        self.bluesky_client = BlueskyClient()
-        self.bigquery_client = BigQueryClient(self.bigquery_credentials, self.project_id)
+        # Kept across runs so a long-running process reuses its session and connection pool
+        if self.bluesky_client is None:
+            from ETL.clients.bluesky import Client as BlueskyClient
+            self.bluesky_client = BlueskyClient()
+        self.initialize_storage()
         
         # Authenticate with Bluesky
-        if not self.bluesky_client.authenticate():
+        with tracing.span('auth'):
+            authenticated = self.bluesky_client.authenticate()
+        if not authenticated:
             raise Exception("Failed to authenticate with Bluesky API")
         
         self.logger.info("Successfully authenticated with all clients")
@@ -63,9 +175,12 @@ class ATProtoETL:
         """Extract posts from Bluesky"""
         self.logger.info("Extracting posts from Bluesky")
         
-        posts = self.bluesky_client.fetch_popular_posts(
+        posts = self.bluesky_client.fetch_feeds(
+            self.feeds,
+            pages=self.feed_pages,
             limit=self.batch_size,
-            min_length=30
+            min_length=30,
+            max_workers=self.feed_workers
         )
         
         if not posts:
@@ -75,80 +190,217 @@ class ATProtoETL:
         self.logger.info(f"Retrieved {len(posts)} posts from Bluesky")
         return posts
     
+    def collect_posts(self):
+        """
+        Extract, transform and load posts page by page as a pipeline
+        
+        Feed pages flow through bounded queues from the fetchers to the
+        seen-URI filter, the encoder and the loader, each stage on its own
+        thread, so the next page is fetched while one is encoded and the
+        previous one is loaded. Stage errors stop the pipeline and are raised.
+        
+        Returns:
+            Dict with posts fetched, new and loaded, the repeat posts (for the
+            engagement refresh) and the pipeline's per-stage stats
+        """
+        self.logger.info("Collecting posts from Bluesky")
+        counts = {'fetched': 0, 'new': 0}
+        repeat_posts = []
+        # URIs passed downstream but possibly not loaded (so not in the seen index) yet
+        in_flight = set()
+        
+        def filter_seen(posts):
+            with tracing.span('filter', items=len(posts)):
+                counts['fetched'] += len(posts)
+                new_posts, repeats = self.filter_seen_posts(posts)
+                repeats.extend(post for post in new_posts if post['uri'] in in_flight)
+                new_posts = [post for post in new_posts if post['uri'] not in in_flight]
+                in_flight.update(post['uri'] for post in new_posts)
+                counts['new'] += len(new_posts)
+                repeat_posts.extend(repeats)
+            return new_posts or None
+        
+        def load(posts_df):
+            self.load_posts(posts_df)
+            return posts_df
+        
+        pages = self.bluesky_client.iter_feed_pages(
+            self.feeds,
+            pages=self.feed_pages,
+            limit=self.batch_size,
+            min_length=30,
+            max_workers=self.feed_workers,
+            max_pending=self.pipeline_queue_size
+        )
+        filter_before = self.bluesky_client.post_filter.stats()
+        pipeline = Pipeline(
+            tracing.traced_iter('fetch', pages, size=len),
+            [Stage('filter_seen', filter_seen), Stage('transform', self.transform_posts), Stage('load', load)],
+            queue_size=self.pipeline_queue_size,
+            size=len
+        )
+        pipeline_stats = pipeline.run()
+        
+        # The content filter runs inside the page fetches; report its share separately
+        filter_after = self.bluesky_client.post_filter.stats()
+        filter_ms = sum(stage['ms'] for stage in filter_after['stages'].values()) \
+            - sum(stage['ms'] for stage in filter_before['stages'].values())
+        tracing.record('content_filter', filter_ms / 1000,
+                       items=filter_after['stages']['empty']['checked'] - filter_before['stages']['empty']['checked'])
+        
+        self.logger.info(f"Collected {counts['fetched']} posts, loaded {pipeline_stats['units']} "
+                         f"at {pipeline_stats['units_per_minute']} posts/min")
+        return {
+            'fetched': counts['fetched'],
+            'new': counts['new'],
+            'loaded': pipeline_stats['units'],
+            'repeat_posts': repeat_posts,
+            'pipeline': pipeline_stats
+        }
+    
+    def load_seen_index(self):
+        """Load the seen-URI index from disk, rebuilding it from storage if needed"""
+        if self.seen_index is not None:
+            return
+        
+        self.seen_index = SeenIndex(self.seen_index_path)
+        if self.seen_index.load():
+            return
+        
+        try:
+            recent = self.storage.read_window(
+                self.posts_table,
+                columns=['uri'],
+                time_column='collected_at',
+                since=self.now() - timedelta(hours=self.seen_rebuild_hours),
+                query_name='seen_index_rebuild'
+            )
+            self.seen_index.rebuild(recent.column('uri').to_pylist())
+        except ByteBudgetExceeded as e:
+            self._handle_budget_exceeded("seen-URI index rebuild", e)
+        except Exception as e:
+            self.logger.warning(f"Could not rebuild seen-URI index, starting empty: {e}")
+    
+    def filter_seen_posts(self, posts):
+        """Split fetched posts into those not yet stored and repeats"""
+        new_posts, repeat_posts = self.seen_index.partition(posts)
+        
+        self.logger.info(f"Seen-URI index: {len(new_posts)} new posts, "
+                         f"{len(repeat_posts)} already stored")
+        return new_posts, repeat_posts
+    
+    @traced('engagement')
+    def refresh_engagement(self, posts):
+        """
+        Update engagement counts of already-stored posts in one batched upsert
+        
+        Repeat posts skip the encoder and are not appended again; only their
+        like/repost/reply counts are overwritten in the posts table.
+        
+        Returns:
+            Number of stored rows updated
+        """
+        engagement_df = PostBatch.from_records(posts, ['uri'] + ENGAGEMENT_COLUMNS).to_dataframe()
+        engagement_df = engagement_df.dropna(subset=ENGAGEMENT_COLUMNS, how='all')
+        engagement_df = engagement_df.drop_duplicates('uri', keep='last')
+        # Whole counts, so STRING-typed legacy columns get '4' rather than '4.0'
+        engagement_df[ENGAGEMENT_COLUMNS] = engagement_df[ENGAGEMENT_COLUMNS].astype('Int64')
+        
+        if engagement_df.empty:
+            return 0
+        
+        self.logger.info(f"Refreshing engagement counts for {len(engagement_df)} stored posts")
+        updated = self.storage.update_counts(
+            engagement_df, self.posts_table, key='uri', columns=ENGAGEMENT_COLUMNS,
+            query_name='engagement_refresh'
+        )
+        
+        if updated:
+            self.state.advance_watermark('engagement', self.now())
+        return updated
+    
     def transform_posts(self, posts):
         """Transform posts by adding UMAP embeddings and cleaning columns"""
         self.logger.info("Transforming posts with UMAP embeddings")
         
-        # Convert to DataFrame and add timestamp
-        posts_df = pd.DataFrame(posts)
-        posts_df['collected_at'] = pd.Timestamp.now(tz='UTC')
-        
-        # Convert timestamp columns to proper datetime, then back to string for BigQuery compatibility
-        if 'created_at' in posts_df.columns:
-            posts_df['created_at'] = pd.to_datetime(posts_df['created_at'], format='ISO8601', utc=True)
-            posts_df['created_at'] = posts_df['created_at'].dt.strftime('%Y-%m-%d %H:%M:%S UTC')
+        with tracing.span('sanitize', items=len(posts)):
+            # One columnar pass over the records; texts go straight to the encoder
+            batch = PostBatch.from_records(posts)
+            posts_df = batch.to_dataframe(
+                [col for col in self.essential_columns if not col.startswith('UMAP')]
+            )
+            posts_df['collected_at'] = self.now()
+            
+            # Convert timestamp columns to proper datetime, then back to string for BigQuery compatibility
+            if 'created_at' in posts_df.columns:
+                posts_df['created_at'] = pd.to_datetime(posts_df['created_at'], format='ISO8601', utc=True)
+                posts_df['created_at'] = posts_df['created_at'].dt.strftime('%Y-%m-%d %H:%M:%S UTC')
         
         # Generate UMAP embeddings using saved parametric model
         try:
-            embedded_posts = encoder.run(
-                posts_df.to_dict('records'), 
+            encode_started = time.perf_counter()
+            valid_indices, coordinates = self.encoder.transform(
+                batch.texts,
                 use_parametric=True,
                 umap_model_path='hf://notMuhammad/atproto-topic-umap',
-                skip_embedding=False,
                 use_pca=False
             )
             
-            embedded_df = pd.DataFrame(embedded_posts)
+            if self.seen_index is not None:
+                self.seen_index.record_encode_time(time.perf_counter() - encode_started, len(posts_df))
             
-            if 'UMAP1' not in embedded_df.columns:
+            if coordinates is None:
                 self.logger.error("UMAP embedding failed - no UMAP coordinates found")
                 # Keep only essential columns without UMAP
-                essential_cols_no_umap = [col for col in self.essential_columns 
-                                        if col in posts_df.columns and not col.startswith('UMAP')]
-                return posts_df[essential_cols_no_umap]
+                return posts_df
             
             self.logger.info("Successfully generated UMAP embeddings using parametric model")
             
+            # Posts without encodable text keep NaN coordinates
+            umap = np.full((len(posts_df), coordinates.shape[1]), np.nan)
+            umap[valid_indices] = coordinates
+            for component in range(coordinates.shape[1]):
+                posts_df[f'UMAP{component + 1}'] = umap[:, component]
+            
             # Keep only essential columns including UMAP coordinates
-            available_cols = [col for col in self.essential_columns if col in embedded_df.columns]
-            return embedded_df[available_cols]
+            available_cols = [col for col in self.essential_columns if col in posts_df.columns]
+            return posts_df[available_cols]
             
         except Exception as e:
             self.logger.error(f"Error generating UMAP embeddings: {str(e)}")
             # Keep only essential columns without UMAP
-            essential_cols_no_umap = [col for col in self.essential_columns 
-                                    if col in posts_df.columns and not col.startswith('UMAP')]
-            return posts_df[essential_cols_no_umap]
+            return posts_df
     
     def load_posts(self, posts_df):
-        """Load posts to BigQuery"""
-        self.logger.info("Loading posts to BigQuery")
+        """Load posts to storage"""
+        self.logger.info(f"Loading posts to {self.storage.name}")
         
-        self.bigquery_client.append(
-            posts_df,
-            self.dataset_id,
-            self.posts_table,
-            create_if_not_exists=True
-        )
+        with tracing.span('load', items=len(posts_df)):
+            self.storage.append(posts_df, self.posts_table, create_if_not_exists=True)
+        self.state.advance_watermark('posts', posts_df['collected_at'].max())
+        if self.seen_index is not None:
+            self.seen_index.add(posts_df['uri'])
         
-        self.logger.info(f"Successfully loaded {len(posts_df)} posts to BigQuery")
+        self.logger.info(f"Successfully loaded {len(posts_df)} posts to {self.storage.name}")
     
     def should_calculate_density(self):
         """Check if density should be calculated based on timing"""
         try:
-            query = f"""
-            SELECT MAX(calculated_at) as last_calculation
-            FROM `{self.project_id}.{self.dataset_id}.{self.density_table}`
-            """
+            last_calculation = self.state.get_timestamp(LAST_DENSITY_SLICE)
             
-            result = self.bigquery_client.execute_query(query)
+            if last_calculation is None:
+                # Bootstrap from the density table once; afterwards the state store has it
+                last_calculation = self.storage.latest_timestamp(
+                    self.density_table, 'calculated_at', query_name='density_last_calculation'
+                )
+                if last_calculation is not None:
+                    self.state.set(LAST_DENSITY_SLICE, last_calculation)
             
-            if len(result) == 0 or pd.isna(result.iloc[0]['last_calculation']):
+            if last_calculation is None:
                 self.logger.info("No previous density calculation found - will calculate")
                 return True
             
-            last_calculation = pd.to_datetime(result.iloc[0]['last_calculation'], utc=True)
-            time_since_last = pd.Timestamp.now(tz='UTC') - last_calculation
+            time_since_last = self.now() - last_calculation
             
             should_calculate = time_since_last > timedelta(minutes=self.density_interval_minutes)
             
@@ -158,6 +410,8 @@ class ATProtoETL:
             
             return should_calculate
             
+        except (ByteBudgetExceeded, TimeoutError):
+            raise
         except Exception as e:
             self.logger.warning(f"Error checking last density calculation, will calculate: {e}")
             return True
@@ -165,17 +419,22 @@ class ATProtoETL:
     def should_export_data(self):
         """Check if data export should happen based on timing (hourly)"""
         try:
-            # Check if last_update.json exists and when it was created
-            import os
-            if not os.path.exists('data/last_update.json'):
+            last_export = self.state.get_timestamp(LAST_EXPORT)
+            
+            # Fall back to last_update.json written by exports that predate the state store
+            last_update_path = os.path.join(self.data_dir, 'last_update.json')
+            if last_export is None and os.path.exists(last_update_path):
+                with open(last_update_path, 'r') as f:
+                    update_info = json.load(f)
+                last_export = pd.to_datetime(update_info['last_update']).tz_localize(
+                    datetime.now().astimezone().tzinfo
+                ).tz_convert('UTC')
+            
+            if last_export is None:
                 self.logger.info("No previous export found - will export")
                 return True
             
-            with open('data/last_update.json', 'r') as f:
-                update_info = json.load(f)
-            
-            last_export = pd.to_datetime(update_info['last_update'])
-            time_since_last = pd.Timestamp.now() - last_export
+            time_since_last = self.now() - last_export
             
             should_export = time_since_last > timedelta(minutes=self.export_interval_minutes)
             
@@ -189,36 +448,42 @@ class ATProtoETL:
             self.logger.warning(f"Error checking last export, will export: {e}")
             return True
     
+    @traced('density')
     def calculate_and_load_density(self):
-        """Calculate density from recent posts and load to BigQuery"""
+        """Calculate density from recent posts and load to storage"""
         self.logger.info("Calculating density from recent posts")
         
-        # Get recent posts with UMAP coordinates (last 30 minutes for real-time topic evolution)
-        recent_posts_query = f"""
-        SELECT uri, text, author, like_count, reply_count, repost_count, created_at, collected_at,
-               UMAP1, UMAP2, UMAP3, UMAP4, UMAP5
-        FROM `{self.project_id}.{self.dataset_id}.{self.posts_table}`
-        WHERE collected_at >= TIMESTAMP_SUB(CURRENT_TIMESTAMP(), INTERVAL 30 MINUTE)
-          AND UMAP1 IS NOT NULL AND UMAP2 IS NOT NULL
-        ORDER BY collected_at DESC
-        LIMIT 1000
-        """
+        # Only compute a new slice if posts were loaded past the density watermark
+        posts_watermark = self.state.watermark('posts')
+        density_watermark = self.state.watermark('density')
+        if posts_watermark is not None and density_watermark is not None \
+                and posts_watermark <= density_watermark:
+            self.logger.info("No posts loaded since the last density slice - skipping")
+            return False
         
-        recent_posts_df = self.bigquery_client.execute_query(recent_posts_query)
+        # Get recent posts with UMAP coordinates (last 30 minutes for real-time topic evolution).
+        # UMAP coordinates are cast to numeric at the Arrow level (BigQuery returns them as strings)
+        recent_posts = self.storage.read_window(
+            self.posts_table,
+            columns=self.essential_columns,
+            time_column='collected_at',
+            since=self.now() - timedelta(minutes=self.density_interval_minutes),
+            not_null=['UMAP1', 'UMAP2'],
+            limit=1000,
+            types=UMAP_TYPES,
+            query_name='density_source_posts'
+        )
         
-        if len(recent_posts_df) < 10:
-            self.logger.warning(f"Not enough recent posts for density calculation: {len(recent_posts_df)}")
+        if recent_posts.num_rows < 10:
+            self.logger.warning(f"Not enough recent posts for density calculation: {recent_posts.num_rows}")
             return False
         
-        # Convert UMAP coordinates to numeric (BigQuery returns them as strings)
-        umap_cols = ['UMAP1', 'UMAP2', 'UMAP3', 'UMAP4', 'UMAP5']
-        for col in umap_cols:
-            if col in recent_posts_df.columns:
-                recent_posts_df[col] = pd.to_numeric(recent_posts_df[col], errors='coerce')
+        recent_posts_df = to_dataframe(recent_posts)
         
         self.logger.info(f"Processing {len(recent_posts_df)} posts for density calculation")
         
         # Calculate density using existing UMAP coordinates
+        from ETL.feature_engineering import density
         density_result = density.model(
             recent_posts_df,
             x_col='UMAP1',
@@ -233,141 +498,317 @@ class ATProtoETL:
             return False
         
         # Create density DataFrame for storage
+        calculated_at = self.now()
         density_df = pd.DataFrame({
             'x': density_result['x_flat'],
             'y': density_result['y_flat'],
             'density': density_result['density_flat'],
-            'calculated_at': pd.Timestamp.now(tz='UTC'),
+            'calculated_at': calculated_at,
             'posts_count': len(recent_posts_df)
         })
         
         # Ensure calculated_at is proper timestamp for BigQuery TIMESTAMP field
         density_df['calculated_at'] = pd.to_datetime(density_df['calculated_at'], utc=True)
         
-        # Save density to BigQuery
-        self.logger.info("Loading density data to BigQuery")
-        self.bigquery_client.append(
-            density_df,
-            self.dataset_id,
-            self.density_table,
-            create_if_not_exists=True
-        )
+        # Save density to storage
+        self.logger.info(f"Loading density data to {self.storage.name}")
+        self.storage.append(density_df, self.density_table, create_if_not_exists=True)
         
-        self.logger.info(f"Successfully loaded {len(density_df)} density points to BigQuery")
+        self.logger.info(f"Successfully loaded {len(density_df)} density points to {self.storage.name}")
+        
+        self.state.set(LAST_DENSITY_SLICE, calculated_at)
+        self.state.advance_watermark('density', posts_watermark or recent_posts_df['collected_at'].max())
         
         return True
     
-    def export_visualization_data(self):
-        """Export data for GitHub Pages visualization"""
+    def query_export_density(self, since):
+        """Query density slices since `since`; numeric columns are typed at the Arrow level"""
+        return to_dataframe(self.storage.read_window(
+            self.density_table,
+            columns=['x', 'y', 'density', 'calculated_at', 'posts_count'],
+            time_column='calculated_at',
+            since=since,
+            types=DENSITY_TYPES,
+            query_name='export_density'
+        ))
+    
+    def query_export_posts(self, since):
+        """Query recent posts with UMAP coordinates created since `since`"""
+        posts_df = to_dataframe(self.storage.read_created_window(
+            self.posts_table,
+            columns=['uri', 'text', 'author', 'like_count', 'reply_count', 'repost_count',
+                     'UMAP1', 'UMAP2', 'created_at'],
+            since=since,
+            limit=self.export_posts_limit,
+            types=POSTS_EXPORT_TYPES,
+            query_name='export_posts'
+        ))
+        
+        # Fix timestamp format - Convert to ISO format with Z
+        posts_df['created_at'] = pd.to_datetime(posts_df['created_at'], utc=True).dt.strftime('%Y-%m-%dT%H:%M:%S.%fZ')
+        return posts_df
+    
+    def write_visualization_data(self, density_df, posts_df, since=None):
+        """
+        Write exported density and posts to the data directory
+        
+        New density slices and changed hourly post shards are added as immutable
+        files under density/ and posts/, manifest.json lists the window, older
+        density slices are downsampled and merged as they age (ETL.export.lod_tiers)
+        and expired files are removed. When nothing changed no file is touched, not
+        even last_update.json, so the export commit is skipped.
+        """
+        os.makedirs(self.data_dir, exist_ok=True)
+        
+        writer = ExportWriter(self.data_dir, tiers=lod_tiers(self.export_window_hours))
+        stats = writer.write(density_df, posts_df, since,
+                             posts_truncated=len(posts_df) >= self.export_posts_limit,
+                             now=self.now())
+        
+        if stats['changed']:
+            # Create update timestamp file
+            update_info = {
+                "last_update": datetime.now().isoformat(),
+                "density_points": stats['density_points'],
+                "posts_count": stats['posts_count'],
+                "time_slices": stats['density_slices']
+            }
+            
+            with open(os.path.join(self.data_dir, 'last_update.json'), 'w') as f:
+                json.dump(update_info, f, indent=2)
+        
+        self.logger.info(f"Exported {stats['density_slices']} density slices and {stats['posts_count']} posts: "
+                         f"{stats['files_written']} files ({stats['bytes_written']} bytes) written, "
+                         f"{stats['files_removed']} removed")
+        return stats
+    
+    def export_window_start(self):
+        """Start of the export window, on the hour so hourly post shards stay whole"""
+        return (self.now() - timedelta(hours=self.export_window_hours)).floor('h')
+    
+    @traced('export')
+    def export_visualization_data(self, since=None, posts_future=None):
+        """
+        Export data for GitHub Pages visualization
+        
+        Args:
+            since: Start of the export window (default: export_window_start())
+            posts_future: Optional Future already running query_export_posts(since),
+                so the posts query can overlap the density stage
+        """
         try:
             self.logger.info("Exporting visualization data")
             
-            # Export density data (last 24 hours)
-            density_query = f"""
-            SELECT x, y, density, calculated_at, posts_count
-            FROM `{self.project_id}.{self.dataset_id}.{self.density_table}`
-            WHERE calculated_at >= TIMESTAMP_SUB(CURRENT_TIMESTAMP(), INTERVAL 24 HOUR)
-            ORDER BY calculated_at DESC
-            """
-            
-            density_df = self.bigquery_client.execute_query(density_query)
-            
-            # Convert string columns back to numeric for proper JSON export
-            density_df['x'] = pd.to_numeric(density_df['x'], errors='coerce')
-            density_df['y'] = pd.to_numeric(density_df['y'], errors='coerce') 
-            density_df['density'] = pd.to_numeric(density_df['density'], errors='coerce')
-            density_df['posts_count'] = pd.to_numeric(density_df['posts_count'], errors='coerce')
+            # Skip when nothing was loaded or calculated past the export watermark
+            newest_data = [ts for ts in (self.state.watermark('posts'),
+                                         self.state.watermark('engagement'),
+                                         self.state.get_timestamp(LAST_DENSITY_SLICE)) if ts is not None]
+            export_watermark = self.state.watermark('export')
+            if newest_data and export_watermark is not None and max(newest_data) <= export_watermark:
+                self.logger.info("No new data since the last export - skipping")
+                return False
             
-            # Ensure data directory exists
-            import os
-            os.makedirs('data', exist_ok=True)
+            if since is None:
+                since = self.export_window_start()
             
-            density_df.to_json('data/density_data.json', orient='records', date_format='iso')
+            # Export density data (the export window), reading only slices not exported yet
+            density_df = self.query_export_density(ExportWriter(self.data_dir).density_since(since))
             
             # Export recent posts with UMAP coordinates
-            posts_query = f"""
-            SELECT uri, text, author, like_count, reply_count, repost_count, 
-                   UMAP1, UMAP2, created_at
-            FROM `{self.project_id}.{self.dataset_id}.{self.posts_table}`
-            WHERE UMAP1 IS NOT NULL AND UMAP2 IS NOT NULL
-            AND COALESCE(
-                SAFE.PARSE_TIMESTAMP('%Y-%m-%d %H:%M:%S %Z', created_at),
-                SAFE.PARSE_TIMESTAMP('%Y-%m-%dT%H:%M:%E*SZ', created_at)
-            ) >= TIMESTAMP_SUB(CURRENT_TIMESTAMP(), INTERVAL 24 HOUR)
-            ORDER BY created_at DESC
-            LIMIT 5000
-            """
-            
-            posts_df = self.bigquery_client.execute_query(posts_query)
-            
-            # Convert string columns back to numeric for proper JSON export
-            posts_df['like_count'] = pd.to_numeric(posts_df['like_count'], errors='coerce')
-            posts_df['reply_count'] = pd.to_numeric(posts_df['reply_count'], errors='coerce')
-            posts_df['repost_count'] = pd.to_numeric(posts_df['repost_count'], errors='coerce')
-            posts_df['UMAP1'] = pd.to_numeric(posts_df['UMAP1'], errors='coerce')
-            posts_df['UMAP2'] = pd.to_numeric(posts_df['UMAP2'], errors='coerce')
-            
-            # Fix timestamp format - Convert to ISO format with Z
-            posts_df['created_at'] = pd.to_datetime(posts_df['created_at'], utc=True).dt.strftime('%Y-%m-%dT%H:%M:%S.%fZ')
-            
-            posts_df.to_json('data/posts.json', orient='records', date_format='iso')
+            if posts_future is not None:
+                posts_df = posts_future.result()
+            else:
+                posts_df = self.query_export_posts(since)
             
-            # Create update timestamp file
-            update_info = {
-                "last_update": datetime.now().isoformat(),
-                "density_points": len(density_df),
-                "posts_count": len(posts_df),
-                "time_slices": len(density_df['calculated_at'].unique()) if len(density_df) > 0 else 0
-            }
+            self.export_stats = self.write_visualization_data(density_df, posts_df, since)
             
-            with open('data/last_update.json', 'w') as f:
-                json.dump(update_info, f, indent=2)
-                
-            self.logger.info(f"Exported {len(density_df)} density points and {len(posts_df)} posts")
+            self.state.set(LAST_EXPORT, self.now())
+            if newest_data:
+                self.state.advance_watermark('export', max(newest_data))
+            return True
             
+        except (ByteBudgetExceeded, TimeoutError):
+            raise
         except Exception as e:
             self.logger.error(f"Error exporting visualization data: {str(e)}")
+            return False
+    
+    def _handle_budget_exceeded(self, stage, error):
+        """Skip a stage that would exceed the query byte budget, or fail the run in abort mode"""
+        if self.query_budget_mode == 'abort':
+            raise error
+        self.logger.warning(f"Skipping {stage} - query byte budget exceeded: {error}")
+    
+    def _handle_timeout(self, stage, error):
+        """Skip a stage whose query ran past the per-query timeout (the backend has already stopped it)"""
+        self.logger.warning(f"Skipping {stage} - {error}")
     
-    def run_etl(self):
-        """Run the complete ETL pipeline"""
+    def _query_stats(self):
+        """Aggregated query cost statistics for this run"""
+        if self.storage is None:
+            return None
+        return self.storage.ledger.summary()
+    
+    def _traced_run(self, name, func):
+        """
+        Run `func` with a fresh tracer collecting stage spans
+        
+        The JSON run report is written to `<trace_dir>/<name>.json` and, when
+        ETL_METRICS_DIR is set, Prometheus metrics to `<metrics_dir>/<name>.prom`
+        (for a node_exporter textfile collector). The result gets a `trace` summary.
+        """
+        tracer = Tracer(name)
+        tracing.activate(tracer)
+        try:
+            result = func()
+        finally:
+            tracing.activate(None)
+            tracer.write(
+                os.path.join(self.trace_dir, f"{name}.json") if self.trace_dir else None,
+                os.path.join(self.metrics_dir, f"{name}.prom") if self.metrics_dir else None
+            )
+        
+        report = tracer.report()
+        result["trace"] = {
+            "run_id": report["run_id"],
+            "wall_seconds": report["wall_seconds"],
+            "cpu_seconds": report["cpu_seconds"],
+            "rss_mb": report["rss_mb"],
+            "peak_rss_mb": report["peak_rss_mb"],
+            "overhead_fraction": report["overhead_fraction"],
+            "stages": report["stages"]
+        }
+        return result
+    
+    def run_etl(self, density=True, export=True):
+        """
+        Run the complete ETL pipeline
+        
+        Args:
+            density: Calculate a density slice when one is due
+            export: Export the visualization data when it is due
+                (the daemon turns both off and schedules them separately)
+        """
+        return self._traced_run('etl_run', lambda: self._run_etl(density, export))
+    
+    def _run_etl(self, density, export):
         try:
             self.logger.info("Starting AT Proto synoptic chart ETL pipeline")
             
             # Initialize clients
             self.initialize_clients()
-            
-            # Extract posts
-            posts = self.extract_posts()
-            if posts is None:
-                return {"status": "success", "message": "No new posts to process"}
-            
-            # Transform posts
-            posts_df = self.transform_posts(posts)
-            
-            # Load posts
-            self.load_posts(posts_df)
-            
-            # Check if density calculation is needed
-            density_calculated = False
-            if self.should_calculate_density():
-                density_calculated = self.calculate_and_load_density()
-            else:
-                self.logger.info("Skipping density calculation - not time yet")
-            
-            # Check if data export is needed (independent of density - runs hourly)
-            data_exported = False
-            if self.should_export_data():
-                self.export_visualization_data()
-                data_exported = True
-            else:
-                self.logger.info("Skipping data export - not time yet")
+            self.storage.ledger.reset()
+            
+            # Single state read per run; stages consult the cached copy
+            self.state.load(force=True)
+            self.load_seen_index()
+            
+            # Queries are bounded by the backend's per-query timeout; the pool is not
+            # waited on at the end, so a stage skipped on timeout never holds up the run
+            pool = ThreadPoolExecutor(max_workers=self.query_workers, thread_name_prefix='etl-query')
+            try:
+                # The density cadence check only reads the density table,
+                # so it runs while posts are collected and embedded
+                density_due = pool.submit(self.should_calculate_density) if density else None
+                export_due = export and self.should_export_data()
+                
+                # Extract, transform and load, pipelined page by page.
+                # Only posts not already stored are embedded and loaded
+                collection = self.collect_posts()
+                if not collection['fetched']:
+                    self.logger.warning("No posts retrieved from Bluesky")
+                    self.state.flush()
+                    return {"status": "success", "message": "No new posts to process"}
+                
+                repeat_posts = collection['repeat_posts']
+                posts_collected = collection['loaded']
+                if not collection['new']:
+                    self.logger.info("All fetched posts already stored - nothing transformed or loaded")
+                
+                # Repeat posts only refresh their counts, in one batched upsert
+                engagement_future = None
+                if repeat_posts:
+                    engagement_future = pool.submit(self.refresh_engagement, repeat_posts)
+                
+                engagement_updated = 0
+                if engagement_future is not None:
+                    try:
+                        engagement_updated = engagement_future.result()
+                    except ByteBudgetExceeded as e:
+                        self._handle_budget_exceeded("engagement refresh", e)
+                    except TimeoutError as e:
+                        self._handle_timeout("engagement refresh", e)
+                    except Exception as e:
+                        self.logger.warning(f"Engagement refresh failed: {e}")
+                
+                # Density and the posts export both read the posts just loaded,
+                # but are independent of each other
+                density_calculated = False
+                density_future = None
+                try:
+                    if density_due is not None and density_due.result():
+                        density_future = pool.submit(self.calculate_and_load_density)
+                    elif density:
+                        self.logger.info("Skipping density calculation - not time yet")
+                except ByteBudgetExceeded as e:
+                    self._handle_budget_exceeded("density calculation", e)
+                except TimeoutError as e:
+                    self._handle_timeout("density calculation", e)
+                
+                export_since = self.export_window_start()
+                posts_export = None
+                if export_due:
+                    posts_export = pool.submit(self.query_export_posts, export_since)
+                
+                if density_future is not None:
+                    try:
+                        density_calculated = density_future.result()
+                    except ByteBudgetExceeded as e:
+                        self._handle_budget_exceeded("density calculation", e)
+                    except TimeoutError as e:
+                        self._handle_timeout("density calculation", e)
+                
+                # Check if data export is needed (independent of density - runs hourly).
+                # The density export reads the slice written above, so it runs last
+                data_exported = False
+                if export_due:
+                    try:
+                        data_exported = self.export_visualization_data(
+                            since=export_since, posts_future=posts_export
+                        )
+                    except ByteBudgetExceeded as e:
+                        self._handle_budget_exceeded("data export", e)
+                    except TimeoutError as e:
+                        self._handle_timeout("data export", e)
+                elif export:
+                    self.logger.info("Skipping data export - not time yet")
+            finally:
+                pool.shutdown(wait=False, cancel_futures=True)
+            
+            self.state.flush()
+            self.seen_index.save()
+            
+            encode_rate = self.seen_index.encode_seconds_per_post
             
             # Return success response
             return {
                 "status": "success",
-                "posts_collected": len(posts_df),
+                "posts_collected": posts_collected,
+                "posts_new": collection['new'],
+                "posts_repeat": len(repeat_posts),
+                "engagement_updated": engagement_updated,
+                "filter_stats": self.bluesky_client.post_filter.stats(),
+                "auth": {
+                    "method": self.bluesky_client.auth_method,
+                    "seconds": round(self.bluesky_client.auth_seconds, 4)
+                },
+                "transport": self.bluesky_client.transport_stats(),
+                "encoder_seconds_saved": round(len(repeat_posts) * encode_rate, 3) if encode_rate else None,
                 "density_calculated": density_calculated,
                 "data_exported": data_exported,
+                "export_stats": self.export_stats if data_exported else None,
+                "pipeline": collection['pipeline'],
+                "query_stats": self._query_stats(),
                 "timestamp": datetime.now().isoformat()
             }
             
@@ -376,6 +817,155 @@ class ATProtoETL:
             return {
                 "status": "error",
                 "error": str(e),
+                "query_stats": self._query_stats(),
+                "timestamp": datetime.now().isoformat()
+            }
+
+    def run_density(self):
+        """Calculate a density slice on its own (scheduled separately by the daemon)"""
+        return self._traced_run('density_run', lambda: self._run_stage(
+            "density", "density_calculated", self.calculate_and_load_density
+        ))
+    
+    def run_export(self):
+        """Export the visualization data on its own (scheduled separately by the daemon)"""
+        return self._traced_run('export_run', lambda: self._run_stage(
+            "data export", "data_exported", self.export_visualization_data
+        ))
+    
+    def _run_stage(self, stage, result_key, func):
+        """Run one stage with fresh state and query stats, flushing state afterwards"""
+        try:
+            self.initialize_storage()
+            self.storage.ledger.reset()
+            self.state.load(force=True)
+            
+            done = False
+            try:
+                done = func()
+            except ByteBudgetExceeded as e:
+                self._handle_budget_exceeded(stage, e)
+            except TimeoutError as e:
+                self._handle_timeout(stage, e)
+            
+            self.state.flush()
+            return {
+                "status": "success",
+                result_key: done,
+                "query_stats": self._query_stats(),
+                "timestamp": datetime.now().isoformat()
+            }
+            
+        except Exception as e:
+            self.logger.error(f"Error in {stage}: {str(e)}", exc_info=True)
+            return {
+                "status": "error",
+                "error": str(e),
+                "query_stats": self._query_stats(),
+                "timestamp": datetime.now().isoformat()
+            }
+    
+    def seconds_until_due(self, key, interval_minutes):
+        """Seconds until a stage last recorded under state `key` is due again (0 if never run)"""
+        self.initialize_storage()
+        self.state.load()
+        last_run = self.state.get_timestamp(key)
+        if last_run is None:
+            return 0.0
+        return max(0.0, (last_run + timedelta(minutes=interval_minutes) - self.now()).total_seconds())
+    
+    def process_stream_batch(self, posts):
+        """
+        Transform and load one batch of streamed posts, then run density and
+        export if they are due. Errors are logged so the stream keeps going.
+        Posts from a batch that fails to load are retried with the next one
+        (up to stream_queue_size of them; older ones are dropped with a
+        warning), and the stream cursor only advances once nothing is pending.
+        """
+        posts = self.stream_pending + list(posts)
+        self.stream_pending = []
+        try:
+            try:
+                new_posts, _ = self.filter_seen_posts(posts)
+                if new_posts:
+                    self.load_posts(self.transform_posts(new_posts))
+            except Exception as e:
+                self.stream_pending = posts[-self.stream_queue_size:]
+                if len(posts) > len(self.stream_pending):
+                    self.logger.warning(f"Dropping {len(posts) - len(self.stream_pending)} pending stream posts")
+                self.logger.error(f"Error loading stream batch of {len(posts)} posts, "
+                                  f"retrying with the next batch: {e}", exc_info=True)
+                return
+            
+            cursor = max((post.event_time_us or 0 for post in posts), default=0)
+            if cursor:
+                self.state.set(LAST_STREAM_CURSOR, self.now(), value=str(cursor))
+            
+            try:
+                if self.should_calculate_density():
+                    self.calculate_and_load_density()
+                if self.should_export_data():
+                    self.export_visualization_data()
+            except ByteBudgetExceeded as e:
+                self._handle_budget_exceeded("density/export", e)
+            except TimeoutError as e:
+                self._handle_timeout("density/export", e)
+            
+            self.state.flush()
+            self.seen_index.save()
+            
+        except Exception as e:
+            self.logger.error(f"Error processing stream batch of {len(posts)} posts: {e}", exc_info=True)
+    
+    def run_stream(self, replay_path=None, max_events=None, duration=None, speed=None):
+        """
+        Run the pipeline on the Jetstream event stream instead of polling feeds
+        
+        Args:
+            replay_path: Optional capture file (one Jetstream message per line) to replay
+                instead of connecting to the live stream
+            max_events: Stop after this many events
+            duration: Stop after this many seconds
+            speed: Replay pacing relative to the recorded event times (None = as fast as possible)
+        """
+        from ETL.clients.jetstream import JETSTREAM_URL, JetstreamConsumer, replay_capture
+        
+        try:
+            self.logger.info("Starting AT Proto synoptic chart ETL in streaming mode")
+            
+            self.initialize_storage()
+            self.storage.ledger.reset()
+            self.state.load(force=True)
+            self.load_seen_index()
+            
+            # Resume the live stream where the last loaded batch left off
+            cursor = None if replay_path else self.state.get_value(LAST_STREAM_CURSOR)
+            
+            consumer = JetstreamConsumer(
+                self.process_stream_batch,
+                url=os.environ.get('JETSTREAM_URL', JETSTREAM_URL),
+                batch_size=self.stream_batch_size,
+                batch_seconds=self.stream_batch_seconds,
+                queue_size=self.stream_queue_size,
+                min_length=30,
+                cursor=int(cursor) if cursor else None,
+                source=replay_capture(replay_path, speed) if replay_path else None
+            )
+            stream_stats = asyncio.run(consumer.run(max_events=max_events, duration=duration))
+            
+            return {
+                "status": "success",
+                "stream": stream_stats,
+                "query_stats": self._query_stats(),
+                "timestamp": datetime.now().isoformat()
+            }
+            
+        except Exception as e:
+            self.logger.error(f"Error in streaming ETL: {str(e)}", exc_info=True)
+            return {
+                "status": "error",
+                "error": str(e),
+                "query_stats": self._query_stats(),
                 "timestamp": datetime.now().isoformat()
             }
 
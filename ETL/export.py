@@ -0,0 +1,471 @@
+import gzip
+import hashlib
+import json
+import logging
+import math
+import os
+import struct
+from typing import Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+EXPORT_FORMAT = 'export/2'
+# Density slices are quantized to uint16 per slice: value = q * scale
+DENSITY_FORMAT = 'density-columnar/1'
+DENSITY_LEVELS = 65535
+# Posts are columnar typed arrays plus string dictionaries, text kept in a separate shard
+POSTS_FORMAT = 'posts-columnar/1'
+POSTS_COLUMNS = (
+    ('UMAP1', 'float32'),
+    ('UMAP2', 'float32'),
+    ('created_at', 'uint32'),
+    ('like_count', 'uint32'),
+    ('reply_count', 'uint32'),
+    ('repost_count', 'uint32'),
+    ('author', 'uint32'),
+    ('uri_prefix', 'uint32'),
+)
+# Level-of-detail tiers for density slices by age (hours since the export time).
+# Slices aging into a tier are downsampled by `downsample` per axis and merged
+# into `merge_minutes` buckets (0: not merged); the last tier keeps at most
+# `max_slices`, merging its shortest adjacent pair when over. Slices older
+# than the last tier's `max_age_hours` (None: no limit) are dropped. These are
+# the ages for long windows; lod_tiers() fits them to the export window.
+LOD_TIERS = (
+    {'max_age_hours': 6, 'downsample': 1, 'merge_minutes': 0},
+    {'max_age_hours': 24, 'downsample': 2, 'merge_minutes': 60},
+    {'max_age_hours': None, 'downsample': 4, 'merge_minutes': 240, 'max_slices': 24},
+)
+# Subdirectories of immutable, content-addressed export files
+EXPORT_SUBDIRS = ('density', 'posts')
+
+
+def lod_tiers(window_hours: float, tiers=LOD_TIERS) -> tuple:
+    """
+    `tiers` fitted to an export window of `window_hours`
+
+    Slices leave the export when they leave the window, so with a 24-hour
+    window the stock tiers would never reach the last one. Each bounded tier
+    k of n is cut to end by (k + 1) / n of the window: 6, 16 and 24 hours for
+    a day, the stock 6 and 24 hours from a 36-hour window up.
+    """
+    fitted = []
+    for k, tier in enumerate(tiers):
+        tier = dict(tier)
+        if tier['max_age_hours'] is not None:
+            tier['max_age_hours'] = min(tier['max_age_hours'], window_hours * (k + 1) / len(tiers))
+        fitted.append(tier)
+    return tuple(fitted)
+
+
+def _axis(values):
+    """Sorted cell centres of one grid axis, as (axis dict, index of each value)"""
+    centres, index = np.unique(values, return_inverse=True)
+    return {'min': float(centres[0]), 'max': float(centres[-1]), 'count': int(len(centres))}, index
+
+
+def _stamp(timestamp: pd.Timestamp, unit: str = 's') -> str:
+    """Compact UTC timestamp used in export file names"""
+    return timestamp.strftime('%Y%m%dT%H%M%SZ' if unit == 's' else '%Y%m%dT%HZ')
+
+
+def encode_density_slice(rows: pd.DataFrame) -> Tuple[dict, bytes]:
+    """
+    Encode one slice's density rows (x, y, density, posts_count) as a manifest entry and uint16 array
+
+    The grid is written once as its axes (cell centres are evenly spaced
+    from `min` to `max`) and the densities as a row-major (y, x)
+    little-endian uint16 array, quantized against the slice maximum:
+    density = q * scale. Cells missing from the rows are zero.
+    """
+    x_axis, ix = _axis(rows['x'].to_numpy(dtype=np.float64))
+    y_axis, iy = _axis(rows['y'].to_numpy(dtype=np.float64))
+
+    values = np.zeros(y_axis['count'] * x_axis['count'], dtype=np.float64)
+    values[iy * x_axis['count'] + ix] = rows['density'].to_numpy(dtype=np.float64)
+    scale, data = _quantize(values)
+
+    entry = {
+        'posts_count': int(rows['posts_count'].iloc[0]),
+        'grid': {'x': x_axis, 'y': y_axis},
+        'scale': scale
+    }
+    return entry, data
+
+
+def _quantize(values: np.ndarray) -> Tuple[float, bytes]:
+    """Densities as little-endian uint16 against their maximum, with the scale back to density"""
+    peak = float(values.max()) if values.size else 0.0
+    scale = peak / DENSITY_LEVELS if peak > 0 else 0.0
+    quantized = np.zeros(values.size, dtype='<u2') if scale == 0 else np.rint(values.ravel() / scale).astype('<u2')
+    return scale, quantized.tobytes()
+
+
+def _centres(axis: dict) -> np.ndarray:
+    return np.linspace(axis['min'], axis['max'], axis['count'])
+
+
+def _step(axis: dict) -> float:
+    return (axis['max'] - axis['min']) / (axis['count'] - 1) if axis['count'] > 1 else 1.0
+
+
+def resample_density(values: np.ndarray, grid: dict, target: dict) -> np.ndarray:
+    """
+    Resample a (y, x) density grid onto `target` axes by bilinear interpolation
+
+    When the target cells are coarser the grid is first box-averaged over
+    about one target cell, so downsampling keeps mass rather than picking
+    points. Outside the source grid the density is zero.
+    """
+    from scipy import ndimage
+
+    ratio = max(_step(target['x']) / _step(grid['x']), _step(target['y']) / _step(grid['y']))
+    if ratio >= 1.5:
+        values = ndimage.uniform_filter(values, size=int(round(ratio)), mode='constant')
+    rows = (_centres(target['y']) - grid['y']['min']) / _step(grid['y'])
+    cols = (_centres(target['x']) - grid['x']['min']) / _step(grid['x'])
+    yy, xx = np.meshgrid(rows, cols, indexing='ij')
+    return ndimage.map_coordinates(values, [yy, xx], order=1, mode='constant', cval=0.0)
+
+
+def _extend(values: np.ndarray, grid: dict, target: dict) -> np.ndarray:
+    """Place a (y, x) grid into `target` axes of the same step that cover it, zero elsewhere"""
+    y0 = int(round((grid['y']['min'] - target['y']['min']) / _step(target['y'])))
+    x0 = int(round((grid['x']['min'] - target['x']['min']) / _step(target['x'])))
+    extended = np.zeros((target['y']['count'], target['x']['count']), dtype=np.float64)
+    extended[y0:y0 + values.shape[0], x0:x0 + values.shape[1]] = values
+    return extended
+
+
+def _gzip(data: bytes) -> bytes:
+    """gzip without a timestamp, so equal content compresses to equal bytes (and names)"""
+    return gzip.compress(data, compresslevel=9, mtime=0)
+
+
+def encode_posts_shard(rows: pd.DataFrame) -> Tuple[bytes, bytes]:
+    """
+    Encode one hour of posts as gzipped (columns, text) shards, in a stable order
+
+    The columns shard is a little-endian uint32 header length, a JSON header
+    and 4-byte aligned typed arrays (POSTS_COLUMNS) of `count` values each at
+    their `offset` after the header. created_at is epoch seconds; `author`
+    and `uri_prefix` index the header's dictionaries, and a post's URI is
+    its prefix followed by its `rkeys` entry. The text shard is a JSON array
+    of the posts' texts in the same order, fetched only when text is shown.
+    """
+    rows = rows.sort_values(['created_at', 'uri'], kind='stable')
+    author_codes, authors = pd.factorize(rows['author'].fillna(''), sort=True)
+    uri_parts = rows['uri'].str.rpartition('/')
+    prefix_codes, prefixes = pd.factorize(uri_parts[0] + uri_parts[1], sort=True)
+
+    created_at = pd.to_datetime(rows['created_at'], utc=True)
+    values = {
+        'UMAP1': rows['UMAP1'].to_numpy(),
+        'UMAP2': rows['UMAP2'].to_numpy(),
+        'created_at': (created_at - pd.Timestamp(0, tz='UTC')) // pd.Timedelta(seconds=1),
+        'like_count': rows['like_count'].fillna(0).to_numpy(),
+        'reply_count': rows['reply_count'].fillna(0).to_numpy(),
+        'repost_count': rows['repost_count'].fillna(0).to_numpy(),
+        'author': author_codes,
+        'uri_prefix': prefix_codes
+    }
+    columns, arrays, offset = [], [], 0
+    for name, dtype in POSTS_COLUMNS:
+        array = np.asarray(values[name]).astype('<f4' if dtype == 'float32' else '<u4')
+        columns.append({'name': name, 'dtype': dtype, 'offset': offset})
+        arrays.append(array.tobytes())
+        offset += array.nbytes
+
+    header = json.dumps({
+        'format': POSTS_FORMAT,
+        'count': len(rows),
+        'columns': columns,
+        'authors': list(authors),
+        'uri_prefixes': list(prefixes),
+        'rkeys': uri_parts[2].tolist()
+    }, separators=(',', ':')).encode('utf-8')
+    # Pad so the arrays after the 4-byte length and header start 4-byte aligned
+    header += b' ' * (-len(header) % 4)
+    columns_shard = struct.pack('<I', len(header)) + header + b''.join(arrays)
+    text_shard = json.dumps(rows['text'].fillna('').tolist(), ensure_ascii=False).encode('utf-8')
+    return _gzip(columns_shard), _gzip(text_shard)
+
+
+class ExportWriter:
+    """
+    Append-only visualization export: immutable content-addressed files and a manifest
+
+    Each density slice is written once to density/<time>-<hash>.bin and each
+    hour of posts to posts/<hour>-<hash>.bin.gz (columns) and
+    posts/<hour>-<hash>.text.json.gz (text); a file already on disk is not
+    rewritten, so unchanged slices and shards cost nothing and can be cached
+    by clients forever. manifest.json lists the files in the export window
+    and is only rewritten when that list changes; files it no longer lists
+    are deleted.
+
+    Density slices then age through the level-of-detail `tiers`: when one
+    enters a coarser tier it is downsampled and merged with the others in
+    its bucket (including a bucket entry exported earlier), reading only
+    the already exported files involved. Merged entries carry `level`,
+    `start` (their oldest slice) and `merged` (how many slices they
+    average), and the total density export stays bounded however long the
+    window is. They are stored as float32 and keep their grid step as they
+    absorb slices (the grid only grows by whole cells), so repeated merges
+    neither re-quantize nor re-interpolate what they already hold.
+    """
+
+    def __init__(self, directory: str = 'data', tiers=LOD_TIERS):
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.directory = directory
+        self.tiers = tiers
+        self.manifest_path = os.path.join(directory, 'manifest.json')
+
+    def load_manifest(self) -> dict:
+        """The current manifest, or an empty one if there is none (or it is unreadable)"""
+        try:
+            with open(self.manifest_path, 'r') as f:
+                manifest = json.load(f)
+            if manifest.get('format') == EXPORT_FORMAT:
+                return manifest
+            self.logger.warning(f"Ignoring manifest in unknown format {manifest.get('format')!r}")
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError) as e:
+            self.logger.warning(f"Ignoring unreadable export manifest: {e}")
+        return {'format': EXPORT_FORMAT, 'density': {'format': DENSITY_FORMAT, 'dtype': 'uint16', 'slices': []},
+                'posts': []}
+
+    def _exists(self, name: str) -> bool:
+        return os.path.exists(os.path.join(self.directory, name))
+
+    def _kept_slices(self, manifest: dict, since: Optional[pd.Timestamp]) -> list:
+        """Exported density slices still inside the window, provided all their files are on disk"""
+        slices = [entry for entry in manifest['density']['slices']
+                  if since is None or pd.Timestamp(entry['calculated_at']) >= since]
+        return slices if all(self._exists(entry['file']) for entry in slices) else []
+
+    def density_since(self, since: pd.Timestamp) -> pd.Timestamp:
+        """Start of the density query: slices already exported in the window are not read again"""
+        slices = self._kept_slices(self.load_manifest(), since)
+        if not slices:
+            return since
+        return max(pd.Timestamp(entry['calculated_at']) for entry in slices) + pd.Timedelta(microseconds=1)
+
+    def _write_file(self, subdir: str, stamp: str, data: bytes, extension: str, stats: dict) -> str:
+        """Write `data` under a content-hashed name unless it is already there; returns the relative name"""
+        digest = hashlib.blake2b(data, digest_size=8).hexdigest()
+        name = f'{subdir}/{stamp}-{digest}.{extension}'
+        path = os.path.join(self.directory, name)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f'{path}.tmp'
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+            stats['files_written'] += 1
+            stats['bytes_written'] += len(data)
+        return name
+
+    def _level(self, entry: dict) -> int:
+        return entry.get('level', 0)
+
+    def _tier_for(self, age: pd.Timedelta) -> Optional[int]:
+        """Level of detail for a slice of this age, or None when it is past the last tier"""
+        hours = age / pd.Timedelta(hours=1)
+        for level, tier in enumerate(self.tiers):
+            if tier['max_age_hours'] is None or hours < tier['max_age_hours']:
+                return level
+        return None
+
+    def _bucket(self, entry: dict, level: int):
+        """Merge bucket of an entry at `level`: its merge_minutes period, or the entry itself"""
+        minutes = self.tiers[level]['merge_minutes']
+        if not minutes:
+            return entry['calculated_at']
+        return pd.Timestamp(entry.get('start', entry['calculated_at'])).floor(f'{minutes}min')
+
+    def _read_density(self, entry: dict) -> np.ndarray:
+        """An exported slice's densities as a (y, x) grid"""
+        with open(os.path.join(self.directory, entry['file']), 'rb') as f:
+            data = f.read()
+        grid = entry['grid']
+        if entry.get('dtype') == 'float32':
+            values = np.frombuffer(data, dtype='<f4').astype(np.float64)
+        else:
+            values = np.frombuffer(data, dtype='<u2').astype(np.float64) * entry['scale']
+        return values.reshape(grid['y']['count'], grid['x']['count'])
+
+    def _merge(self, members: list, level: int, stats: dict) -> dict:
+        """One entry at `level` averaging `members` (weighted by the slices each already merges)"""
+        downsample = self.tiers[level]['downsample']
+        # The member already merged the most at this level keeps its grid step, so it is
+        # placed as is while the others are resampled onto its (extended) grid
+        base = max((member for member in members if self._level(member) == level),
+                   key=lambda member: member.get('merged', 1), default=None)
+
+        def axis(name):
+            lo = min(member['grid'][name]['min'] for member in members)
+            hi = max(member['grid'][name]['max'] for member in members)
+            if base is not None:
+                base_axis = base['grid'][name]
+                step = _step(base_axis)
+                below = math.ceil((base_axis['min'] - lo) / step - 1e-9)
+                above = math.ceil((hi - base_axis['max']) / step - 1e-9)
+                return {'min': base_axis['min'] - below * step, 'max': base_axis['max'] + above * step,
+                        'count': base_axis['count'] + below + above}
+            # The members' union at the resolution of the finest member, divided by the tier's factor
+            count = max(math.ceil(member['grid'][name]['count'] * self.tiers[self._level(member)]['downsample']
+                                  / downsample) for member in members)
+            return {'min': lo, 'max': hi, 'count': max(2, count)}
+
+        target = {'x': axis('x'), 'y': axis('y')}
+        weights = [member.get('merged', 1) for member in members]
+        values = sum(
+            weight * (_extend if member is base else resample_density)(
+                self._read_density(member), member['grid'], target)
+            for weight, member in zip(weights, members)
+        ) / sum(weights)
+
+        calculated_at = max(member['calculated_at'] for member in members)
+        data = values.astype('<f4').tobytes()
+        return {
+            'calculated_at': calculated_at,
+            'posts_count': max(member['posts_count'] for member in members),
+            'grid': target,
+            'dtype': 'float32',
+            'scale': 1.0,
+            'level': level,
+            'start': min(member.get('start', member['calculated_at']) for member in members),
+            'merged': sum(weights),
+            'file': self._write_file('density', _stamp(pd.Timestamp(calculated_at)), data, 'bin', stats)
+        }
+
+    def apply_lod(self, slices: list, now: pd.Timestamp, stats: dict) -> list:
+        """Move slices that aged into a coarser tier there, merging per bucket; returns the new list"""
+        kept, buckets = [], {}
+        for entry in slices:
+            level = self._tier_for(now - pd.Timestamp(entry['calculated_at']))
+            if level is None:
+                continue
+            if level <= self._level(entry):
+                kept.append(entry)
+            else:
+                buckets.setdefault((level, self._bucket(entry, level)), []).append(entry)
+
+        # An entry already at a coarser level absorbs slices aging into its bucket
+        for entry in [entry for entry in kept if self._level(entry) > 0]:
+            key = (self._level(entry), self._bucket(entry, self._level(entry)))
+            if key in buckets:
+                kept.remove(entry)
+                buckets[key].append(entry)
+        kept += [self._merge(members, level, stats) for (level, _), members in buckets.items()]
+        kept.sort(key=lambda entry: entry['calculated_at'])
+
+        # Bound the last tier by merging its adjacent pair spanning the least time
+        last = len(self.tiers) - 1
+        max_slices = self.tiers[last].get('max_slices')
+        while max_slices:
+            oldest = [entry for entry in kept if self._level(entry) == last]
+            if len(oldest) <= max_slices:
+                break
+            first, second = min(zip(oldest, oldest[1:]), key=lambda pair: (
+                pd.Timestamp(pair[1]['calculated_at']) - pd.Timestamp(pair[0].get('start', pair[0]['calculated_at']))
+            ))
+            kept.remove(first)
+            kept.remove(second)
+            kept.append(self._merge([first, second], last, stats))
+            kept.sort(key=lambda entry: entry['calculated_at'])
+        return kept
+
+    def write(self, density_df: pd.DataFrame, posts_df: pd.DataFrame,
+              since: Optional[pd.Timestamp] = None, posts_truncated: bool = False,
+              now: Optional[pd.Timestamp] = None) -> dict:
+        """
+        Add new density slices and the current post shards, drop what fell out of the window
+
+        Args:
+            density_df: Density rows of slices not yet exported (slices already in
+                the manifest are skipped)
+            posts_df: All posts in the window; shards are rebuilt per hour of created_at
+                and only written when their content changed
+            since: Start of the export window (default: keep every exported slice)
+            posts_truncated: The posts query hit its row limit, so its oldest hour is
+                incomplete; it is left out rather than rewritten on every export
+            now: Time slice ages are measured from (default: the newest slice)
+
+        Returns:
+            Stats: whether the manifest changed, files and bytes written, files removed,
+            and what the manifest now lists
+        """
+        previous = self.load_manifest()
+        stats = {'changed': False, 'files_written': 0, 'bytes_written': 0, 'files_removed': 0}
+
+        slices = self._kept_slices(previous, since)
+        exported = {entry['calculated_at'] for entry in slices}
+        if len(density_df) > 0:
+            calculated_at = pd.to_datetime(density_df['calculated_at'], utc=True)
+            for timestamp, rows in density_df.groupby(calculated_at, sort=True):
+                iso = timestamp.strftime('%Y-%m-%dT%H:%M:%S.%fZ')
+                if iso in exported or (since is not None and timestamp < since):
+                    continue
+                entry, data = encode_density_slice(rows)
+                entry = {'calculated_at': iso, **entry,
+                         'file': self._write_file('density', _stamp(timestamp), data, 'bin', stats)}
+                slices.append(entry)
+                exported.add(iso)
+        slices.sort(key=lambda entry: entry['calculated_at'])
+        if slices:
+            slices = self.apply_lod(slices, now if now is not None else pd.Timestamp(slices[-1]['calculated_at']),
+                                    stats)
+
+        shards = []
+        if len(posts_df) > 0:
+            hours = pd.to_datetime(posts_df['created_at'], utc=True).dt.floor('h')
+            for hour, rows in posts_df.groupby(hours, sort=True):
+                if (since is not None and hour < since.floor('h')) or (posts_truncated and hour == hours.min()):
+                    continue
+                columns_shard, text_shard = encode_posts_shard(rows)
+                shards.append({
+                    'hour': hour.strftime('%Y-%m-%dT%H:%M:%SZ'),
+                    'count': len(rows),
+                    'file': self._write_file('posts', _stamp(hour, 'h'), columns_shard, 'bin.gz', stats),
+                    'text': self._write_file('posts', _stamp(hour, 'h'), text_shard, 'text.json.gz', stats)
+                })
+
+        manifest = {
+            'format': EXPORT_FORMAT,
+            'density': {'format': DENSITY_FORMAT, 'dtype': 'uint16', 'slices': slices},
+            'posts_format': POSTS_FORMAT,
+            'posts': shards
+        }
+        if manifest != previous or not os.path.exists(self.manifest_path):
+            tmp_path = f'{self.manifest_path}.tmp'
+            with open(tmp_path, 'w') as f:
+                json.dump(manifest, f, separators=(',', ':'))
+            os.replace(tmp_path, self.manifest_path)
+            stats['changed'] = True
+
+        stats['files_removed'] = self.collect_garbage(manifest)
+        stats.update({
+            'density_slices': len(slices),
+            'density_points': sum(entry['grid']['x']['count'] * entry['grid']['y']['count'] for entry in slices),
+            'posts_shards': len(shards),
+            'posts_count': sum(shard['count'] for shard in shards)
+        })
+        return stats
+
+    def collect_garbage(self, manifest: dict) -> int:
+        """Delete export files the manifest no longer references; returns how many"""
+        referenced = {entry['file'] for entry in manifest['density']['slices']}
+        referenced.update(name for shard in manifest['posts'] for name in (shard['file'], shard['text']))
+        removed = 0
+        for subdir in EXPORT_SUBDIRS:
+            path = os.path.join(self.directory, subdir)
+            if not os.path.isdir(path):
+                continue
+            for name in os.listdir(path):
+                if f'{subdir}/{name}' not in referenced:
+                    os.remove(os.path.join(path, name))
+                    removed += 1
+        return removed
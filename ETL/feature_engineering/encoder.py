@@ -1,10 +1,12 @@
-from sentence_transformers import SentenceTransformer
-from umap import UMAP
-from sklearn.decomposition import PCA
-import torch
+# sentence_transformers, torch, umap (and TensorFlow, via parametric UMAP) and
+# sklearn take seconds to import, so they are imported inside the functions
+# that use them; importing this module (and ETL.etl) stays cheap.
 import numpy as np
 import pickle
 import os
+from functools import lru_cache
+
+from ETL.tracing import span
 
 def run(posts,
         model_name='sentence-transformers/all-mpnet-base-v2',
@@ -92,13 +94,6 @@ def run(posts,
             return posts
     else:
         # Calculate new embeddings (original behavior)
-        # Load sentence transformer model
-        model = SentenceTransformer(model_name)
-        
-        # Set device if specified
-        if device:
-            model = model.to(device)
-        
         # Extract post text (skipping None or empty text)
         valid_indices = []
         texts_to_encode = []
@@ -109,30 +104,9 @@ def run(posts,
                 valid_indices.append(i)
                 texts_to_encode.append(text)
         
-        # Process post texts in batches to get original embeddings
-        original_embeddings = []
-        
-        for i in range(0, len(texts_to_encode), batch_size):
-            batch = texts_to_encode[i:i+batch_size]
-            batch_embeddings = model.encode(
-                batch, 
-                convert_to_tensor=True, 
-                normalize_embeddings=True,
-                show_progress_bar=False
-            )
-            
-            # Convert to numpy for storage
-            if isinstance(batch_embeddings, torch.Tensor):
-                batch_embeddings_np = batch_embeddings.cpu().numpy()
-            else:
-                batch_embeddings_np = np.array(batch_embeddings)
-                
-            original_embeddings.append(batch_embeddings_np)
+        all_embeddings = _encode_texts(texts_to_encode, model_name, batch_size, device)
         
-        # Combine all batches
-        if original_embeddings:
-            all_embeddings = np.vstack(original_embeddings)
-            
+        if all_embeddings is not None:
             # Store embeddings in posts if we calculated them
             original_embeddings_list = all_embeddings.tolist()
             for idx, post_idx in enumerate(valid_indices):
@@ -141,116 +115,175 @@ def run(posts,
             print("⚠️  No valid post text found for embedding.")
             return posts
     
+    # Apply PCA and UMAP dimensionality reduction
+    if len(all_embeddings) > 0:
+        umap_embeddings = _reduce(
+            all_embeddings, umap_components, random_state, min_dist, n_neighbors, spread,
+            batch_size, umap_model_path, use_parametric, use_pca, pca_components,
+            save_parametric_model_path
+        )
+        
+        # Convert UMAP embeddings to list format and assign to posts
+        umap_embeddings_list = umap_embeddings.tolist()
+        
+        for idx, post_idx in enumerate(valid_indices):
+            for component_idx in range(umap_components):
+                posts[post_idx][f'UMAP{component_idx + 1}'] = umap_embeddings_list[idx][component_idx]
+    
+    return posts
+
+
+@lru_cache(maxsize=2)
+def _sentence_model(model_name, device=None):
+    """Load a sentence transformer once per process (kept warm between runs)"""
+    from sentence_transformers import SentenceTransformer
+    
+    model = SentenceTransformer(model_name)
+    
+    # Set device if specified
+    if device:
+        model = model.to(device)
+    return model
+
+
+def _encode_texts(texts, model_name, batch_size, device=None):
+    """Embed texts with a sentence transformer, returning a normalized (n, dim) array"""
+    import torch
+    
+    model = _sentence_model(model_name, device)
+    
+    # Process post texts in batches to get original embeddings
+    original_embeddings = []
+    
+    for i in range(0, len(texts), batch_size):
+        batch = texts[i:i+batch_size]
+        batch_embeddings = model.encode(
+            batch, 
+            convert_to_tensor=True, 
+            normalize_embeddings=True,
+            show_progress_bar=False
+        )
+        
+        # Convert to numpy for storage
+        if isinstance(batch_embeddings, torch.Tensor):
+            batch_embeddings_np = batch_embeddings.cpu().numpy()
+        else:
+            batch_embeddings_np = np.array(batch_embeddings)
+            
+        original_embeddings.append(batch_embeddings_np)
+    
+    return np.vstack(original_embeddings) if original_embeddings else None
+
+
+@lru_cache(maxsize=2)
+def _load_saved_umap(umap_model_path):
+    """Load a saved Parametric UMAP (local, gs:// or hf:// path) once per process"""
+    print(f"Loading saved Parametric UMAP model from: {umap_model_path}")
+    is_cloud_path = umap_model_path.startswith('gs://')
+    is_hf_path = umap_model_path.startswith('hf://')
+    
+    if is_hf_path:
+        # For Hugging Face, download model to local cache
+        from huggingface_hub import snapshot_download
+    
+        # Parse repo_id from hf:// URL (e.g., hf://notMuhammad/atproto-topic-umap)
+        repo_id = umap_model_path.replace('hf://', '')
+    
+        # Download model to local cache
+        local_model_path = snapshot_download(
+            repo_id=repo_id,
+            repo_type="model"
+        )
+        print(f"Downloaded model from Hugging Face to: {local_model_path}")
+    
+        # Load from local cache directory
+        from umap.parametric_umap import load_ParametricUMAP
+        umap_instance = load_ParametricUMAP(os.path.join(local_model_path, "model"))
+    
+    elif is_cloud_path:
+        # For cloud storage, download model to temp directory first
+        import tempfile
+        from google.cloud import storage
+    
+        temp_dir = tempfile.mkdtemp()
+    
+        # Parse bucket and path from gs:// URL
+        path_parts = umap_model_path.replace('gs://', '').split('/', 1)
+        bucket_name = path_parts[0]
+        model_prefix = path_parts[1] if len(path_parts) > 1 else ''
+    
+        # Download model files
+        client = storage.Client()
+        bucket = client.bucket(bucket_name)
+    
+        # List and download all model files
+        blobs = bucket.list_blobs(prefix=model_prefix)
+        local_model_path = None
+    
+        for blob in blobs:
+            if blob.name.endswith('/'):
+                continue  # Skip directories
+    
+            # Create local file path
+            local_file_path = os.path.join(temp_dir, os.path.basename(blob.name))
+            blob.download_to_filename(local_file_path)
+            print(f"Downloaded {blob.name} to {local_file_path}")
+    
+            # Set model path to directory for loading
+            if local_model_path is None:
+                local_model_path = temp_dir
+    
+        # Load from local temp directory
+        from umap.parametric_umap import load_ParametricUMAP
+        umap_instance = load_ParametricUMAP(local_model_path)
+    else:
+        # Load from local path
+        from umap.parametric_umap import load_ParametricUMAP
+        umap_instance = load_ParametricUMAP(umap_model_path)
+    
+    return umap_instance
+
+
+def _reduce(all_embeddings, umap_components, random_state, min_dist, n_neighbors, spread,
+            batch_size, umap_model_path, use_parametric, use_pca, pca_components,
+            save_parametric_model_path):
+    """Apply optional PCA and then UMAP (standard, new parametric or saved parametric)"""
     # Apply PCA before UMAP if requested
     if len(all_embeddings) > 0 and use_pca and all_embeddings.shape[1] > pca_components:
+        from sklearn.decomposition import PCA
+        
         print(f"🔄 Applying PCA to reduce from {all_embeddings.shape[1]} to {pca_components} dimensions...")
         pca = PCA(n_components=pca_components, random_state=random_state)
         all_embeddings = pca.fit_transform(all_embeddings)
         print(f"✅ PCA explained variance ratio: {pca.explained_variance_ratio_.sum():.3f}")
     
     # Apply UMAP dimensionality reduction
-    if len(all_embeddings) > 0:
-        # Choose UMAP approach based on parameters
-        if umap_model_path:
-            # Check if it's a cloud storage path, hugging face path, or local path
-            is_cloud_path = umap_model_path.startswith('gs://')
-            is_hf_path = umap_model_path.startswith('hf://')
-            path_exists = is_cloud_path or is_hf_path or os.path.exists(umap_model_path)
-            
-            if path_exists:
-                # Load saved Parametric UMAP model
-                print(f"Loading saved Parametric UMAP model from: {umap_model_path}")
-                try:
-                    if is_hf_path:
-                        # For Hugging Face, download model to local cache
-                        from huggingface_hub import snapshot_download
-                        
-                        # Parse repo_id from hf:// URL (e.g., hf://notMuhammad/atproto-topic-umap)
-                        repo_id = umap_model_path.replace('hf://', '')
-                        
-                        # Download model to local cache
-                        local_model_path = snapshot_download(
-                            repo_id=repo_id,
-                            repo_type="model"
-                        )
-                        print(f"Downloaded model from Hugging Face to: {local_model_path}")
-                        
-                        # Load from local cache directory
-                        from umap.parametric_umap import load_ParametricUMAP
-                        umap_instance = load_ParametricUMAP(os.path.join(local_model_path, "model"))
-                        
-                    elif is_cloud_path:
-                        # For cloud storage, download model to temp directory first
-                        import tempfile
-                        from google.cloud import storage
-                        
-                        temp_dir = tempfile.mkdtemp()
-                        
-                        # Parse bucket and path from gs:// URL
-                        path_parts = umap_model_path.replace('gs://', '').split('/', 1)
-                        bucket_name = path_parts[0]
-                        model_prefix = path_parts[1] if len(path_parts) > 1 else ''
-                        
-                        # Download model files
-                        client = storage.Client()
-                        bucket = client.bucket(bucket_name)
-                        
-                        # List and download all model files
-                        blobs = bucket.list_blobs(prefix=model_prefix)
-                        local_model_path = None
-                        
-                        for blob in blobs:
-                            if blob.name.endswith('/'):
-                                continue  # Skip directories
-                            
-                            # Create local file path
-                            local_file_path = os.path.join(temp_dir, os.path.basename(blob.name))
-                            blob.download_to_filename(local_file_path)
-                            print(f"Downloaded {blob.name} to {local_file_path}")
-                            
-                            # Set model path to directory for loading
-                            if local_model_path is None:
-                                local_model_path = temp_dir
-                        
-                        # Load from local temp directory
-                        from umap.parametric_umap import load_ParametricUMAP
-                        umap_instance = load_ParametricUMAP(local_model_path)
-                    else:
-                        # Load from local path
-                        from umap.parametric_umap import load_ParametricUMAP
-                        umap_instance = load_ParametricUMAP(umap_model_path)
-                        
-                except Exception as e:
-                    print(f"Failed to load model: {e}")
-                    print("Creating new Parametric UMAP instead...")
-                    # Fall through to create new model
-                    umap_instance = None
-                
-                if umap_instance is not None:
-                    # Transform using the loaded model
-                    umap_embeddings = umap_instance.transform(all_embeddings)
-                    print(f"✅ Applied saved Parametric UMAP to {len(all_embeddings)} embeddings")
-                else:
-                    # Create new model if loading failed
-                    print("Creating new Parametric UMAP...")
-                    from umap.parametric_umap import ParametricUMAP
-                    
-                    umap_instance = ParametricUMAP(
-                        n_components=umap_components,
-                        random_state=random_state,
-                        min_dist=min_dist,
-                        n_neighbors=n_neighbors,
-                        spread=spread,
-                        batch_size=min(batch_size, 128)
-                    )
-                    umap_embeddings = umap_instance.fit_transform(all_embeddings)
-                    print(f"✅ Created new Parametric UMAP for {len(all_embeddings)} embeddings")
+    # Choose UMAP approach based on parameters
+    if umap_model_path:
+        # Check if it's a cloud storage path, hugging face path, or local path
+        is_cloud_path = umap_model_path.startswith('gs://')
+        is_hf_path = umap_model_path.startswith('hf://')
+        path_exists = is_cloud_path or is_hf_path or os.path.exists(umap_model_path)
+    
+        if path_exists:
+            # Load saved Parametric UMAP model (cached after the first load)
+            try:
+                umap_instance = _load_saved_umap(umap_model_path)
+            except Exception as e:
+                print(f"Failed to load model: {e}")
+                print("Creating new Parametric UMAP instead...")
+                # Fall through to create new model
+                umap_instance = None
+    
+            if umap_instance is not None:
+                # Transform using the loaded model
+                umap_embeddings = umap_instance.transform(all_embeddings)
+                print(f"✅ Applied saved Parametric UMAP to {len(all_embeddings)} embeddings")
             else:
-                print(f"Model path {umap_model_path} does not exist, creating new model")
-                # Create new model
+                # Create new model if loading failed
                 print("Creating new Parametric UMAP...")
                 from umap.parametric_umap import ParametricUMAP
-                
+    
                 umap_instance = ParametricUMAP(
                     n_components=umap_components,
                     random_state=random_state,
@@ -261,12 +294,12 @@ def run(posts,
                 )
                 umap_embeddings = umap_instance.fit_transform(all_embeddings)
                 print(f"✅ Created new Parametric UMAP for {len(all_embeddings)} embeddings")
-            
-        elif use_parametric:
-            # Create new Parametric UMAP
+        else:
+            print(f"Model path {umap_model_path} does not exist, creating new model")
+            # Create new model
             print("Creating new Parametric UMAP...")
             from umap.parametric_umap import ParametricUMAP
-            
+    
             umap_instance = ParametricUMAP(
                 n_components=umap_components,
                 random_state=random_state,
@@ -274,40 +307,92 @@ def run(posts,
                 n_neighbors=n_neighbors,
                 spread=spread,
                 batch_size=min(batch_size, 128)
-                 )
-            
-
-            umap_embeddings = umap_instance.fit_transform(all_embeddings)
-            print(f"✅ Created new Parametric UMAP for {len(all_embeddings)} embeddings")
-
-            # Save the trained model if requested
-            if save_parametric_model_path:
-                os.makedirs(os.path.dirname(save_parametric_model_path), exist_ok=True)
-                try:
-                    umap_instance.save(save_parametric_model_path)
-                    print(f"✅ Saved Parametric UMAP model to {save_parametric_model_path}")
-                except Exception as e:
-                    print(f"⚠️ Failed to save Parametric UMAP model: {e}")
-            
-        else:
-            # Use standard UMAP (original behavior)
-            print("Using standard UMAP...")
-            umap_instance = UMAP(
-                n_components=umap_components,
-                random_state=random_state,
-                min_dist=min_dist,
-                n_neighbors=n_neighbors,
-                spread=spread,
-                metric='euclidean',
             )
             umap_embeddings = umap_instance.fit_transform(all_embeddings)
-            print(f"✅ Applied standard UMAP to {len(all_embeddings)} embeddings")
-        
-        # Convert UMAP embeddings to list format and assign to posts
-        umap_embeddings_list = umap_embeddings.tolist()
+            print(f"✅ Created new Parametric UMAP for {len(all_embeddings)} embeddings")
+    
+    elif use_parametric:
+        # Create new Parametric UMAP
+        print("Creating new Parametric UMAP...")
+        from umap.parametric_umap import ParametricUMAP
+    
+        umap_instance = ParametricUMAP(
+            n_components=umap_components,
+            random_state=random_state,
+            min_dist=min_dist,
+            n_neighbors=n_neighbors,
+            spread=spread,
+            batch_size=min(batch_size, 128)
+             )
+    
+    
+        umap_embeddings = umap_instance.fit_transform(all_embeddings)
+        print(f"✅ Created new Parametric UMAP for {len(all_embeddings)} embeddings")
+    
+        # Save the trained model if requested
+        if save_parametric_model_path:
+            os.makedirs(os.path.dirname(save_parametric_model_path), exist_ok=True)
+            try:
+                umap_instance.save(save_parametric_model_path)
+                print(f"✅ Saved Parametric UMAP model to {save_parametric_model_path}")
+            except Exception as e:
+                print(f"⚠️ Failed to save Parametric UMAP model: {e}")
+    
+    else:
+        # Use standard UMAP (original behavior)
+        print("Using standard UMAP...")
+        from umap import UMAP
         
-        for idx, post_idx in enumerate(valid_indices):
-            for component_idx in range(umap_components):
-                posts[post_idx][f'UMAP{component_idx + 1}'] = umap_embeddings_list[idx][component_idx]
+        umap_instance = UMAP(
+            n_components=umap_components,
+            random_state=random_state,
+            min_dist=min_dist,
+            n_neighbors=n_neighbors,
+            spread=spread,
+            metric='euclidean',
+        )
+        umap_embeddings = umap_instance.fit_transform(all_embeddings)
+        print(f"✅ Applied standard UMAP to {len(all_embeddings)} embeddings")
+    
+    return umap_embeddings
+
+
+def transform(texts,
+              model_name='sentence-transformers/all-mpnet-base-v2',
+              batch_size=100,
+              umap_components=5,
+              random_state=42,
+              min_dist=0.0,
+              n_neighbors=15,
+              spread=20,
+              device=None,
+              umap_model_path=None,
+              use_parametric=False,
+              use_pca=True,
+              pca_components=50,
+              save_parametric_model_path=None):
+    """
+    Embed and UMAP-reduce a column of texts without building per-post dicts.
+    
+    Takes the same options as `run`. Empty or non-string texts are skipped.
+    
+    Returns:
+    --------
+    (list of int, numpy.ndarray or None)
+        Indices of the texts that were encoded, and their (n, umap_components)
+        UMAP coordinates in the same order (None if nothing was encoded)
+    """
+    valid_indices = [i for i, text in enumerate(texts)
+                     if text and isinstance(text, str) and text.strip()]
+    if not valid_indices:
+        return valid_indices, None
     
-    return posts
\ No newline at end of file
+    with span('embed', items=len(valid_indices)):
+        all_embeddings = _encode_texts([texts[i] for i in valid_indices], model_name, batch_size, device)
+    with span('umap', items=len(valid_indices)):
+        umap_embeddings = _reduce(
+            all_embeddings, umap_components, random_state, min_dist, n_neighbors, spread,
+            batch_size, umap_model_path, use_parametric, use_pca, pca_components,
+            save_parametric_model_path
+        )
+    return valid_indices, umap_embeddings
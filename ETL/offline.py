@@ -0,0 +1,76 @@
+import os
+from typing import Optional
+
+from ETL.clients.recorded import RecordedEncoder, RecordedFeedAPI, load_recorded_posts, retime_posts, write_capture
+
+OFFLINE_DIR = 'data/local/offline'
+
+
+def offline_etl(directory: str = OFFLINE_DIR, corpus_path: str = 'data/posts.json',
+                feed_latency: Optional[float] = None, encode_seconds_per_text: Optional[float] = None,
+                persist: bool = False, feed_api=None):
+    """
+    Build an ATProtoETL that runs end to end without Bluesky, BigQuery or the models
+
+    Feeds are replayed from the recorded corpus (retimed to end now, with new
+    URIs on every walk so repeated runs keep finding new posts), storage is
+    DuckDB and the encoder returns deterministic coordinates. Exports,
+    traces, the seen-URI index and the session file go under `directory`,
+    leaving data/ untouched.
+
+    Args:
+        directory: Where offline outputs are written
+        corpus_path: Exported posts replayed as the feed (default: data/posts.json)
+        feed_latency: Seconds slept per feed request (default: ETL_OFFLINE_FEED_LATENCY or 0)
+        encode_seconds_per_text: Seconds slept per encoded text
+            (default: ETL_OFFLINE_ENCODE_SECONDS or 0)
+        persist: Keep the DuckDB database and seen-URI index in `directory` between
+            invocations; by default every invocation starts from empty storage
+        feed_api: Stand-in for the atproto client to collect from instead of
+            the recorded feed (anything with `login` and `app.bsky.feed.get_feed`)
+    """
+    from ETL.clients.bluesky import Client as BlueskyClient
+    from ETL.etl import ATProtoETL
+    from ETL.storage.cost import QueryLedger
+    from ETL.storage.local import DuckDBStorage
+
+    if feed_latency is None:
+        feed_latency = float(os.environ.get('ETL_OFFLINE_FEED_LATENCY', 0.0))
+    if encode_seconds_per_text is None:
+        encode_seconds_per_text = float(os.environ.get('ETL_OFFLINE_ENCODE_SECONDS', 0.0))
+
+    os.makedirs(directory, exist_ok=True)
+    seen_index_path = os.path.join(directory, 'seen_uris.bin')
+    if not persist and os.path.exists(seen_index_path):
+        os.remove(seen_index_path)
+
+    # Shifted to end now so the export's 24-hour window sees them
+    posts = retime_posts(load_recorded_posts(corpus_path))
+    bluesky_client = BlueskyClient(
+        client=feed_api or RecordedFeedAPI(posts=posts, latency=feed_latency, fresh_walks=True),
+        session_path=os.path.join(directory, 'bluesky_session')
+    )
+    bluesky_client.handle = bluesky_client.handle or 'recorded.test'
+
+    etl = ATProtoETL(
+        bluesky_client=bluesky_client,
+        encoder=RecordedEncoder(posts=posts, seconds_per_text=encode_seconds_per_text)
+    )
+    etl.storage_backend = 'duckdb'
+    etl.storage = DuckDBStorage(
+        os.path.join(directory, 'warehouse.duckdb') if persist else ':memory:',
+        ledger=QueryLedger(byte_budget=etl.query_byte_budget)
+    )
+    etl.seen_index_path = seen_index_path
+    etl.data_dir = directory
+    etl.trace_dir = os.path.join(directory, 'traces')
+    return etl
+
+
+def offline_capture(directory: str = OFFLINE_DIR, corpus_path: str = 'data/posts.json',
+                    events: int = 2000) -> str:
+    """Write a Jetstream capture of the recorded corpus for offline streaming; returns its path"""
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, 'capture.jsonl')
+    write_capture(path, load_recorded_posts(corpus_path), events=events)
+    return path
@@ -0,0 +1,239 @@
+import logging
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+# Queue marker for the end of the stream
+_END = object()
+
+
+class PipelineError(Exception):
+    """A stage raised; the original exception is chained as __cause__"""
+
+    def __init__(self, stage: str, error: BaseException):
+        super().__init__(f"Stage '{stage}' failed: {error}")
+        self.stage = stage
+        self.error = error
+
+
+class Stage:
+    """
+    One pipeline step: `func(item)` runs on `workers` threads.
+
+    `func` returns the item passed downstream, or None to drop it. With more
+    than one worker, results are put back in input order before moving on.
+    """
+
+    def __init__(self, name: str, func: Callable[[Any], Any], workers: int = 1):
+        self.name = name
+        self.func = func
+        self.workers = max(1, workers)
+        self.items = 0
+        self.busy_seconds = 0.0
+        self.idle_seconds = 0.0
+        self.blocked_seconds = 0.0
+        self.queue_high_water = 0
+        self._lock = threading.Lock()
+
+    def _record(self, busy: float, idle: float, blocked: float, queued: int = 0):
+        with self._lock:
+            self.items += 1
+            self.busy_seconds += busy
+            self.idle_seconds += idle
+            self.blocked_seconds += blocked
+            self.queue_high_water = max(self.queue_high_water, queued)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'items': self.items,
+            'workers': self.workers,
+            'busy_seconds': round(self.busy_seconds, 3),
+            # Waiting on the upstream queue (starved) vs the downstream queue (backpressure)
+            'idle_seconds': round(self.idle_seconds, 3),
+            'blocked_seconds': round(self.blocked_seconds, 3),
+            # Most items waiting in the stage's input queue (including the one taken)
+            'queue_high_water': self.queue_high_water
+        }
+
+
+class Pipeline:
+    """
+    Runs a source and a chain of stages concurrently, connected by bounded queues.
+
+    The source iterator is drained on its own thread and every stage runs on
+    its own worker thread(s), so while batch N is being encoded batch N+1 can
+    be fetched and batch N-1 loaded. Queues hold at most `queue_size` items,
+    so a slow stage holds back the ones before it instead of buffering the
+    whole run in memory; throughput settles at the slowest stage's rate.
+
+    Items leave every stage in the order the source produced them. The first
+    exception in any stage (or the source) stops the pipeline: upstream
+    work is abandoned, queued items are discarded, and `run()` raises
+    PipelineError once every thread has exited.
+    """
+
+    def __init__(self, source: Iterable[Any], stages: List[Stage], queue_size: int = 2,
+                 size: Optional[Callable[[Any], int]] = None):
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.source = source
+        self.stages = stages
+        self.queue_size = queue_size
+        # Counts the units moving through (e.g. posts per batch) for throughput
+        self.size = size or (lambda item: 1)
+        self.source_stage = Stage('source', None)
+        self._failed = threading.Event()
+        self._error = None
+        self._error_lock = threading.Lock()
+        self.units = 0
+        self.seconds = 0.0
+
+    def _fail(self, stage: str, error: BaseException):
+        with self._error_lock:
+            if self._error is None:
+                self._error = PipelineError(stage, error)
+                self._error.__cause__ = error
+                self.logger.error(f"Pipeline stage '{stage}' failed: {error}")
+        self._failed.set()
+
+    def _put(self, out: queue.Queue, item) -> bool:
+        """Put with periodic checks for failure; returns False if the pipeline failed"""
+        while not self._failed.is_set():
+            try:
+                out.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _get(self, inbox: queue.Queue):
+        """Get with periodic checks for failure; returns _END if the pipeline failed"""
+        while not self._failed.is_set():
+            try:
+                return inbox.get(timeout=0.1)
+            except queue.Empty:
+                continue
+        return _END
+
+    def _run_source(self, out: queue.Queue):
+        stage = self.source_stage
+        sequence = 0
+        try:
+            iterator = iter(self.source)
+            while not self._failed.is_set():
+                started = time.perf_counter()
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    break
+                produced = time.perf_counter()
+                if not self._put(out, (sequence, item)):
+                    break
+                stage._record(produced - started, 0.0, time.perf_counter() - produced)
+                sequence += 1
+        except Exception as e:
+            self._fail(stage.name, e)
+        finally:
+            # Let a generator source release its resources if the pipeline stopped early
+            close = getattr(self.source, 'close', None)
+            if close is not None:
+                close()
+            self._put(out, _END)
+
+    def _run_worker(self, stage: Stage, inbox: queue.Queue, results: queue.Queue):
+        while True:
+            waited = time.perf_counter()
+            message = self._get(inbox)
+            if message is _END:
+                # Pass the marker on for this stage's other workers
+                if not self._failed.is_set():
+                    inbox.put(_END)
+                return
+
+            sequence, item = message
+            queued = inbox.qsize() + 1
+            started = time.perf_counter()
+            try:
+                result = stage.func(item)
+            except Exception as e:
+                self._fail(stage.name, e)
+                return
+            finished = time.perf_counter()
+
+            if not self._put(results, (sequence, result)):
+                return
+            stage._record(finished - started, started - waited, time.perf_counter() - finished, queued)
+
+    def _run_reorder(self, stage: Stage, results: queue.Queue, out: queue.Queue, workers):
+        """Forward a stage's results downstream in source order, dropping None results"""
+        pending = {}
+        next_in = 0
+        next_out = 0
+        while True:
+            try:
+                sequence, result = results.get(timeout=0.1)
+            except queue.Empty:
+                if self._failed.is_set():
+                    return
+                if not any(worker.is_alive() for worker in workers) and results.empty():
+                    break
+                continue
+
+            # Hold results that finished early until every earlier one is through
+            pending[sequence] = result
+            while next_in in pending:
+                result = pending.pop(next_in)
+                next_in += 1
+                if result is None:
+                    continue
+                if not self._put(out, (next_out, result)):
+                    return
+                next_out += 1
+
+        self._put(out, _END)
+
+    def run(self) -> Dict[str, Any]:
+        """Run to completion; returns per-stage stats, raising PipelineError if a stage failed"""
+        started = time.perf_counter()
+        first = queue.Queue(maxsize=self.queue_size)
+        threads = [threading.Thread(target=self._run_source, args=(first,),
+                                    name='pipeline-source', daemon=True)]
+
+        inbox = first
+        for stage in self.stages:
+            results = queue.Queue(maxsize=self.queue_size)
+            out = queue.Queue(maxsize=self.queue_size)
+            workers = [threading.Thread(target=self._run_worker, args=(stage, inbox, results),
+                                        name=f'pipeline-{stage.name}-{n}', daemon=True)
+                       for n in range(stage.workers)]
+            threads.extend(workers)
+            threads.append(threading.Thread(target=self._run_reorder, args=(stage, results, out, workers),
+                                            name=f'pipeline-{stage.name}-order', daemon=True))
+            inbox = out
+
+        for thread in threads:
+            thread.start()
+
+        # Drain the last stage's output, counting units that made it all the way through
+        while True:
+            message = self._get(inbox)
+            if message is _END:
+                break
+            self.units += self.size(message[1])
+
+        for thread in threads:
+            thread.join()
+        self.seconds = time.perf_counter() - started
+
+        if self._error is not None:
+            raise self._error
+        return self.stats()
+
+    def stats(self) -> Dict[str, Any]:
+        minutes = self.seconds / 60
+        return {
+            'seconds': round(self.seconds, 3),
+            'units': self.units,
+            'units_per_minute': round(self.units / minutes, 1) if minutes else None,
+            'stages': {stage.name: stage.stats() for stage in [self.source_stage] + self.stages}
+        }
@@ -0,0 +1,211 @@
+import fcntl
+import logging
+import os
+import random
+import signal
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+
+class Job:
+    """One recurring task: `func` every `interval` seconds, plus up to `jitter` of the interval"""
+
+    def __init__(self, name: str, interval: float, func: Callable[[], Any], jitter: float = 0.0,
+                 first_delay: float = 0.0):
+        self.name = name
+        self.interval = interval
+        self.func = func
+        self.jitter = jitter
+        self.next_run = time.monotonic() + first_delay
+        self.runs = 0
+        self.failures = 0
+        self.skipped = 0
+        self.last_seconds = None
+        self.total_seconds = 0.0
+        self.last_result = None
+
+    def schedule_next(self, now: float):
+        """
+        Advance to the next slot after `now` on the fixed-rate grid
+
+        Slots missed while a run overran are coalesced into the next one
+        (and counted in `skipped`) instead of running back to back.
+        """
+        slot = self.next_run + self.interval
+        while slot <= now:
+            slot += self.interval
+            self.skipped += 1
+        # Jitter only delays, so a stage never runs before its cadence is up
+        self.next_run = slot + random.uniform(0, self.jitter * self.interval)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'runs': self.runs,
+            'failures': self.failures,
+            'skipped': self.skipped,
+            'last_seconds': round(self.last_seconds, 3) if self.last_seconds is not None else None,
+            'mean_seconds': round(self.total_seconds / self.runs, 3) if self.runs else None,
+            'next_in_seconds': round(max(0.0, self.next_run - time.monotonic()), 1)
+        }
+
+
+class Scheduler:
+    """
+    In-process scheduler for the long-running worker.
+
+    Jobs run one at a time on the calling thread, earliest due first, so
+    stages never overlap each other or themselves and share one warm ETL
+    instance (clients, session, models, seen-URI index). A job whose run
+    overruns its next slot is coalesced rather than queued up.
+
+    `lock_path` takes an exclusive file lock for the scheduler's lifetime so
+    a second worker on the same host exits instead of running the same
+    stages concurrently. SIGTERM/SIGINT (see `install_signal_handlers`)
+    let the running job finish and then stop the loop.
+    """
+
+    def __init__(self, lock_path: Optional[str] = None):
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.jobs: List[Job] = []
+        self.lock_path = lock_path
+        self._lock_file = None
+        self._stop = threading.Event()
+
+    def add(self, name: str, interval: float, func: Callable[[], Any], jitter: float = 0.0,
+            first_delay: float = 0.0) -> Job:
+        """Register `func` to run every `interval` seconds, first after `first_delay` seconds"""
+        job = Job(name, interval, func, jitter=jitter, first_delay=first_delay)
+        self.jobs.append(job)
+        return job
+
+    def stop(self, *_):
+        """Ask the loop to exit once the running job (if any) completes"""
+        if not self._stop.is_set():
+            self.logger.info("Shutdown requested - stopping after the current job")
+        self._stop.set()
+
+    @property
+    def stopping(self) -> bool:
+        return self._stop.is_set()
+
+    def install_signal_handlers(self):
+        """Stop gracefully on SIGTERM (sent by the platform on deploys/restarts) and SIGINT"""
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+
+    def _acquire_lock(self):
+        if not self.lock_path:
+            return
+        os.makedirs(os.path.dirname(self.lock_path) or '.', exist_ok=True)
+        self._lock_file = open(self.lock_path, 'w')
+        try:
+            fcntl.flock(self._lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            self._lock_file.close()
+            self._lock_file = None
+            raise RuntimeError(f"Another scheduler holds {self.lock_path}")
+        self._lock_file.write(str(os.getpid()))
+        self._lock_file.flush()
+
+    def _release_lock(self):
+        if self._lock_file is not None:
+            fcntl.flock(self._lock_file, fcntl.LOCK_UN)
+            self._lock_file.close()
+            self._lock_file = None
+
+    def run_job(self, job: Job):
+        """Run one job, recording its duration and outcome; errors are logged, not raised"""
+        started = time.monotonic()
+        try:
+            job.last_result = job.func()
+            if isinstance(job.last_result, dict) and job.last_result.get('status') == 'error':
+                job.failures += 1
+        except Exception as e:
+            job.failures += 1
+            job.last_result = {'status': 'error', 'error': str(e)}
+            self.logger.error(f"Job {job.name} failed: {e}", exc_info=True)
+        finished = time.monotonic()
+
+        job.runs += 1
+        job.last_seconds = finished - started
+        job.total_seconds += job.last_seconds
+        job.schedule_next(finished)
+        self.logger.info(f"Job {job.name} finished in {job.last_seconds:.2f}s; "
+                         f"next in {job.next_run - finished:.0f}s")
+
+    def run(self, max_runs: Optional[int] = None, duration: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Run jobs as they come due until stopped
+
+        Args:
+            max_runs: Stop after this many job runs in total
+            duration: Stop after this many seconds
+        """
+        self._acquire_lock()
+        started = time.monotonic()
+        deadline = started + duration if duration is not None else None
+        total_runs = 0
+        try:
+            while not self._stop.is_set():
+                job = min(self.jobs, key=lambda j: j.next_run)
+                wait = job.next_run - time.monotonic()
+                if deadline is not None:
+                    wait = min(wait, deadline - time.monotonic())
+                if wait > 0 and self._stop.wait(wait):
+                    break
+                if deadline is not None and time.monotonic() >= deadline:
+                    break
+                if job.next_run > time.monotonic():
+                    continue
+
+                self.run_job(job)
+                total_runs += 1
+                if max_runs is not None and total_runs >= max_runs:
+                    break
+        finally:
+            self._release_lock()
+
+        return self.stats(time.monotonic() - started)
+
+    def stats(self, elapsed: Optional[float] = None) -> Dict[str, Any]:
+        return {
+            'seconds': round(elapsed, 3) if elapsed is not None else None,
+            'jobs': {job.name: job.stats() for job in self.jobs}
+        }
+
+
+def run_daemon(etl=None, max_runs: Optional[int] = None, duration: Optional[float] = None) -> Dict[str, Any]:
+    """
+    Run the ETL as a long-lived worker: collection, density and export on their own cadences
+
+    Collection runs every ETL_COLLECT_INTERVAL_MINUTES (default 10); density
+    and export use the ETL's density/export intervals (30 and 60 minutes)
+    and pick up where the last process left off via the state store.
+    ETL_SCHEDULE_JITTER (default 0.05) adds up to that fraction of each
+    interval as a random delay.
+    """
+    from ETL.etl import ATProtoETL
+    from ETL.storage.state import LAST_DENSITY_SLICE, LAST_EXPORT
+
+    etl = etl or ATProtoETL()
+    jitter = float(os.environ.get('ETL_SCHEDULE_JITTER', 0.05))
+    collect_minutes = float(os.environ.get('ETL_COLLECT_INTERVAL_MINUTES', 10))
+
+    scheduler = Scheduler(lock_path=os.environ.get('ETL_SCHEDULER_LOCK', 'data/local/scheduler.lock'))
+    scheduler.install_signal_handlers()
+
+    scheduler.add('collect', collect_minutes * 60, lambda: etl.run_etl(density=False, export=False),
+                  jitter=jitter)
+    scheduler.add('density', etl.density_interval_minutes * 60, etl.run_density, jitter=jitter,
+                  first_delay=etl.seconds_until_due(LAST_DENSITY_SLICE, etl.density_interval_minutes))
+    scheduler.add('export', etl.export_interval_minutes * 60, etl.run_export, jitter=jitter,
+                  first_delay=etl.seconds_until_due(LAST_EXPORT, etl.export_interval_minutes))
+
+    try:
+        stats = scheduler.run(max_runs=max_runs, duration=duration)
+    except RuntimeError as e:
+        logging.getLogger('Scheduler').error(str(e))
+        return {"status": "error", "error": str(e)}
+
+    return {"status": "success", "scheduler": stats}
@@ -0,0 +1,84 @@
+import json
+import os
+import subprocess
+import sys
+import time
+from typing import Any, Dict, List
+
+# Modules that take seconds to import and must only load in the stages that need them
+HEAVY_MODULES = ('torch', 'sentence_transformers', 'umap', 'tensorflow', 'sklearn', 'scipy',
+                 'atproto', 'google.cloud.bigquery', 'duckdb')
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MAIN = os.path.join(ROOT, 'main.py')
+
+
+def profile_imports(module: str = 'main', top: int = 25) -> Dict[str, Any]:
+    """
+    Import `module` in a fresh interpreter under `-X importtime`
+
+    Returns the total import time and the `top` modules by cumulative time
+    (a module's cumulative time includes everything it imported first).
+    """
+    completed = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        cwd=ROOT, capture_output=True, text=True
+    )
+    if completed.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{completed.stderr[-2000:]}")
+
+    rows = []
+    for line in completed.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        rows.append({
+            'module': name.strip(),
+            'depth': (len(name) - len(name.lstrip()) - 1) // 2,
+            'self_ms': int(self_us) / 1000,
+            'cumulative_ms': int(cumulative_us) / 1000
+        })
+
+    total_ms = sum(row['cumulative_ms'] for row in rows if row['depth'] == 0)
+    rows.sort(key=lambda row: row['cumulative_ms'], reverse=True)
+    return {'module': module, 'total_ms': round(total_ms, 1), 'modules': rows[:top]}
+
+
+def loaded_heavy_modules(module: str = 'main') -> List[str]:
+    """Heavy modules that importing `module` loads as a side effect"""
+    script = (f"import json, sys, {module}; "
+              f"print(json.dumps([m for m in {list(HEAVY_MODULES)!r} if m in sys.modules]))")
+    completed = subprocess.run([sys.executable, '-c', script], cwd=ROOT, capture_output=True, text=True)
+    if completed.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{completed.stderr[-2000:]}")
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def measure_cold_start(runs: int = 3) -> List[float]:
+    """Seconds for `python main.py --help` (interpreter start, imports, argument parsing) per run"""
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        subprocess.run([sys.executable, MAIN, '--help'], cwd=ROOT, stdout=subprocess.DEVNULL, check=True)
+        timings.append(time.perf_counter() - started)
+    return timings
+
+
+def check_startup(budget: float, runs: int = 3) -> Dict[str, Any]:
+    """
+    Check `main.py` cold start against `budget` seconds
+
+    Passes when the fastest of `runs` cold starts is within budget (the
+    fastest run is the least disturbed by other load on the machine) and
+    importing main loads none of HEAVY_MODULES.
+    """
+    timings = measure_cold_start(runs)
+    heavy = loaded_heavy_modules()
+    best = min(timings)
+    return {
+        'ok': best <= budget and not heavy,
+        'budget_seconds': budget,
+        'best_seconds': round(best, 3),
+        'runs_seconds': [round(seconds, 3) for seconds in timings],
+        'heavy_modules_loaded': heavy
+    }
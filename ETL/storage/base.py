@@ -0,0 +1,125 @@
+import logging
+
+from ETL.storage.cost import QueryLedger
+
+
+class Storage:
+    """
+    Storage backend interface used by the ETL pipeline.
+
+    Tables are addressed by their logical table id (e.g. the posts or density
+    table); each backend decides how that maps onto datasets, files or schemas.
+    Read methods return pyarrow Tables so callers can choose when to
+    materialize pandas. Every read is tagged with a query name and its cost
+    statistics are recorded in `self.ledger`.
+    """
+
+    name = 'base'
+
+    def __init__(self, ledger=None):
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.ledger = ledger or QueryLedger()
+        self.query_timeout_seconds = None
+
+    def set_query_timeout(self, seconds):
+        """Bound how long a single query may run (None = no limit)"""
+        self.query_timeout_seconds = seconds
+
+    def append(self, dataframe, table_id, create_if_not_exists=True):
+        """
+        Append a DataFrame to a table
+
+        Args:
+            dataframe: pandas DataFrame to append
+            table_id: Logical table ID
+            create_if_not_exists: Create table if it doesn't exist
+        """
+        raise NotImplementedError
+
+    def read_window(self, table_id, columns, time_column, since,
+                    not_null=None, limit=None, types=None, query_name=None):
+        """
+        Read rows whose timestamp column is at or after `since`, newest first
+
+        Args:
+            table_id: Logical table ID
+            columns: List of columns to select
+            time_column: TIMESTAMP column used for the window and ordering
+            since: tz-aware pd.Timestamp lower bound (inclusive)
+            not_null: Optional list of columns that must be non-null
+            limit: Optional maximum number of rows
+            types: Optional mapping of column name -> pyarrow DataType
+            query_name: Name used to tag the query's cost statistics
+
+        Returns:
+            pyarrow Table
+        """
+        raise NotImplementedError
+
+    def read_created_window(self, table_id, columns, since, limit=None, types=None, query_name=None):
+        """
+        Read posts whose string `created_at` parses to a time at or after `since`
+
+        Posts store `created_at` as a formatted string, so each backend parses it
+        with its own timestamp functions. Rows must have UMAP1/UMAP2 coordinates.
+
+        Args:
+            table_id: Logical table ID of the posts table
+            columns: List of columns to select
+            since: tz-aware pd.Timestamp lower bound (inclusive)
+            limit: Optional maximum number of rows
+            types: Optional mapping of column name -> pyarrow DataType
+            query_name: Name used to tag the query's cost statistics
+
+        Returns:
+            pyarrow Table ordered by created_at descending
+        """
+        raise NotImplementedError
+
+    def update_counts(self, dataframe, table_id, key, columns, query_name=None):
+        """
+        Overwrite integer count columns of rows already in a table, matched on `key`, in one batch
+
+        Keys missing from the table are ignored; nothing is appended.
+
+        Args:
+            dataframe: pandas DataFrame with the key and update columns, one row per key
+            table_id: Logical table ID
+            key: Column identifying rows
+            columns: Integer count columns to overwrite
+            query_name: Name used to tag the update's cost statistics
+
+        Returns:
+            Number of table rows updated
+        """
+        raise NotImplementedError
+
+    def latest_timestamp(self, table_id, column, query_name=None):
+        """
+        Return MAX(column) as a tz-aware pd.Timestamp, or None if the table is empty or missing
+        """
+        raise NotImplementedError
+
+    def read_state(self, table_id):
+        """
+        Read every key of a state table in one query
+
+        Returns:
+            dict of key -> {'timestamp': pd.Timestamp, 'value': str or None};
+            empty if the table doesn't exist yet
+        """
+        raise NotImplementedError
+
+    def write_state(self, table_id, entries):
+        """
+        Upsert state keys, creating the state table if needed
+
+        Args:
+            table_id: Logical table ID of the state table
+            entries: dict of key -> {'timestamp': pd.Timestamp, 'value': str or None}
+        """
+        raise NotImplementedError
+
+    def close(self):
+        """Release backend resources"""
+        pass
@@ -0,0 +1,123 @@
+import pandas as pd
+
+from ETL.clients.bigQuery import Client as BigQueryClient
+from ETL.storage.base import Storage
+
+
+def _timestamp_literal(ts):
+    """Render a tz-aware timestamp as a BigQuery TIMESTAMP literal"""
+    return f"TIMESTAMP('{pd.Timestamp(ts).tz_convert('UTC').isoformat()}')"
+
+
+class BigQueryStorage(Storage):
+    """Storage backend backed by a BigQuery dataset"""
+
+    name = 'bigquery'
+
+    def __init__(self, credentials_json, project_id, dataset_id, client=None, ledger=None):
+        super().__init__(ledger)
+        self.project_id = project_id
+        self.dataset_id = dataset_id
+        self.client = client or BigQueryClient(credentials_json, project_id)
+        self.client.ledger = self.ledger
+
+    def _table(self, table_id):
+        return f"`{self.project_id}.{self.dataset_id}.{table_id}`"
+
+    def set_query_timeout(self, seconds):
+        super().set_query_timeout(seconds)
+        # Let BigQuery cancel the job server-side rather than leaving it running
+        self.client.job_timeout_ms = int(seconds * 1000) if seconds else None
+
+    def append(self, dataframe, table_id, create_if_not_exists=True):
+        self.client.append(
+            dataframe,
+            self.dataset_id,
+            table_id,
+            create_if_not_exists=create_if_not_exists
+        )
+
+    def update_counts(self, dataframe, table_id, key, columns, query_name=None):
+        return self.client.merge_update(
+            dataframe,
+            self.dataset_id,
+            table_id,
+            key,
+            columns,
+            query_name=query_name
+        )
+
+    def read_window(self, table_id, columns, time_column, since,
+                    not_null=None, limit=None, types=None, query_name=None):
+        conditions = [f"{time_column} >= {_timestamp_literal(since)}"]
+        conditions += [f"{col} IS NOT NULL" for col in (not_null or [])]
+
+        query = f"""
+        SELECT {', '.join(columns)}
+        FROM {self._table(table_id)}
+        WHERE {' AND '.join(conditions)}
+        ORDER BY {time_column} DESC
+        """
+        if limit:
+            query += f"LIMIT {int(limit)}"
+
+        return self.client.execute_query_arrow(query, types=types, query_name=query_name)
+
+    def read_created_window(self, table_id, columns, since, limit=None, types=None, query_name=None):
+        query = f"""
+        SELECT {', '.join(columns)}
+        FROM {self._table(table_id)}
+        WHERE UMAP1 IS NOT NULL AND UMAP2 IS NOT NULL
+        AND COALESCE(
+            SAFE.PARSE_TIMESTAMP('%Y-%m-%d %H:%M:%S %Z', created_at),
+            SAFE.PARSE_TIMESTAMP('%Y-%m-%dT%H:%M:%E*SZ', created_at)
+        ) >= {_timestamp_literal(since)}
+        ORDER BY created_at DESC
+        """
+        if limit:
+            query += f"LIMIT {int(limit)}"
+
+        return self.client.execute_query_arrow(query, types=types, query_name=query_name)
+
+    def latest_timestamp(self, table_id, column, query_name=None):
+        query = f"""
+        SELECT MAX({column}) as latest
+        FROM {self._table(table_id)}
+        """
+        result = self.client.execute_query_arrow(query, query_name=query_name)
+
+        if result.num_rows == 0:
+            return None
+
+        latest = result.column('latest')[0].as_py()
+        if latest is None:
+            return None
+
+        return pd.to_datetime(latest, utc=True)
+
+    def read_state(self, table_id):
+        result = self.client.get_timestamps(self.dataset_id, table_id)
+
+        state = {}
+        for row in result.to_dict('records'):
+            value = row.get('value')
+            state[row['key']] = {
+                'timestamp': pd.to_datetime(row['timestamp'], utc=True),
+                'value': None if pd.isna(value) else value
+            }
+        return state
+
+    def write_state(self, table_id, entries):
+        if not entries:
+            return
+
+        if not self.client.create_timestamp_table(self.dataset_id, table_id):
+            raise Exception(f"Could not create state table {table_id}")
+
+        self.client.upsert_state(self.dataset_id, table_id, entries)
+
+    def close(self):
+        try:
+            self.client.client.close()
+        except Exception:
+            pass
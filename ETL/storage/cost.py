@@ -0,0 +1,103 @@
+import logging
+import threading
+
+
+class ByteBudgetExceeded(Exception):
+    """Raised when a query would push the run over its byte budget"""
+
+    def __init__(self, query_name, estimated_bytes, used_bytes, byte_budget):
+        self.query_name = query_name
+        self.estimated_bytes = estimated_bytes
+        self.used_bytes = used_bytes
+        self.byte_budget = byte_budget
+        super().__init__(
+            f"Query '{query_name}' would scan {estimated_bytes} bytes; "
+            f"{used_bytes} of {byte_budget} already used this run"
+        )
+
+
+class QueryLedger:
+    """
+    Per-run record of query cost statistics with an optional byte budget.
+
+    Each backend records one entry per executed query: dry-run estimate, bytes
+    processed and billed, slot milliseconds, cache hit and wall time, tagged
+    with a query name. `summary()` is what ends up in the run_etl result.
+    """
+
+    def __init__(self, byte_budget=None, dry_run=None):
+        """
+        Parameters:
+        -----------
+        byte_budget : int, optional
+            Maximum bytes processed per run. None disables the guard.
+        dry_run : bool, optional
+            Estimate each query before running it. Defaults to True when a
+            byte budget is set, since the estimate is what the guard checks.
+        """
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.byte_budget = byte_budget
+        self.dry_run = byte_budget is not None if dry_run is None else dry_run
+        self._lock = threading.Lock()
+        self.queries = []
+
+    def reset(self):
+        """Start a new run"""
+        with self._lock:
+            self.queries = []
+
+    @property
+    def bytes_processed(self):
+        with self._lock:
+            return sum(q['bytes_processed'] or 0 for q in self.queries)
+
+    def check(self, query_name, estimated_bytes):
+        """Raise ByteBudgetExceeded if running this query would exceed the budget"""
+        if self.byte_budget is None or estimated_bytes is None:
+            return
+
+        used = self.bytes_processed
+        if used + estimated_bytes > self.byte_budget:
+            self.logger.warning(
+                f"Byte budget exceeded by '{query_name}': estimate {estimated_bytes}, "
+                f"used {used}, budget {self.byte_budget}"
+            )
+            raise ByteBudgetExceeded(query_name, estimated_bytes, used, self.byte_budget)
+
+    def record(self, query_name, estimated_bytes=None, bytes_processed=None, bytes_billed=None,
+               slot_ms=None, cache_hit=None, wall_seconds=None, rows=None):
+        """Record statistics for one executed query"""
+        entry = {
+            'name': query_name or 'unnamed',
+            'estimated_bytes': estimated_bytes,
+            'bytes_processed': bytes_processed,
+            'bytes_billed': bytes_billed,
+            'slot_ms': slot_ms,
+            'cache_hit': cache_hit,
+            'wall_seconds': round(wall_seconds, 4) if wall_seconds is not None else None,
+            'rows': rows
+        }
+        with self._lock:
+            self.queries.append(entry)
+
+        self.logger.info(
+            f"Query '{entry['name']}': {bytes_processed} bytes processed, "
+            f"{slot_ms} slot-ms, cache_hit={cache_hit}, {entry['wall_seconds']}s"
+        )
+        return entry
+
+    def summary(self):
+        """Aggregate statistics for the run"""
+        with self._lock:
+            queries = list(self.queries)
+
+        return {
+            'queries': queries,
+            'query_count': len(queries),
+            'total_bytes_processed': sum(q['bytes_processed'] or 0 for q in queries),
+            'total_bytes_billed': sum(q['bytes_billed'] or 0 for q in queries),
+            'total_slot_ms': sum(q['slot_ms'] or 0 for q in queries),
+            'cache_hits': sum(1 for q in queries if q['cache_hit']),
+            'total_wall_seconds': round(sum(q['wall_seconds'] or 0 for q in queries), 4),
+            'byte_budget': self.byte_budget
+        }
@@ -0,0 +1,332 @@
+import os
+import re
+import threading
+import time
+
+import pandas as pd
+import pyarrow as pa
+
+from ETL.clients.arrow import cast_columns
+from ETL.storage.base import Storage
+
+# Simulated per-value widths used to estimate scanned bytes like BigQuery does
+_TYPE_WIDTHS = {
+    'BOOLEAN': 1,
+    'INTEGER': 4,
+    'FLOAT': 4,
+    'DATE': 4,
+    'BIGINT': 8,
+    'DOUBLE': 8,
+    'TIMESTAMP': 8,
+    'TIMESTAMP WITH TIME ZONE': 8
+}
+_DEFAULT_WIDTH = 32  # VARCHAR and other variable-width columns
+_MIN_BILLED_BYTES = 10 * 1024 * 1024  # BigQuery bills at least 10 MB per query
+
+
+class DuckDBStorage(Storage):
+    """
+    Local storage backend using an embedded DuckDB database.
+
+    Runs the full pipeline on one box without GCP. Tables are created from the
+    first appended DataFrame and later appends are matched by column name, so a
+    batch missing the UMAP columns lands with NULLs just like in BigQuery.
+    Use path=':memory:' for a throwaway database.
+
+    Query cost statistics are simulated so the ledger behaves as it would
+    against BigQuery: scanned bytes are estimated from the row count and the
+    referenced columns' widths, repeated identical queries against an
+    unchanged table count as cache hits, and slot-ms is the wall time.
+    """
+
+    name = 'duckdb'
+
+    def __init__(self, path='data/local/warehouse.duckdb', ledger=None):
+        super().__init__(ledger)
+        import duckdb
+
+        if path != ':memory:':
+            os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+
+        self.path = path
+        self._connection = duckdb.connect(path)
+        # DuckDB connections are not thread-safe; writes are serialized and
+        # reads go through per-call cursors
+        self._write_lock = threading.Lock()
+        self._table_versions = {}
+        self._seen_queries = set()
+        self.logger.info(f"DuckDB storage opened at {path}")
+
+    @staticmethod
+    def _table(table_id):
+        return '"' + re.sub(r'[^a-zA-Z0-9_]', '_', str(table_id)) + '"'
+
+    def _bounded(self, cursor, func):
+        """
+        Run `func` (a query on `cursor`), interrupting it after query_timeout_seconds
+
+        An interrupted query raises TimeoutError, like a BigQuery job past its timeout.
+        """
+        if not self.query_timeout_seconds:
+            return func()
+
+        import duckdb
+
+        timer = threading.Timer(self.query_timeout_seconds, cursor.interrupt)
+        timer.daemon = True
+        timer.start()
+        try:
+            return func()
+        except duckdb.InterruptException as e:
+            raise TimeoutError(f"DuckDB query timed out after {self.query_timeout_seconds}s") from e
+        finally:
+            timer.cancel()
+
+    def _query_arrow(self, query, types=None):
+        cursor = self._connection.cursor()
+        try:
+            table = self._bounded(cursor, lambda: cursor.execute(query).fetch_arrow_table())
+        finally:
+            cursor.close()
+        return cast_columns(table, types)
+
+    def _column_types(self, table_id):
+        """Declared type of every column of a table, by column name"""
+        cursor = self._connection.cursor()
+        try:
+            return dict(cursor.execute(
+                "SELECT column_name, data_type FROM information_schema.columns WHERE table_name = ?",
+                [self._table(table_id).strip('"')]
+            ).fetchall())
+        finally:
+            cursor.close()
+
+    def estimate_scan_bytes(self, table_id, columns):
+        """Estimate the bytes BigQuery would scan reading `columns` from a table"""
+        cursor = self._connection.cursor()
+        try:
+            rows = cursor.execute(
+                "SELECT estimated_size FROM duckdb_tables() WHERE table_name = ?",
+                [self._table(table_id).strip('"')]
+            ).fetchone()
+        finally:
+            cursor.close()
+
+        if not rows:
+            return 0
+
+        column_types = self._column_types(table_id)
+        width = sum(_TYPE_WIDTHS.get(column_types.get(col, ''), _DEFAULT_WIDTH) for col in set(columns))
+        return int(rows[0] * width)
+
+    def _run_query(self, query, table_id, referenced_columns, types=None, query_name=None):
+        """Run a read query and record simulated cost statistics in the ledger"""
+        estimated_bytes = self.estimate_scan_bytes(table_id, referenced_columns)
+        if self.ledger.dry_run:
+            self.ledger.check(query_name, estimated_bytes)
+
+        cache_key = (query, self._table_versions.get(table_id, 0))
+        cache_hit = cache_key in self._seen_queries
+
+        started = time.monotonic()
+        table = self._query_arrow(query, types)
+        wall_seconds = time.monotonic() - started
+
+        self._seen_queries.add(cache_key)
+        self.ledger.record(
+            query_name,
+            estimated_bytes=estimated_bytes if self.ledger.dry_run else None,
+            bytes_processed=0 if cache_hit else estimated_bytes,
+            bytes_billed=0 if cache_hit else max(estimated_bytes, _MIN_BILLED_BYTES),
+            slot_ms=int(wall_seconds * 1000),
+            cache_hit=cache_hit,
+            wall_seconds=wall_seconds,
+            rows=table.num_rows
+        )
+        return table
+
+    def table_exists(self, table_id):
+        cursor = self._connection.cursor()
+        try:
+            result = cursor.execute(
+                "SELECT COUNT(*) FROM information_schema.tables WHERE table_name = ?",
+                [self._table(table_id).strip('"')]
+            ).fetchone()
+        finally:
+            cursor.close()
+        return result[0] > 0
+
+    def append(self, dataframe, table_id, create_if_not_exists=True):
+        table = self._table(table_id)
+        self.logger.info(f"Appending {len(dataframe)} rows to local table {table}")
+
+        with self._write_lock:
+            cursor = self._connection.cursor()
+            try:
+                cursor.register('incoming_df', dataframe)
+                if not self.table_exists(table_id):
+                    if not create_if_not_exists:
+                        raise Exception(f"Table {table} doesn't exist and create_if_not_exists=False")
+                    cursor.execute(f"CREATE TABLE {table} AS SELECT * FROM incoming_df LIMIT 0")
+                cursor.execute(f"INSERT INTO {table} BY NAME SELECT * FROM incoming_df")
+                cursor.unregister('incoming_df')
+                self._table_versions[table_id] = self._table_versions.get(table_id, 0) + 1
+            finally:
+                cursor.close()
+
+    def update_counts(self, dataframe, table_id, key, columns, query_name=None):
+        if dataframe.empty or not self.table_exists(table_id):
+            return 0
+
+        table = self._table(table_id)
+        column_types = self._column_types(table_id)
+        # Staged counts take the stored column's type; missing ones keep their stored value
+        assignments = ', '.join(
+            f"{col} = COALESCE(TRY_CAST(s.{col} AS {column_types[col]}), {table}.{col})"
+            for col in columns
+        )
+        estimated_bytes = self.estimate_scan_bytes(table_id, [key] + list(columns))
+        if self.ledger.dry_run:
+            self.ledger.check(query_name, estimated_bytes)
+
+        with self._write_lock:
+            cursor = self._connection.cursor()
+            try:
+                cursor.register('incoming_df', dataframe[[key] + list(columns)])
+                started = time.monotonic()
+                updated = self._bounded(cursor, lambda: cursor.execute(
+                    f"UPDATE {table} SET {assignments} FROM incoming_df s WHERE {table}.{key} = s.{key}"
+                ).fetchone()[0])
+                wall_seconds = time.monotonic() - started
+                cursor.unregister('incoming_df')
+                self._table_versions[table_id] = self._table_versions.get(table_id, 0) + 1
+            finally:
+                cursor.close()
+
+        # DML is billed on the columns it reads, like a MERGE in BigQuery
+        self.ledger.record(
+            query_name,
+            estimated_bytes=estimated_bytes if self.ledger.dry_run else None,
+            bytes_processed=estimated_bytes,
+            bytes_billed=max(estimated_bytes, _MIN_BILLED_BYTES),
+            slot_ms=int(wall_seconds * 1000),
+            cache_hit=False,
+            wall_seconds=wall_seconds,
+            rows=updated
+        )
+        return updated
+
+    def read_window(self, table_id, columns, time_column, since,
+                    not_null=None, limit=None, types=None, query_name=None):
+        if not self.table_exists(table_id):
+            return cast_columns(_empty_table(columns), types)
+
+        conditions = [f"{time_column} >= TIMESTAMPTZ '{pd.Timestamp(since).isoformat()}'"]
+        conditions += [f"{col} IS NOT NULL" for col in (not_null or [])]
+
+        query = f"""
+        SELECT {', '.join(columns)}
+        FROM {self._table(table_id)}
+        WHERE {' AND '.join(conditions)}
+        ORDER BY {time_column} DESC
+        """
+        if limit:
+            query += f"LIMIT {int(limit)}"
+
+        referenced = list(columns) + [time_column] + list(not_null or [])
+        return self._run_query(query, table_id, referenced, types, query_name)
+
+    def read_created_window(self, table_id, columns, since, limit=None, types=None, query_name=None):
+        if not self.table_exists(table_id):
+            return cast_columns(_empty_table(columns), types)
+
+        query = f"""
+        SELECT {', '.join(columns)}
+        FROM {self._table(table_id)}
+        WHERE UMAP1 IS NOT NULL AND UMAP2 IS NOT NULL
+        AND COALESCE(
+            TRY_STRPTIME(created_at, '%Y-%m-%d %H:%M:%S %Z'),
+            TRY_CAST(created_at AS TIMESTAMPTZ)
+        ) >= TIMESTAMPTZ '{pd.Timestamp(since).isoformat()}'
+        ORDER BY created_at DESC
+        """
+        if limit:
+            query += f"LIMIT {int(limit)}"
+
+        referenced = list(columns) + ['UMAP1', 'UMAP2', 'created_at']
+        return self._run_query(query, table_id, referenced, types, query_name)
+
+    def latest_timestamp(self, table_id, column, query_name=None):
+        if not self.table_exists(table_id):
+            return None
+
+        result = self._run_query(
+            f"SELECT MAX({column}) AS latest FROM {self._table(table_id)}",
+            table_id, [column], query_name=query_name
+        )
+        latest = result.column('latest')[0].as_py()
+        if latest is None:
+            return None
+
+        return pd.to_datetime(latest, utc=True)
+
+    def read_state(self, table_id):
+        if not self.table_exists(table_id):
+            return {}
+
+        result = self._run_query(
+            f"SELECT key, timestamp, value FROM {self._table(table_id)}",
+            table_id, ['key', 'timestamp', 'value'], query_name='state_read'
+        )
+
+        state = {}
+        for row in result.to_pylist():
+            state[row['key']] = {
+                'timestamp': pd.to_datetime(row['timestamp'], utc=True),
+                'value': row['value']
+            }
+        return state
+
+    def write_state(self, table_id, entries):
+        if not entries:
+            return
+
+        table = self._table(table_id)
+        with self._write_lock:
+            cursor = self._connection.cursor()
+            try:
+                cursor.execute(f"""
+                CREATE TABLE IF NOT EXISTS {table} (
+                    key VARCHAR PRIMARY KEY,
+                    timestamp TIMESTAMPTZ NOT NULL,
+                    value VARCHAR,
+                    updated_at TIMESTAMPTZ NOT NULL
+                )
+                """)
+                cursor.executemany(
+                    f"INSERT OR REPLACE INTO {table} VALUES (?, ?, ?, current_timestamp)",
+                    [[key, pd.Timestamp(entry['timestamp']).to_pydatetime(), entry.get('value')]
+                     for key, entry in entries.items()]
+                )
+                self._table_versions[table_id] = self._table_versions.get(table_id, 0) + 1
+            finally:
+                cursor.close()
+
+    def export_parquet(self, table_id, path):
+        """Write a table to a Parquet file for offline analysis"""
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        cursor = self._connection.cursor()
+        try:
+            cursor.execute(f"COPY {self._table(table_id)} TO '{path}' (FORMAT PARQUET)")
+        finally:
+            cursor.close()
+
+    def close(self):
+        try:
+            self._connection.close()
+        except Exception:
+            pass
+
+
+def _empty_table(columns):
+    return pa.table({col: pa.array([], type=pa.null()) for col in columns})
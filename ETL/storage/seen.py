@@ -0,0 +1,174 @@
+import hashlib
+import json
+import logging
+import math
+import os
+import struct
+import threading
+from collections import OrderedDict
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over strings using double hashing of a blake2b digest"""
+
+    def __init__(self, capacity=200000, error_rate=0.001, bits=None):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.size = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bits if bits is not None else bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, item):
+        digest = hashlib.blake2b(item.encode('utf-8'), digest_size=16).digest()
+        h1, h2 = struct.unpack('<QQ', digest)
+        return ((h1 + i * h2) % self.size for i in range(self.hashes))
+
+    def add(self, item):
+        for pos in self._positions(item):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+    def __contains__(self, item):
+        return all(self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(item))
+
+
+class SeenIndex:
+    """
+    Compact record of post URIs already stored, used to skip re-processing.
+
+    An exact LRU set holds the most recent URIs and a Bloom filter covers the
+    longer tail. A URI missing from the Bloom filter is definitely new; one in
+    the LRU set is definitely a repeat; one only in the Bloom filter is treated
+    as a repeat, so at most `error_rate` of genuinely new posts are dropped.
+    When the Bloom filter fills past capacity it is rebuilt from the LRU set.
+
+    The index is persisted to a small binary file between runs and can be
+    rebuilt from the posts table when the file is missing.
+    """
+
+    def __init__(self, path='data/local/seen_uris.bin', capacity=200000,
+                 error_rate=0.001, lru_size=50000):
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.path = path
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.lru_size = lru_size
+        self.bloom = BloomFilter(capacity, error_rate)
+        self.recent = OrderedDict()
+        # Running estimate of encoder seconds per post, used to report time saved
+        self.encode_seconds_per_post = None
+        # Pipelined collection filters one page while the loader adds the previous one
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self.recent)
+
+    def __contains__(self, uri):
+        with self._lock:
+            if uri in self.recent:
+                self.recent.move_to_end(uri)
+                return True
+            return uri in self.bloom
+
+    def add(self, uris):
+        """Mark URIs as seen"""
+        with self._lock:
+            for uri in uris:
+                if uri in self.recent:
+                    self.recent.move_to_end(uri)
+                    continue
+
+                self.recent[uri] = None
+                if len(self.recent) > self.lru_size:
+                    self.recent.popitem(last=False)
+
+                if self.bloom.count >= self.capacity:
+                    self._reset_bloom()
+                self.bloom.add(uri)
+
+    def _reset_bloom(self):
+        """Start a fresh Bloom filter seeded from the exact LRU set"""
+        self.logger.info("Seen-URI Bloom filter at capacity, rebuilding from recent URIs")
+        self.bloom = BloomFilter(self.capacity, self.error_rate)
+        for uri in self.recent:
+            self.bloom.add(uri)
+
+    def partition(self, posts):
+        """Split posts into (new, repeat) lists by URI"""
+        new_posts, repeat_posts = [], []
+        batch_uris = set()
+        with self._lock:
+            for post in posts:
+                uri = post['uri']
+                if uri in batch_uris or uri in self:
+                    repeat_posts.append(post)
+                else:
+                    batch_uris.add(uri)
+                    new_posts.append(post)
+        return new_posts, repeat_posts
+
+    def record_encode_time(self, seconds, n_posts, smoothing=0.3):
+        """Update the running encoder seconds-per-post estimate"""
+        if n_posts <= 0:
+            return
+        per_post = seconds / n_posts
+        if self.encode_seconds_per_post is None:
+            self.encode_seconds_per_post = per_post
+        else:
+            self.encode_seconds_per_post += smoothing * (per_post - self.encode_seconds_per_post)
+
+    def rebuild(self, uris):
+        """Replace the index contents with URIs read from storage"""
+        self.bloom = BloomFilter(self.capacity, self.error_rate)
+        self.recent = OrderedDict()
+        self.add(uris)
+        self.logger.info(f"Rebuilt seen-URI index with {len(self.recent)} URIs")
+
+    def save(self):
+        """Persist the index: 4-byte header length, JSON header, Bloom filter bits"""
+        header = json.dumps({
+            'capacity': self.capacity,
+            'error_rate': self.error_rate,
+            'lru_size': self.lru_size,
+            'bloom_count': self.bloom.count,
+            'encode_seconds_per_post': self.encode_seconds_per_post,
+            'recent': list(self.recent)
+        }).encode('utf-8')
+
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(struct.pack('<I', len(header)))
+            f.write(header)
+            f.write(self.bloom.bits)
+        os.replace(tmp_path, self.path)
+
+    def load(self):
+        """Load a persisted index; returns False if there is none or it is unreadable"""
+        if not os.path.exists(self.path):
+            return False
+
+        try:
+            with open(self.path, 'rb') as f:
+                (header_length,) = struct.unpack('<I', f.read(4))
+                header = json.loads(f.read(header_length).decode('utf-8'))
+                bits = bytearray(f.read())
+
+            bloom = BloomFilter(header['capacity'], header['error_rate'], bits=bits)
+            if len(bits) != (bloom.size + 7) // 8:
+                raise ValueError("Bloom filter size does not match header")
+            bloom.count = header['bloom_count']
+
+            self.capacity = header['capacity']
+            self.error_rate = header['error_rate']
+            self.lru_size = header['lru_size']
+            self.encode_seconds_per_post = header.get('encode_seconds_per_post')
+            self.bloom = bloom
+            self.recent = OrderedDict.fromkeys(header['recent'])
+            self.logger.info(f"Loaded seen-URI index with {len(self.recent)} recent URIs")
+            return True
+
+        except Exception as e:
+            self.logger.warning(f"Could not load seen-URI index from {self.path}: {e}")
+            return False
@@ -0,0 +1,107 @@
+import logging
+import threading
+
+import pandas as pd
+
+# Well-known state keys
+LAST_DENSITY_SLICE = 'last_density_slice'
+LAST_EXPORT = 'last_export'
+LAST_STREAM_CURSOR = 'last_stream_cursor'
+
+
+def watermark_key(stage):
+    """State key holding a stage's watermark"""
+    return f'watermark:{stage}'
+
+
+class StateStore:
+    """
+    Small keyed ETL state store with an in-process cache.
+
+    The whole state table is read once per run by `load()`; lookups are served
+    from the cache and writes are buffered until `flush()`, which upserts only
+    the keys that changed. Each key holds a timestamp and an optional string
+    value (used for cursors).
+    """
+
+    def __init__(self, storage, table_id):
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.storage = storage
+        self.table_id = table_id
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._dirty = set()
+        self._loaded = False
+
+    def load(self, force=False):
+        """Read the state table into the cache (once per run unless forced)"""
+        if self._loaded and not force:
+            return
+
+        try:
+            entries = self.storage.read_state(self.table_id)
+        except Exception as e:
+            self.logger.warning(f"Could not read ETL state, starting empty: {e}")
+            entries = {}
+
+        with self._lock:
+            # Keep unflushed local changes on top of what storage returned
+            for key in self._dirty:
+                entries[key] = self._entries[key]
+            self._entries = entries
+            self._loaded = True
+
+        self.logger.info(f"Loaded {len(entries)} ETL state keys")
+
+    def get_timestamp(self, key):
+        """Timestamp stored under key, or None"""
+        with self._lock:
+            entry = self._entries.get(key)
+        return entry['timestamp'] if entry else None
+
+    def get_value(self, key):
+        """String value stored under key, or None"""
+        with self._lock:
+            entry = self._entries.get(key)
+        return entry.get('value') if entry else None
+
+    def set(self, key, timestamp=None, value=None):
+        """Buffer a new timestamp/value for key (timestamp defaults to now)"""
+        if timestamp is None:
+            timestamp = pd.Timestamp.now(tz='UTC')
+
+        with self._lock:
+            self._entries[key] = {'timestamp': pd.to_datetime(timestamp, utc=True), 'value': value}
+            self._dirty.add(key)
+
+    def watermark(self, stage):
+        """Watermark timestamp of a stage, or None if it has never run"""
+        return self.get_timestamp(watermark_key(stage))
+
+    def advance_watermark(self, stage, timestamp):
+        """Move a stage's watermark forward; earlier timestamps are ignored"""
+        if timestamp is None:
+            return
+
+        timestamp = pd.to_datetime(timestamp, utc=True)
+        current = self.watermark(stage)
+        if current is None or timestamp > current:
+            self.set(watermark_key(stage), timestamp)
+
+    def flush(self):
+        """Write changed keys back to storage"""
+        with self._lock:
+            dirty = {key: self._entries[key] for key in self._dirty}
+
+        if not dirty:
+            return
+
+        self.storage.write_state(self.table_id, dirty)
+
+        with self._lock:
+            # Keys set again while the write was in flight stay dirty
+            for key, entry in dirty.items():
+                if self._entries.get(key) is entry:
+                    self._dirty.discard(key)
+
+        self.logger.info(f"Flushed {len(dirty)} ETL state keys")
@@ -0,0 +1,344 @@
+import functools
+import json
+import logging
+import os
+import resource
+import sys
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional
+
+# Spans kept individually in the report; later ones only count towards the per-stage totals
+MAX_SPANS = 2000
+
+_PAGE_MB = os.sysconf('SC_PAGE_SIZE') / 2 ** 20 if hasattr(os, 'sysconf') else None
+
+
+def rss_mb() -> Optional[float]:
+    """Current resident set size in MB (Linux), or None where /proc is unavailable"""
+    try:
+        with open('/proc/self/statm', 'rb') as f:
+            return int(f.read().split()[1]) * _PAGE_MB
+    except (OSError, ValueError, IndexError, TypeError):
+        return None
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of the process so far in MB"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KB, macOS bytes
+    return peak / 2 ** 20 if sys.platform == 'darwin' else peak / 1024
+
+
+class Span:
+    """One timed stage execution; `set()`/`add()` attach item counts and attributes"""
+
+    __slots__ = ('name', 'parent', 'thread', 'attrs', 'items', 'start', 'wall', 'cpu',
+                 'rss_mb', 'peak_rss_delta_mb', 'error')
+
+    def __init__(self, name: str, parent: Optional[str], attrs: Dict[str, Any]):
+        self.name = name
+        self.parent = parent
+        self.thread = threading.current_thread().name
+        self.attrs = attrs
+        self.items = attrs.pop('items', None)
+        self.start = None
+        self.wall = None
+        self.cpu = None
+        self.rss_mb = None
+        self.peak_rss_delta_mb = None
+        self.error = None
+
+    def set(self, **attrs):
+        if 'items' in attrs:
+            self.items = attrs.pop('items')
+        self.attrs.update(attrs)
+
+    def add(self, items: int):
+        self.items = (self.items or 0) + items
+
+    def to_dict(self, run_started: float) -> Dict[str, Any]:
+        record = {
+            'name': self.name,
+            'parent': self.parent,
+            'thread': self.thread,
+            'offset_seconds': round(self.start - run_started, 4),
+            'wall_seconds': round(self.wall, 4),
+            'cpu_seconds': round(self.cpu, 4),
+            'items': self.items,
+            'rss_mb': round(self.rss_mb, 1) if self.rss_mb is not None else None,
+            'peak_rss_delta_mb': round(self.peak_rss_delta_mb, 1)
+        }
+        if self.attrs:
+            record['attrs'] = self.attrs
+        if self.error:
+            record['error'] = self.error
+        return record
+
+
+class Tracer:
+    """
+    Collects per-stage spans for one pipeline run.
+
+    Each span records wall time, process CPU time, resident memory at the end
+    and how much the process's peak RSS grew while it ran, plus an item
+    count. CPU time is process-wide, so spans running at the same time on
+    different threads (pipelined stages) each include the other's CPU.
+
+    `report()` aggregates spans by name into a JSON-serializable run report;
+    `prometheus()` renders the same totals in the Prometheus text format.
+    The tracer times its own bookkeeping and reports it as `overhead_seconds`.
+    """
+
+    def __init__(self, name: str = 'etl_run'):
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.name = name
+        self.run_id = uuid.uuid4().hex[:12]
+        self.started_at = datetime.now().isoformat()
+        self._started = time.perf_counter()
+        self._cpu_started = time.process_time()
+        self._finished = None
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._spans = []
+        self._stages = {}
+        self._dropped = 0
+        self.overhead_seconds = 0.0
+
+    @contextmanager
+    def span(self, name: str, **attrs):
+        """Time the enclosed block as stage `name`; nested spans record their parent"""
+        entered = time.perf_counter()
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        span = Span(name, stack[-1].name if stack else None, attrs)
+        stack.append(span)
+        peak_before = peak_rss_mb()
+        span.start = time.perf_counter()
+        cpu_before = time.process_time()
+        self._add_overhead(span.start - entered)
+        try:
+            yield span
+        except BaseException as e:
+            span.error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            span.cpu = time.process_time() - cpu_before
+            span.wall = time.perf_counter() - span.start
+            exiting = time.perf_counter()
+            span.peak_rss_delta_mb = peak_rss_mb() - peak_before
+            span.rss_mb = rss_mb()
+            stack.pop()
+            self._finish(span)
+            self._add_overhead(time.perf_counter() - exiting)
+
+    def record(self, name: str, seconds: float, items: Optional[int] = None, **attrs):
+        """Add a stage measured elsewhere (e.g. accumulated filter time) as a span"""
+        span = Span(name, None, attrs)
+        span.start = time.perf_counter() - seconds
+        span.wall = seconds
+        span.cpu = 0.0
+        span.items = items
+        span.peak_rss_delta_mb = 0.0
+        self._finish(span)
+
+    def _add_overhead(self, seconds: float):
+        # Spans finish on several threads at once; += on a float is not atomic
+        with self._lock:
+            self.overhead_seconds += seconds
+
+    def _finish(self, span: Span):
+        with self._lock:
+            if len(self._spans) < MAX_SPANS:
+                self._spans.append(span)
+            else:
+                self._dropped += 1
+
+            stage = self._stages.get(span.name)
+            if stage is None:
+                stage = self._stages[span.name] = {
+                    'count': 0, 'wall_seconds': 0.0, 'cpu_seconds': 0.0, 'items': 0,
+                    'max_wall_seconds': 0.0, 'peak_rss_delta_mb': 0.0, 'errors': 0
+                }
+            stage['count'] += 1
+            stage['wall_seconds'] += span.wall
+            stage['cpu_seconds'] += span.cpu
+            stage['items'] += span.items or 0
+            stage['max_wall_seconds'] = max(stage['max_wall_seconds'], span.wall)
+            stage['peak_rss_delta_mb'] = max(stage['peak_rss_delta_mb'], span.peak_rss_delta_mb)
+            stage['errors'] += 1 if span.error else 0
+
+    def finish(self):
+        """Mark the end of the run (report() calls this if it hasn't been)"""
+        if self._finished is None:
+            self._finished = time.perf_counter()
+            self._cpu_finished = time.process_time()
+
+    def stages(self) -> Dict[str, Dict[str, Any]]:
+        """Per-stage totals, rounded for reporting"""
+        with self._lock:
+            return {
+                name: {
+                    'count': stage['count'],
+                    'wall_seconds': round(stage['wall_seconds'], 4),
+                    'cpu_seconds': round(stage['cpu_seconds'], 4),
+                    'items': stage['items'],
+                    'items_per_second': round(stage['items'] / stage['wall_seconds'], 1)
+                    if stage['items'] and stage['wall_seconds'] else None,
+                    'max_wall_seconds': round(stage['max_wall_seconds'], 4),
+                    'peak_rss_delta_mb': round(stage['peak_rss_delta_mb'], 1),
+                    'errors': stage['errors']
+                }
+                for name, stage in self._stages.items()
+            }
+
+    def report(self) -> Dict[str, Any]:
+        """The JSON run report: run totals, per-stage totals and individual spans"""
+        self.finish()
+        wall = self._finished - self._started
+        with self._lock:
+            spans = [span.to_dict(self._started) for span in self._spans]
+            dropped = self._dropped
+            overhead = self.overhead_seconds
+        return {
+            'run_id': self.run_id,
+            'name': self.name,
+            'started_at': self.started_at,
+            'wall_seconds': round(wall, 4),
+            'cpu_seconds': round(self._cpu_finished - self._cpu_started, 4),
+            'rss_mb': round(rss_mb() or 0.0, 1),
+            'peak_rss_mb': round(peak_rss_mb(), 1),
+            'overhead_seconds': round(overhead, 6),
+            'overhead_fraction': round(overhead / wall, 6) if wall else None,
+            'stages': self.stages(),
+            'spans': spans,
+            'spans_dropped': dropped
+        }
+
+    def prometheus(self, prefix: str = 'atproto_etl') -> str:
+        """Per-stage totals in the Prometheus text exposition format"""
+        report = self.report()
+        metrics = [
+            ('stage_wall_seconds', 'Wall-clock seconds spent in the stage during the last run', 'wall_seconds'),
+            ('stage_cpu_seconds', 'Process CPU seconds while the stage ran during the last run', 'cpu_seconds'),
+            ('stage_items', 'Items processed by the stage during the last run', 'items'),
+            ('stage_spans', 'Times the stage ran during the last run', 'count'),
+            ('stage_peak_rss_delta_mb', 'Largest growth of peak RSS during one run of the stage', 'peak_rss_delta_mb'),
+            ('stage_errors', 'Stage runs that raised during the last run', 'errors'),
+        ]
+        lines = []
+        for metric, help_text, key in metrics:
+            lines.append(f"# HELP {prefix}_{metric} {help_text}")
+            lines.append(f"# TYPE {prefix}_{metric} gauge")
+            for stage, totals in sorted(report['stages'].items()):
+                lines.append(f'{prefix}_{metric}{{stage="{stage}"}} {totals[key]}')
+
+        for metric, help_text, value in [
+            ('run_wall_seconds', 'Wall-clock seconds of the last run', report['wall_seconds']),
+            ('run_cpu_seconds', 'Process CPU seconds of the last run', report['cpu_seconds']),
+            ('run_peak_rss_mb', 'Peak resident memory of the process', report['peak_rss_mb']),
+            ('run_timestamp_seconds', 'Unix time the last run finished', round(time.time(), 3)),
+        ]:
+            lines.append(f"# HELP {prefix}_{metric} {help_text}")
+            lines.append(f"# TYPE {prefix}_{metric} gauge")
+            lines.append(f"{prefix}_{metric} {value}")
+        return '\n'.join(lines) + '\n'
+
+    def write(self, report_path: Optional[str] = None, metrics_path: Optional[str] = None):
+        """Write the JSON report and/or the Prometheus metrics file (each written atomically)"""
+        for path, render in ((report_path, lambda: json.dumps(self.report(), indent=2, default=str)),
+                             (metrics_path, self.prometheus)):
+            if not path:
+                continue
+            try:
+                os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+                tmp_path = path + '.tmp'
+                with open(tmp_path, 'w') as f:
+                    f.write(render())
+                os.replace(tmp_path, path)
+            except OSError as e:
+                self.logger.warning(f"Could not write {path}: {e}")
+
+
+# Tracer spans are recorded on while a run is active; module-level so the
+# encoder and pipeline worker threads reach it without passing it around
+_active: Optional[Tracer] = None
+
+
+def activate(tracer: Optional[Tracer]):
+    """Make `tracer` the one `span()` records to (None turns tracing off)"""
+    global _active
+    _active = tracer
+
+
+def active() -> Optional[Tracer]:
+    return _active
+
+
+class _NoSpan:
+    """Stand-in yielded when no tracer is active"""
+
+    def set(self, **attrs):
+        pass
+
+    def add(self, items):
+        pass
+
+
+_NO_SPAN = _NoSpan()
+
+
+@contextmanager
+def span(name: str, **attrs):
+    """Span on the active tracer, or a no-op when none is active"""
+    tracer = _active
+    if tracer is None:
+        yield _NO_SPAN
+        return
+    with tracer.span(name, **attrs) as current:
+        yield current
+
+
+def traced(name: str):
+    """Decorator running the function inside `span(name)`"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def record(name: str, seconds: float, items: Optional[int] = None, **attrs):
+    """`Tracer.record` on the active tracer, if any"""
+    tracer = _active
+    if tracer is not None:
+        tracer.record(name, seconds, items, **attrs)
+
+
+def traced_iter(name: str, iterable, size: Optional[Callable[[Any], int]] = None):
+    """
+    Yield from `iterable`, timing each step (the work of producing the next item) as a span
+
+    Closing the returned generator closes `iterable` too.
+    """
+    iterator = iter(iterable)
+    try:
+        while True:
+            with span(name) as current:
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+                if size is not None:
+                    current.set(items=size(item))
+            yield item
+    finally:
+        close = getattr(iterator, 'close', None)
+        if close is not None:
+            close()
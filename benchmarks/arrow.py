@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Peak memory of materializing a string-typed query result, pandas path vs Arrow path.
+
+A synthetic 24-hour density result (`--rows` rows, numeric columns stored
+as STRING, as BigQuery autodetect returns them) is materialized two ways,
+each in a fresh interpreter so allocator state from one doesn't hide the
+other's peak:
+
+- baseline: to_pandas(), a defensive copy, then pd.to_numeric per column
+  (what execute_query did before the Arrow path);
+- arrow: cast_columns at the Arrow level, then to_dataframe (split blocks,
+  self-destructing conversion).
+
+RSS is sampled in the background while each path runs; the report is the
+peak growth over the RSS just before it started.
+
+Usage: python -m benchmarks.arrow [--rows 220000]
+"""
+import argparse
+import json
+import subprocess
+import sys
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from ETL.clients.arrow import cast_columns, to_dataframe
+from ETL.tracing import rss_mb
+from benchmarks.memory import RSSSampler
+
+DENSITY_TYPES = {'x': pa.float64(), 'y': pa.float64(), 'density': pa.float64(), 'posts_count': pa.int64()}
+
+
+def _result(rows):
+    """A density query result with its numeric columns as strings"""
+    rng = np.random.default_rng(0)
+    return pa.table({
+        'x': pa.array(rng.uniform(-10, 10, rows).astype(str)),
+        'y': pa.array(rng.uniform(-10, 10, rows).astype(str)),
+        'density': pa.array(rng.random(rows).astype(str)),
+        'calculated_at': pa.array(np.repeat(pd.date_range('2026-01-01', periods=48, freq='30min', tz='UTC'),
+                                            -(-rows // 48))[:rows]),
+        'posts_count': pa.array(rng.integers(10, 1000, rows).astype(str))
+    })
+
+
+def _baseline(table):
+    df = table.to_pandas().copy()
+    for column in DENSITY_TYPES:
+        df[column] = pd.to_numeric(df[column], errors='coerce')
+    return df
+
+
+def _arrow(table):
+    return to_dataframe(cast_columns(table, DENSITY_TYPES))
+
+
+def measure(path, rows):
+    """Peak RSS growth (MB) of one materialization path, in this process"""
+    table = _result(rows)
+    func = {'baseline': _baseline, 'arrow': _arrow}[path]
+    sampler = RSSSampler(interval=0.001)
+    sampler.start()
+    try:
+        sampler.reset()
+        before = rss_mb() or 0.0
+        df = func(table)
+        peak = max(sampler.peak, rss_mb() or 0.0)
+    finally:
+        sampler.stop()
+    return {'path': path, 'rows': len(df), 'rss_growth_mb': round(peak - before, 1)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=220000, help='Rows in the synthetic result')
+    parser.add_argument('--path', choices=['baseline', 'arrow'], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.path:
+        print(json.dumps(measure(args.path, args.rows)))
+        return
+
+    for path in ('baseline', 'arrow'):
+        completed = subprocess.run([sys.executable, '-m', 'benchmarks.arrow', '--rows', str(args.rows),
+                                    '--path', path], capture_output=True, text=True, check=True)
+        result = json.loads(completed.stdout.strip().splitlines()[-1])
+        print(f"{result['path']:<9} {result['rows']:>8} rows  RSS peak growth {result['rss_growth_mb']:>6.1f} MB")
+
+
+if __name__ == '__main__':
+    main()
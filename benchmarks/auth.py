@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Bluesky authentication time per run against a local fake PDS.
+
+Each scenario runs the ETL's authenticate() as consecutive runs would, with
+`--latency` seconds of simulated network time per request, and counts
+createSession calls (the rate-limited endpoint).
+
+Usage: python -m benchmarks.auth [--latency 0.05] [--runs 5]
+"""
+import argparse
+import os
+import tempfile
+
+from atproto import Client as AtProtoClient
+
+from ETL.clients.bluesky import Client
+from benchmarks.fakes import FakePDS
+
+
+def _authenticate(pds, session_path):
+    client = Client(client=AtProtoClient(base_url=pds.url), session_path=session_path)
+    client.handle, client.password = pds.handle, pds.password
+    if not client.authenticate():
+        raise RuntimeError("authentication failed")
+    return client.auth_method, client.auth_seconds
+
+
+def run(runs=5, latency=0.05):
+    """Return per-scenario auth methods, first/later-run seconds and createSession counts"""
+    scenarios = [
+        # (name, access token TTL, refresh token TTL, reuse saved session)
+        ('login every run', 7200, 86400, False),
+        ('warm session', 7200, 86400, True),
+        ('session near expiry', 60, 86400, True),
+    ]
+    results = []
+
+    for name, access_ttl, refresh_ttl, reuse in scenarios:
+        with tempfile.TemporaryDirectory() as tmp, \
+                FakePDS(posts=[], latency=latency, access_ttl=access_ttl, refresh_ttl=refresh_ttl) as pds:
+            session_path = os.path.join(tmp, 'session')
+            methods, seconds = [], []
+            for _ in range(runs):
+                if not reuse and os.path.exists(session_path):
+                    os.remove(session_path)
+                method, elapsed = _authenticate(pds, session_path)
+                methods.append(method)
+                seconds.append(elapsed)
+
+            results.append({
+                'scenario': name,
+                'methods': methods,
+                'first_seconds': round(seconds[0], 4),
+                'later_mean_seconds': round(sum(seconds[1:]) / max(1, len(seconds) - 1), 4),
+                'create_session_calls': pds.calls['com.atproto.server.createSession'],
+                'session_mode': oct(os.stat(session_path).st_mode & 0o777)
+            })
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--latency', type=float, default=0.05, help='Simulated seconds per request')
+    parser.add_argument('--runs', type=int, default=5, help='Consecutive runs per scenario')
+    args = parser.parse_args()
+
+    for row in run(runs=args.runs, latency=args.latency):
+        print(f"{row['scenario']:<20} first {row['first_seconds']:.4f}s  "
+              f"later runs {row['later_mean_seconds']:.4f}s  "
+              f"createSession x{row['create_session_calls']}  file {row['session_mode']}  {row['methods']}")
+
+
+if __name__ == '__main__':
+    main()
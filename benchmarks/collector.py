@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""
+Multi-feed collector throughput against the recorded-feed stand-in.
+
+Usage: python -m benchmarks.collector [--latency 0.2] [--pages 3]
+"""
+import argparse
+import time
+
+from ETL.clients.bluesky import Client
+from ETL.clients.recorded import RecordedFeedAPI, load_recorded_posts
+
+FEEDS = [f"at://did:plc:recorded/app.bsky.feed.generator/feed-{i}" for i in range(8)]
+
+
+def run(feed_counts=(1, 2, 4, 8), pages=3, limit=100, latency=0.2, max_workers=8):
+    """Return posts collected per wall-clock second for each number of feeds"""
+    corpus = load_recorded_posts()
+    results = []
+
+    for n_feeds in feed_counts:
+        client = Client(client=RecordedFeedAPI(posts=corpus, latency=latency))
+        started = time.perf_counter()
+        posts = client.fetch_feeds(FEEDS[:n_feeds], pages=pages, limit=limit,
+                                   min_length=30, max_workers=max_workers)
+        elapsed = time.perf_counter() - started
+
+        results.append({
+            'feeds': n_feeds,
+            'posts': len(posts),
+            'seconds': round(elapsed, 3),
+            'posts_per_second': round(len(posts) / elapsed, 1)
+        })
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--latency', type=float, default=0.2, help='Simulated seconds per feed request')
+    parser.add_argument('--pages', type=int, default=3, help='Cursor depth per feed')
+    args = parser.parse_args()
+
+    print(f"{'feeds':>5} {'posts':>6} {'seconds':>8} {'posts/s':>8}")
+    for row in run(pages=args.pages, latency=args.latency):
+        print(f"{row['feeds']:>5} {row['posts']:>6} {row['seconds']:>8} {row['posts_per_second']:>8}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,321 @@
+"""
+Test doubles for the benchmarks: virtual time, a feed with timed arrivals and a local PDS.
+
+The recorded feed and encoder that `--offline` runs on live in
+ETL.clients.recorded; these only drive benchmark runs and are not shipped
+with the package.
+"""
+import base64
+import json
+import random
+import threading
+import time
+import uuid
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+from urllib.parse import parse_qs, urlparse
+
+import pandas as pd
+
+from ETL.clients.recorded import _feed_item, load_recorded_posts
+
+
+class VirtualClock:
+    """
+    Pipeline time that only moves when advanced
+
+    Assign `clock.now` to an ATProtoETL's `now` to run it on virtual time:
+    every timestamp the ETL writes or compares (collected_at, watermarks,
+    density and export cadence) then comes from here.
+    """
+
+    def __init__(self, start=None):
+        self.current = pd.Timestamp(start or pd.Timestamp.now(tz='UTC').floor('min'))
+
+    def now(self):
+        return self.current
+
+    def advance(self, seconds):
+        self.current += pd.Timedelta(seconds=seconds)
+
+
+def corpus_rate(posts):
+    """Posts per hour over the span of the corpus's created_at times"""
+    times = pd.to_datetime([post.get('created_at') for post in posts], utc=True, errors='coerce').dropna()
+    hours = (times.max() - times.min()).total_seconds() / 3600 if len(times) else 0
+    return len(times) / hours if hours else float(len(posts))
+
+
+class ArrivalFeedAPI:
+    """
+    A feed whose posts arrive over (virtual) time at `rate` posts per hour.
+
+    Walking the feed from the top serves everything that arrived since the
+    previous walk, newest first and `limit` per page, with cursors as
+    offsets. Posts cycle through the corpus under new URIs and carry their
+    arrival time as created_at, so a replay can run for any length of time
+    at any rate. `arrived` counts the posts served so far.
+    """
+
+    def __init__(self, posts, clock, rate):
+        self.posts = posts
+        self.clock = clock
+        self.rate = rate
+        self.arrived = 0
+        self._last_walk = clock.now()
+        self._carry = 0.0
+        self._walk = []
+        self.app = SimpleNamespace(bsky=SimpleNamespace(feed=SimpleNamespace(get_feed=self.get_feed)))
+
+    def login(self, login=None, password=None, session_string=None, **kwargs):
+        return SimpleNamespace(handle=login or 'recorded.test', did='did:plc:recorded')
+
+    def _arrivals(self):
+        now = self.clock.now()
+        seconds = (now - self._last_walk).total_seconds()
+        expected = self.rate * seconds / 3600 + self._carry
+        count = int(expected)
+        self._carry = expected - count
+
+        posts = []
+        for n in range(count):
+            i = self.arrived + n
+            arrived_at = self._last_walk + pd.Timedelta(seconds=seconds * (n + 1) / count)
+            post = self.posts[i % len(self.posts)]
+            posts.append(dict(post, uri=f"{post['uri']}-{i // len(self.posts)}",
+                              created_at=arrived_at.strftime('%Y-%m-%dT%H:%M:%S.%fZ')))
+        self.arrived += count
+        self._last_walk = now
+        return posts[::-1]
+
+    def get_feed(self, params):
+        if not params.cursor:
+            self._walk = self._arrivals()
+        offset = int(params.cursor) if params.cursor else 0
+        limit = params.limit or 50
+        end = offset + limit
+        return SimpleNamespace(
+            feed=[_feed_item(post) for post in self._walk[offset:end]],
+            cursor=str(end) if end < len(self._walk) else None
+        )
+
+
+def _b64url(data):
+    return base64.urlsafe_b64encode(data).rstrip(b'=').decode('ascii')
+
+
+def _jwt(subject, scope, ttl_seconds):
+    """Unsigned-looking JWT carrying the claims atproto clients read (exp, sub, scope)"""
+    now = int(time.time())
+    header = _b64url(json.dumps({'alg': 'HS256', 'typ': 'JWT'}).encode())
+    payload = _b64url(json.dumps({
+        'sub': subject, 'scope': scope, 'iat': now, 'exp': now + ttl_seconds, 'jti': uuid.uuid4().hex
+    }).encode())
+    return f"{header}.{payload}.{_b64url(b'fake-signature')}"
+
+
+class FakePDS:
+    """
+    Minimal local PDS speaking the XRPC endpoints the ETL uses, for benchmarks.
+
+    Serves createSession, refreshSession, getSession, getProfile and getFeed
+    (backed by recorded posts) on 127.0.0.1. Tokens expire after
+    `access_ttl` / `refresh_ttl` seconds and are checked on every call;
+    `latency` seconds (plus up to `latency_jitter`) are slept per request to
+    stand in for the network.
+
+    With `rate_limit` set, at most that many requests are served per
+    `rate_window` seconds; every response carries RateLimit-Limit/Remaining/
+    Reset headers like Bluesky's, and requests over the limit get a 429.
+    `error_rate` is the share of requests answered with a 503 instead.
+    `calls` counts requests per endpoint and `statuses` counts responses by status.
+
+    Usage:
+        with FakePDS(latency=0.05) as pds:
+            client = atproto.Client(base_url=pds.url)
+    """
+
+    def __init__(self, posts=None, path='data/posts.json', latency=0.0,
+                 access_ttl=7200, refresh_ttl=60 * 86400, handle='etl.test', password='password',
+                 latency_jitter=0.0, rate_limit=None, rate_window=60.0, error_rate=0.0, seed=0):
+        self.posts = posts if posts is not None else load_recorded_posts(path)
+        self.latency = latency
+        self.latency_jitter = latency_jitter
+        self.rate_limit = rate_limit
+        self.rate_window = rate_window
+        self.error_rate = error_rate
+        self._random = random.Random(seed)
+        self._window_start = time.time()
+        self._window_count = 0
+        self.access_ttl = access_ttl
+        self.refresh_ttl = refresh_ttl
+        self.handle = handle
+        self.password = password
+        self.did = 'did:plc:fakepds'
+        self.calls = Counter()
+        self.statuses = Counter()
+        self._access_tokens = set()
+        self._refresh_tokens = set()
+        self._lock = threading.Lock()
+        self._server = None
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address
+        return f"http://{host}:{port}/xrpc"
+
+    def start(self):
+        pds = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                pds._handle(self)
+
+            def do_POST(self):
+                pds._handle(self)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _issue_session(self):
+        access = _jwt(self.did, 'com.atproto.access', self.access_ttl)
+        refresh = _jwt(self.did, 'com.atproto.refresh', self.refresh_ttl)
+        with self._lock:
+            self._access_tokens.add(access)
+            self._refresh_tokens.add(refresh)
+        return {'accessJwt': access, 'refreshJwt': refresh, 'handle': self.handle, 'did': self.did}
+
+    def _token_valid(self, token, tokens):
+        if token not in tokens:
+            return False
+        payload = token.split('.')[1]
+        claims = json.loads(base64.urlsafe_b64decode(payload + '=' * (-len(payload) % 4)))
+        return claims['exp'] > time.time()
+
+    def _rate_limit_headers(self):
+        """Count this request against the current window; returns (headers, over_limit)"""
+        if not self.rate_limit:
+            return {}, False
+
+        with self._lock:
+            now = time.time()
+            if now - self._window_start >= self.rate_window:
+                self._window_start = now
+                self._window_count = 0
+            self._window_count += 1
+            remaining = max(0, self.rate_limit - self._window_count)
+            reset = self._window_start + self.rate_window
+            over = self._window_count > self.rate_limit
+
+        headers = {
+            'RateLimit-Limit': str(self.rate_limit),
+            'RateLimit-Remaining': str(remaining),
+            'RateLimit-Reset': str(int(reset + 0.999)),
+            'RateLimit-Policy': f"{self.rate_limit};w={int(self.rate_window)}"
+        }
+        return headers, over
+
+    def _respond(self, request, status, body):
+        data = json.dumps(body).encode('utf-8')
+        with self._lock:
+            self.statuses[status] += 1
+        request.send_response(status)
+        request.send_header('Content-Type', 'application/json')
+        request.send_header('Content-Length', str(len(data)))
+        for name, value in getattr(request, 'ratelimit_headers', {}).items():
+            request.send_header(name, value)
+        request.end_headers()
+        request.wfile.write(data)
+
+    def _handle(self, request):
+        parsed = urlparse(request.path)
+        nsid = parsed.path.rsplit('/', 1)[-1]
+        params = {key: values[0] for key, values in parse_qs(parsed.query).items()}
+        length = int(request.headers.get('Content-Length') or 0)
+        body = json.loads(request.rfile.read(length) or b'{}') if length else {}
+        token = (request.headers.get('Authorization') or '').replace('Bearer ', '', 1)
+
+        with self._lock:
+            self.calls[nsid] += 1
+            jitter = self._random.uniform(0, self.latency_jitter) if self.latency_jitter else 0.0
+            failed = self.error_rate and self._random.random() < self.error_rate
+        if self.latency or jitter:
+            time.sleep(self.latency + jitter)
+
+        request.ratelimit_headers, over_limit = self._rate_limit_headers()
+        if over_limit:
+            return self._respond(request, 429, {'error': 'RateLimitExceeded', 'message': 'Rate Limit Exceeded'})
+        if failed:
+            return self._respond(request, 503, {'error': 'ServiceUnavailable', 'message': 'Injected failure'})
+
+        if nsid == 'com.atproto.server.createSession':
+            if body.get('identifier') != self.handle or body.get('password') != self.password:
+                return self._respond(request, 401, {'error': 'AuthenticationRequired',
+                                                    'message': 'Invalid identifier or password'})
+            return self._respond(request, 200, self._issue_session())
+
+        if nsid == 'com.atproto.server.refreshSession':
+            if not self._token_valid(token, self._refresh_tokens):
+                return self._respond(request, 400, {'error': 'ExpiredToken', 'message': 'Token has expired'})
+            with self._lock:
+                self._refresh_tokens.discard(token)
+            return self._respond(request, 200, self._issue_session())
+
+        if not self._token_valid(token, self._access_tokens):
+            return self._respond(request, 400, {'error': 'ExpiredToken', 'message': 'Token has expired'})
+
+        if nsid == 'com.atproto.server.getSession':
+            return self._respond(request, 200, {'handle': self.handle, 'did': self.did})
+
+        if nsid == 'app.bsky.actor.getProfile':
+            return self._respond(request, 200, {'did': self.did, 'handle': self.handle})
+
+        if nsid == 'app.bsky.feed.getFeed':
+            limit = int(params.get('limit', 50))
+            page = int(params.get('cursor') or 0)
+            items = [_post_view(post) for post in self.posts[page * limit:(page + 1) * limit]]
+            has_more = (page + 1) * limit < len(self.posts)
+            body = {'feed': items}
+            if has_more:
+                body['cursor'] = str(page + 1)
+            return self._respond(request, 200, body)
+
+        return self._respond(request, 501, {'error': 'MethodNotImplemented', 'message': nsid})
+
+
+def _post_view(post):
+    """Serialize an exported post record as an app.bsky.feed.defs#feedViewPost"""
+    return {'post': {
+        'uri': post['uri'],
+        'cid': 'bafyreifakecid',
+        'author': {'did': 'did:plc:recorded', 'handle': post.get('author') or 'unknown.test'},
+        'record': {
+            '$type': 'app.bsky.feed.post',
+            'text': post.get('text') or '',
+            'createdAt': post.get('created_at'),
+            'langs': post.get('langs', ['en'])
+        },
+        'indexedAt': post.get('created_at'),
+        'likeCount': post.get('like_count'),
+        'repostCount': post.get('repost_count'),
+        'replyCount': post.get('reply_count')
+    }}
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Post filter throughput on the recorded data/posts.json corpus.
+
+The exported corpus carries no language tags, so every post reaches the
+langdetect stage; the first pass is cold and later passes hit the cache.
+The per-post baseline recompiles the emoji pattern and strips emojis twice,
+as the feed fetchers did before PostFilter.
+
+Usage: python -m benchmarks.filters [--passes 3] [--min-length 50]
+"""
+import argparse
+import re
+import time
+
+from langdetect import detect
+
+from ETL.clients.recorded import load_recorded_posts
+from ETL.clients.filters import PostFilter, detect_language, simple_english_detection
+
+
+def _baseline_clean(text, min_length):
+    """Per-post filter as it was written inline in the feed fetchers"""
+    def strip_emojis(value):
+        pattern = re.compile(
+            "["
+            "\U0001F600-\U0001F64F"
+            "\U0001F300-\U0001F5FF"
+            "\U0001F680-\U0001F6FF"
+            "\U0001F1E0-\U0001F1FF"
+            "\U00002702-\U000027B0"
+            "\U000024C2-\U0001F251"
+            "]+", flags=re.UNICODE)
+        return pattern.sub(r'', value)
+
+    if not text:
+        return None
+
+    detect_text = strip_emojis(text).strip()
+    if not detect_text or len(detect_text) < 20:
+        is_english = False
+    else:
+        try:
+            is_english = detect(detect_text) == 'en'
+        except Exception:
+            is_english = simple_english_detection(detect_text)
+
+    if len(text) >= min_length and is_english and not re.match(r'^[@#\s]*$', text):
+        clean_text = strip_emojis(text).strip()
+        if clean_text and len(clean_text) >= min_length:
+            return clean_text
+    return None
+
+
+def run(passes=3, min_length=50):
+    """Return posts/second for the baseline and for each PostFilter pass"""
+    texts = [post.get('text') for post in load_recorded_posts()]
+    results = []
+
+    started = time.perf_counter()
+    kept = sum(_baseline_clean(text, min_length) is not None for text in texts)
+    elapsed = time.perf_counter() - started
+    results.append({'run': 'baseline', 'posts': len(texts), 'kept': kept,
+                    'posts_per_second': round(len(texts) / elapsed, 1)})
+
+    detect_language.cache_clear()
+    post_filter = PostFilter(min_length=min_length)
+    for i in range(passes):
+        started = time.perf_counter()
+        kept = sum(post_filter.clean(text) is not None for text in texts)
+        elapsed = time.perf_counter() - started
+        results.append({'run': f'filter pass {i + 1}', 'posts': len(texts), 'kept': kept,
+                        'posts_per_second': round(len(texts) / elapsed, 1)})
+
+    return results, post_filter.stats()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--passes', type=int, default=3, help='PostFilter passes over the corpus')
+    parser.add_argument('--min-length', type=int, default=50, help='Minimum cleaned text length')
+    args = parser.parse_args()
+
+    results, stats = run(passes=args.passes, min_length=args.min_length)
+
+    print(f"{'run':<14} {'posts':>6} {'kept':>6} {'posts/s':>10}")
+    for row in results:
+        print(f"{row['run']:<14} {row['posts']:>6} {row['kept']:>6} {row['posts_per_second']:>10}")
+
+    print(f"\n{'stage':<14} {'checked':>8} {'rejected':>9} {'ms':>10}")
+    for stage, entry in stats['stages'].items():
+        print(f"{stage:<14} {entry['checked']:>8} {entry['rejected']:>9} {entry['ms']:>10}")
+    print(f"langdetect cache: {stats['langdetect_cache']}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+"""
+Per-stage memory profile of the ETL, checked against budgets.
+
+Runs the offline ETL's stages one at a time on `--posts` posts (startup,
+collect, density, export, and the BigQuery upload sanitizer), twice:
+
+- with a background thread sampling RSS, for each stage's wall time and
+  RSS peak growth (tracemalloc's own bookkeeping and slowdown, several
+  times over for pandas-heavy stages, would distort both);
+- under tracemalloc, for the traced (Python-level) peak above the stage's
+  starting point, what the stage left allocated and the source lines
+  responsible. With `--frames` above 1, allocations are also charged to
+  the innermost ETL line on their stack (the pipeline line that called
+  into pandas/numpy/duckdb).
+
+After each stage of the first pass it times one gc.collect(): the cost of
+a forced collection at that point, which the BigQuery client pays after
+every job, chunk and read. Live runs report the actual calls and seconds
+as the 'forced_gc' trace stage (ETL.clients.bigQuery.forced_gc_stats()).
+
+Budgets are per stage in benchmarks/memory_budgets.json
+(traced_peak_mb / rss_growth_mb); `--check` exits non-zero when a stage
+exceeds one. CI enforces them through tests/test_memory_budgets.py.
+
+Usage: python -m benchmarks.memory [--posts 5000] [--top 5] [--frames 1] [--check]
+                                   [--budgets benchmarks/memory_budgets.json] [--output memory.json]
+"""
+import argparse
+import gc
+import json
+import logging
+import os
+import sys
+import threading
+import time
+import tracemalloc
+import weakref
+from datetime import timedelta
+
+from ETL.clients.recorded import load_recorded_posts
+from benchmarks.fakes import ArrivalFeedAPI, VirtualClock
+from ETL.offline import offline_etl
+from ETL.tracing import rss_mb
+
+BUDGETS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'memory_budgets.json')
+ETL_ROOT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'ETL')
+MEMORY_DIR = 'data/local/memory'
+MB = 2 ** 20
+
+
+class RSSSampler(threading.Thread):
+    """Samples RSS every `interval` seconds, tracking the peak since the last reset()"""
+
+    def __init__(self, interval=0.005):
+        super().__init__(name='rss-sampler', daemon=True)
+        self.interval = interval
+        self.peak = 0.0
+        self._done = threading.Event()
+
+    def reset(self):
+        self.peak = rss_mb() or 0.0
+
+    def run(self):
+        while not self._done.wait(self.interval):
+            self.peak = max(self.peak, rss_mb() or 0.0)
+
+    def stop(self):
+        self._done.set()
+        self.join()
+
+
+def _by_line(diffs, top, etl_only):
+    """
+    Sum allocation differences by source line
+
+    With `etl_only`, each allocation is charged to the innermost frame in ETL
+    code (the pipeline line that called into pandas/numpy/duckdb), otherwise
+    to the line that allocated it.
+    """
+    totals = {}
+    for diff in diffs:
+        frames = diff.traceback
+        if etl_only:
+            frames = [frame for frame in frames if frame.filename.startswith(ETL_ROOT)]
+        if not frames:
+            continue
+        frame = frames[0]
+        location = f"{os.path.relpath(frame.filename)}:{frame.lineno}"
+        totals[location] = totals.get(location, 0) + diff.size_diff
+    ranked = sorted((item for item in totals.items() if item[1] > 0), key=lambda item: item[1], reverse=True)[:top]
+    return [{'line': line, 'mb': round(size / MB, 3)} for line, size in ranked]
+
+
+def measure_rss(func, sampler):
+    """Wall time and RSS peak growth of `func`, then the cost of a gc.collect() after it"""
+    gc.collect()
+    rss_before = rss_mb() or 0.0
+    sampler.reset()
+
+    started = time.perf_counter()
+    func()
+    wall = time.perf_counter() - started
+    rss_peak = max(sampler.peak, rss_mb() or 0.0)
+
+    collect_started = time.perf_counter()
+    collected = gc.collect()
+    collect_seconds = time.perf_counter() - collect_started
+
+    return {
+        'wall_seconds': round(wall, 3),
+        'rss_before_mb': round(rss_before, 1),
+        'rss_growth_mb': round(rss_peak - rss_before, 1),
+        'gc_collect_ms': round(collect_seconds * 1000, 2),
+        'gc_collected_objects': collected
+    }
+
+
+def measure_traced(func, top=5):
+    """Traced peak and retained memory of `func` (tracemalloc must be running), by source line"""
+    gc.collect()
+    ignore = [tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, '<frozen *>')]
+    before = tracemalloc.take_snapshot().filter_traces(ignore)
+    traced_before, _ = tracemalloc.get_traced_memory()
+    tracemalloc.reset_peak()
+
+    func()
+
+    traced_after, traced_peak = tracemalloc.get_traced_memory()
+    diffs = tracemalloc.take_snapshot().filter_traces(ignore).compare_to(before, 'traceback')
+    return {
+        'traced_peak_mb': round((traced_peak - traced_before) / MB, 2),
+        'traced_retained_mb': round((traced_after - traced_before) / MB, 2),
+        'top_lines': _by_line(diffs, top, etl_only=False),
+        'top_etl_lines': _by_line(diffs, top, etl_only=True)
+    }
+
+
+def _sanitize_for_upload(posts_df):
+    """The BigQuery client's upload sanitizer, without the client's GCP connection"""
+    from ETL.clients.bigQuery import Client
+
+    client = Client.__new__(Client)
+    client.logger = logging.getLogger('Client')
+    client._active_jobs = weakref.WeakSet()
+    return lambda: client._sanitize_dataframe(posts_df)
+
+
+def _stages(posts, directory):
+    """(name, func) for each stage of one offline run over `posts` posts, and the ETL"""
+    corpus = load_recorded_posts()
+    clock = VirtualClock()
+    # One hour of arrivals at `posts`/hour: a single collection picks up all of them
+    feed = ArrivalFeedAPI(corpus, clock, rate=posts)
+    etl = offline_etl(directory, feed_api=feed)
+    etl.now = clock.now
+    etl.feed_pages = 1_000_000
+    etl.trace_dir = None
+    clock.advance(3600)
+
+    def startup():
+        etl.initialize_clients()
+        etl.state.load(force=True)
+        etl.load_seen_index()
+
+    export_posts = {}
+
+    def export():
+        etl.export_visualization_data()
+        export_posts['df'] = etl.query_export_posts(clock.now() - timedelta(hours=24))
+
+    return [
+        ('startup', startup),
+        ('collect', etl.collect_posts),
+        ('density', etl.calculate_and_load_density),
+        ('export', export),
+        ('sanitize', lambda: _sanitize_for_upload(export_posts['df'])()),
+    ], etl
+
+
+def profile(posts=5000, top=5, frames=1, directory=MEMORY_DIR):
+    """Per-stage memory report: an RSS pass, then a tracemalloc pass keeping `frames` frames"""
+    report = {}
+
+    stages, etl = _stages(posts, directory)
+    sampler = RSSSampler()
+    sampler.start()
+    try:
+        for name, func in stages:
+            report[name] = measure_rss(func, sampler)
+    finally:
+        sampler.stop()
+        etl.storage.close()
+
+    stages, etl = _stages(posts, directory)
+    tracemalloc.start(frames)
+    try:
+        for name, func in stages:
+            report[name].update(measure_traced(func, top))
+    finally:
+        tracemalloc.stop()
+        etl.storage.close()
+
+    return {'posts': posts, 'frames': frames, 'stages': report}
+
+
+def load_budgets(path=BUDGETS_PATH):
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+def check(report, budgets):
+    """Budget violations as (stage, metric, measured, budget) tuples"""
+    violations = []
+    for stage, limits in budgets.get('stages', {}).items():
+        measured = report['stages'].get(stage)
+        if measured is None:
+            continue
+        for metric, budget in limits.items():
+            if measured[metric] > budget:
+                violations.append((stage, metric, measured[metric], budget))
+    return violations
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--posts', type=int, default=None,
+                        help='Posts collected (default: the number in the budgets file)')
+    parser.add_argument('--top', type=int, default=5, help='Source lines listed per stage')
+    parser.add_argument('--frames', type=int, default=1,
+                        help='Stack frames tracemalloc keeps; above 1 charges allocations to ETL lines (slower)')
+    parser.add_argument('--budgets', default=BUDGETS_PATH, help='Per-stage budgets JSON')
+    parser.add_argument('--check', action='store_true', help='Exit non-zero if any stage exceeds its budget')
+    parser.add_argument('--output', help='Write the full JSON report here')
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+
+    budgets = load_budgets(args.budgets)
+    with open(os.devnull, 'w') as devnull:
+        stdout, sys.stdout = sys.stdout, devnull
+        try:
+            report = profile(args.posts or budgets.get('posts', 5000), args.top, args.frames)
+        finally:
+            sys.stdout = stdout
+
+    print(f"{'stage':<9} {'wall s':>7} {'traced peak MB':>14} {'retained MB':>11} {'RSS growth MB':>13} "
+          f"{'gc.collect ms':>13}")
+    for name, stage in report['stages'].items():
+        print(f"{name:<9} {stage['wall_seconds']:>7.3f} {stage['traced_peak_mb']:>14.2f} "
+              f"{stage['traced_retained_mb']:>11.2f} {stage['rss_growth_mb']:>13.1f} {stage['gc_collect_ms']:>13.2f}")
+        for line in (line for line in stage['top_etl_lines'] if line['mb']):
+            print(f"          {line['mb']:>8.3f} MB  {line['line']}")
+
+    violations = check(report, budgets)
+    for stage, metric, measured, budget in violations:
+        print(f"OVER BUDGET: {stage} {metric} {measured} > {budget}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    if args.check and violations:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Sequential vs pipelined collection throughput with simulated stage costs.
+
+Each page goes through fetch -> encode -> load, taking `--fetch`, `--encode`
+and `--load` seconds (slept, so they overlap like network I/O and a
+GIL-releasing encoder do). The sequential run does one stage at a time as
+run_etl used to; the pipelined run uses ETL.pipeline.Pipeline. Reports
+posts/minute for both and the ceiling set by the slowest stage.
+
+Usage: python -m benchmarks.pipeline [--pages 12] [--page-size 100]
+                                     [--fetch 0.3] [--encode 0.5] [--load 0.4] [--queue-size 2]
+"""
+import argparse
+import time
+
+from ETL.pipeline import Pipeline, Stage
+
+
+def _work(seconds):
+    def stage(page):
+        time.sleep(seconds)
+        return page
+    return stage
+
+
+def _pages(pages, page_size, fetch):
+    fetch_page = _work(fetch)
+    for n in range(pages):
+        yield fetch_page(list(range(n * page_size, (n + 1) * page_size)))
+
+
+def run(pages=12, page_size=100, fetch=0.3, encode=0.5, load=0.4, queue_size=2):
+    """Return posts/minute for the sequential and pipelined runs, and the slowest-stage ceiling"""
+    started = time.perf_counter()
+    posts = 0
+    for page in _pages(pages, page_size, fetch):
+        posts += len(_work(load)(_work(encode)(page)))
+    sequential_seconds = time.perf_counter() - started
+
+    pipeline = Pipeline(
+        _pages(pages, page_size, fetch),
+        [Stage('encode', _work(encode)), Stage('load', _work(load))],
+        queue_size=queue_size,
+        size=len
+    )
+    stats = pipeline.run()
+
+    return {
+        'posts': posts,
+        'sequential_seconds': round(sequential_seconds, 3),
+        'sequential_per_minute': round(posts / sequential_seconds * 60, 1),
+        'pipelined_seconds': stats['seconds'],
+        'pipelined_per_minute': stats['units_per_minute'],
+        'ceiling_per_minute': round(page_size / max(fetch, encode, load) * 60, 1),
+        'stages': stats['stages']
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--pages', type=int, default=12, help='Feed pages collected')
+    parser.add_argument('--page-size', type=int, default=100, help='Posts per page')
+    parser.add_argument('--fetch', type=float, default=0.3, help='Seconds to fetch a page')
+    parser.add_argument('--encode', type=float, default=0.5, help='Seconds to encode a page')
+    parser.add_argument('--load', type=float, default=0.4, help='Seconds to load a page')
+    parser.add_argument('--queue-size', type=int, default=2, help='Pages buffered between stages')
+    args = parser.parse_args()
+
+    result = run(args.pages, args.page_size, args.fetch, args.encode, args.load, args.queue_size)
+    print(f"sequential  {result['sequential_seconds']:.2f}s  {result['sequential_per_minute']:.0f} posts/min")
+    print(f"pipelined   {result['pipelined_seconds']:.2f}s  {result['pipelined_per_minute']:.0f} posts/min")
+    print(f"ceiling (slowest stage)  {result['ceiling_per_minute']:.0f} posts/min")
+    for name, stage in result['stages'].items():
+        print(f"  {name:<8} busy {stage['busy_seconds']:.2f}s  idle {stage['idle_seconds']:.2f}s  "
+              f"blocked {stage['blocked_seconds']:.2f}s")
+
+
+if __name__ == '__main__':
+    main()
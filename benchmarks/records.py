@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Post record parsing and conversion cost per 10k posts.
+
+Compares the old path (an 11-key dict per post, then DataFrame -> dict
+records -> DataFrame around the encoder) with PostRecord + PostBatch
+(slotted records, one columnar pass). Reports wall time, peak traced
+memory, allocated blocks and bytes retained by the parsed records.
+
+Usage: python -m benchmarks.records [--posts 10000]
+"""
+import argparse
+import gc
+import time
+import tracemalloc
+from datetime import datetime
+
+import pandas as pd
+
+from ETL.clients.recorded import _feed_item, load_recorded_posts
+from ETL.clients.filters import PostFilter
+from ETL.clients.records import PostBatch, parse_feed_item
+
+COLUMNS = ['uri', 'text', 'author', 'like_count', 'reply_count', 'repost_count', 'created_at']
+
+
+def _dict_records(items, post_filter):
+    """Per-post dicts as the feed fetchers built them before PostRecord"""
+    posts = []
+    for item in items:
+        clean_text = post_filter.clean(item.post.record.text, item.post.record.langs, min_length=30)
+        if clean_text is None:
+            continue
+        posts.append({
+            'uri': item.post.uri,
+            'text': clean_text,
+            'author': item.post.author.handle,
+            'created_at': item.post.record.created_at,
+            'like_count': item.post.like_count or 0,
+            'repost_count': item.post.repost_count or 0,
+            'reply_count': item.post.reply_count or 0,
+            'engagement_score': (item.post.like_count or 0) + (item.post.repost_count or 0)
+                                + (item.post.reply_count or 0),
+            'text_length': len(clean_text),
+            'fetched_at': datetime.now().isoformat(),
+            'source': 'custom_feed'
+        })
+    return posts
+
+
+def _dict_conversion(posts):
+    """DataFrame -> records -> DataFrame, as transform_posts did around encoder.run"""
+    posts_df = pd.DataFrame(posts)
+    records = posts_df.to_dict('records')
+    texts = [record['text'] for record in records]
+    return pd.DataFrame(records)[COLUMNS], texts
+
+
+def _slotted_records(items, post_filter):
+    fetched_at = datetime.now().isoformat()
+    posts = []
+    for item in items:
+        post = parse_feed_item(item, post_filter, 30, fetched_at=fetched_at)
+        if post is not None:
+            posts.append(post)
+    return posts
+
+
+def _batch_conversion(posts):
+    batch = PostBatch.from_records(posts)
+    return batch.to_dataframe(COLUMNS), batch.texts
+
+
+def _measure(fn, *args):
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    started = time.perf_counter()
+    result = fn(*args)
+    elapsed = time.perf_counter() - started
+    after = tracemalloc.take_snapshot()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    diff = after.compare_to(before, 'filename')
+    return result, {
+        'ms': round(elapsed * 1000, 1),
+        'peak_kb': round(peak / 1024, 1),
+        'retained_kb': round(sum(stat.size_diff for stat in diff) / 1024, 1),
+        'retained_blocks': sum(stat.count_diff for stat in diff)
+    }
+
+
+def run(n_posts=10000):
+    """Return parse and conversion measurements for both record layouts"""
+    corpus = load_recorded_posts()
+    items = [_feed_item(corpus[i % len(corpus)]) for i in range(n_posts)]
+    results = []
+
+    for name, parse, convert in (('dict', _dict_records, _dict_conversion),
+                                 ('slotted', _slotted_records, _batch_conversion)):
+        posts, parse_stats = _measure(parse, items, PostFilter())
+        _, convert_stats = _measure(convert, posts)
+        results.append({'layout': name, 'posts': len(posts), 'parse': parse_stats, 'convert': convert_stats})
+        del posts
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--posts', type=int, default=10000, help='Posts per measurement')
+    args = parser.parse_args()
+
+    print(f"{'layout':<8} {'stage':<8} {'ms':>8} {'peak KB':>9} {'retained KB':>12} {'blocks':>8}")
+    for row in run(args.posts):
+        for stage in ('parse', 'convert'):
+            stats = row[stage]
+            print(f"{row['layout']:<8} {stage:<8} {stats['ms']:>8} {stats['peak_kb']:>9} "
+                  f"{stats['retained_kb']:>12} {stats['retained_blocks']:>8}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+"""
+Time-accelerated replay of the orchestrator over a simulated day.
+
+A virtual clock drives ATProtoETL.now(): each tick advances it by the
+collection interval and calls run_etl(), so density and export fall due on
+their own cadences and a day of collections runs back to back in minutes.
+Posts arrive at the recorded corpus's rate times `--scale` and go through
+the real Bluesky client, pipeline and DuckDB storage; the encoder is the
+offline one (`--encode-seconds` per text stands in for model time).
+
+Each tick records wall seconds, posts loaded, per-stage time, pipeline
+queue high-water marks, RSS, export size and bytes written; the report rolls them
+up per virtual hour.
+
+`--find-breaking-point` runs short replays at doubling scales, then
+bisects, for the smallest input scale at which a tick overruns its
+deadline: the collection interval divided by `--speedup` (720 compresses
+24 hours into 2 minutes). The first tick (index and model warm-up) is not
+held to the deadline.
+
+Usage: python -m benchmarks.replay [--hours 24] [--scale 1] [--interval-minutes 10]
+                                   [--encode-seconds 0] [--output replay.json]
+       python -m benchmarks.replay --find-breaking-point [--hours 2] [--speedup 720]
+"""
+import argparse
+import json
+import logging
+import os
+import time
+
+from ETL.clients.recorded import load_recorded_posts
+from benchmarks.fakes import ArrivalFeedAPI, VirtualClock, corpus_rate
+from ETL.export import EXPORT_SUBDIRS
+from ETL.offline import offline_etl
+
+REPLAY_DIR = 'data/local/replay'
+
+
+def _export_bytes(directory):
+    """Size of the export on disk: manifest, last_update.json and the slice/shard files"""
+    paths = [os.path.join(directory, name) for name in ('manifest.json', 'last_update.json')]
+    for subdir in EXPORT_SUBDIRS:
+        if os.path.isdir(os.path.join(directory, subdir)):
+            paths += [os.path.join(directory, subdir, name) for name in os.listdir(os.path.join(directory, subdir))]
+    return sum(os.path.getsize(path) for path in paths if os.path.exists(path))
+
+
+def _tick(index, clock, etl, feed, arrived_before, wall, result):
+    trace = result.get('trace', {})
+    pipeline = result.get('pipeline') or {}
+    return {
+        'tick': index,
+        'virtual_time': clock.now().isoformat(),
+        'status': result.get('status'),
+        'wall_seconds': round(wall, 4),
+        'posts_arrived': feed.arrived - arrived_before,
+        'posts_loaded': result.get('posts_new', 0),
+        'posts_per_minute': pipeline.get('units_per_minute'),
+        'stage_seconds': {name: stage['wall_seconds'] for name, stage in trace.get('stages', {}).items()},
+        'queue_high_water': {name: stage['queue_high_water']
+                             for name, stage in pipeline.get('stages', {}).items() if name != 'source'},
+        'rss_mb': trace.get('rss_mb'),
+        'peak_rss_mb': trace.get('peak_rss_mb'),
+        'density_calculated': bool(result.get('density_calculated')),
+        'data_exported': bool(result.get('data_exported')),
+        'export_bytes': _export_bytes(etl.data_dir),
+        'export_bytes_written': (result.get('export_stats') or {}).get('bytes_written', 0)
+    }
+
+
+def replay(hours=24.0, scale=1.0, interval_minutes=10.0, encode_seconds=0.0, rate=None,
+           deadline=None, stop_on_miss=False, directory=REPLAY_DIR):
+    """
+    Replay `hours` of virtual time, one run_etl() per collection interval
+
+    Args:
+        rate: Base arrival rate in posts/hour (default: the recorded corpus's rate)
+        deadline: Wall seconds a tick may take; later ticks over it count as misses
+        stop_on_miss: End the replay at the first missed deadline
+    """
+    posts = load_recorded_posts()
+    clock = VirtualClock()
+    feed = ArrivalFeedAPI(posts, clock, rate=(rate or corpus_rate(posts)) * scale)
+    etl = offline_etl(directory, feed_api=feed, encode_seconds_per_text=encode_seconds)
+    etl.now = clock.now
+    # Follow each walk to the end of what arrived; per-run trace files would pile up
+    etl.feed_pages = 1_000_000
+    etl.trace_dir = None
+
+    ticks = []
+    started = time.perf_counter()
+    for index in range(int(hours * 60 / interval_minutes)):
+        clock.advance(interval_minutes * 60)
+        arrived_before = feed.arrived
+        tick_started = time.perf_counter()
+        result = etl.run_etl()
+        ticks.append(_tick(index, clock, etl, feed, arrived_before, time.perf_counter() - tick_started, result))
+        if stop_on_miss and (_missed(ticks[-1], deadline) or result.get('status') == 'error'):
+            break
+    wall = time.perf_counter() - started
+    etl.storage.close()
+
+    return {
+        'config': {'hours': hours, 'scale': scale, 'interval_minutes': interval_minutes,
+                   'encode_seconds': encode_seconds, 'posts_per_hour': round(feed.rate, 1),
+                   'deadline_seconds': deadline},
+        'summary': _summarize(ticks, wall, interval_minutes, deadline),
+        'hourly': _hourly(ticks, interval_minutes),
+        'ticks': ticks
+    }
+
+
+def _missed(tick, deadline):
+    return deadline is not None and tick['tick'] > 0 and tick['wall_seconds'] > deadline
+
+
+def _summarize(ticks, wall, interval_minutes, deadline):
+    virtual_seconds = len(ticks) * interval_minutes * 60
+    loaded = sum(tick['posts_loaded'] for tick in ticks)
+    rss = [tick['rss_mb'] for tick in ticks if tick['rss_mb'] is not None]
+    tick_walls = sorted(tick['wall_seconds'] for tick in ticks[1:]) or [0.0]
+    return {
+        'ticks': len(ticks),
+        'virtual_hours': round(virtual_seconds / 3600, 2),
+        'wall_seconds': round(wall, 3),
+        'compression': round(virtual_seconds / wall, 1) if wall else None,
+        'posts_arrived': sum(tick['posts_arrived'] for tick in ticks),
+        'posts_loaded': loaded,
+        'posts_per_wall_second': round(loaded / wall, 1) if wall else None,
+        'tick_p50_seconds': tick_walls[len(tick_walls) // 2],
+        'tick_max_seconds': tick_walls[-1],
+        'errors': sum(1 for tick in ticks if tick['status'] == 'error'),
+        'density_slices': sum(tick['density_calculated'] for tick in ticks),
+        'exports': sum(tick['data_exported'] for tick in ticks),
+        'export_bytes_written': sum(tick['export_bytes_written'] for tick in ticks),
+        'rss_start_mb': rss[0] if rss else None,
+        'rss_end_mb': rss[-1] if rss else None,
+        'rss_growth_mb': round(rss[-1] - rss[0], 1) if rss else None,
+        'peak_rss_mb': max((tick['peak_rss_mb'] or 0) for tick in ticks) if ticks else None,
+        'deadline_misses': sum(_missed(tick, deadline) for tick in ticks)
+    }
+
+
+def _hourly(ticks, interval_minutes):
+    """Per-virtual-hour rollup of the tick records"""
+    per_hour = max(1, int(60 / interval_minutes))
+    hours = []
+    for start in range(0, len(ticks), per_hour):
+        window = ticks[start:start + per_hour]
+        stages = {}
+        for tick in window:
+            for name, seconds in tick['stage_seconds'].items():
+                stages[name] = round(stages.get(name, 0.0) + seconds, 4)
+        hours.append({
+            'hour': start // per_hour,
+            'wall_seconds': round(sum(tick['wall_seconds'] for tick in window), 3),
+            'max_tick_seconds': max(tick['wall_seconds'] for tick in window),
+            'posts_loaded': sum(tick['posts_loaded'] for tick in window),
+            'stage_seconds': stages,
+            'queue_high_water': max((max(tick['queue_high_water'].values(), default=0) for tick in window),
+                                    default=0),
+            'rss_mb': window[-1]['rss_mb'],
+            'export_bytes': window[-1]['export_bytes'],
+            'export_bytes_written': sum(tick['export_bytes_written'] for tick in window)
+        })
+    return hours
+
+
+def find_breaking_point(hours=2.0, speedup=720.0, interval_minutes=10.0, encode_seconds=0.0,
+                        max_scale=1024.0, bisect_steps=4):
+    """
+    Smallest input scale whose ticks overrun interval/speedup seconds
+
+    Doubles the scale from 1 until a replay misses the deadline (or errors),
+    then bisects between the last scale that held and the first that didn't.
+    """
+    deadline = interval_minutes * 60 / speedup
+    trials = []
+
+    def holds(scale):
+        result = replay(hours, scale, interval_minutes, encode_seconds, deadline=deadline, stop_on_miss=True)
+        summary = result['summary']
+        ok = summary['deadline_misses'] == 0 and summary['errors'] == 0
+        trials.append({'scale': scale, 'holds': ok, 'tick_max_seconds': summary['tick_max_seconds'],
+                       'posts_per_wall_second': summary['posts_per_wall_second']})
+        logging.getLogger('replay').warning(
+            f"scale {scale:g}: {'holds' if ok else 'breaks'} (slowest tick {summary['tick_max_seconds']:.3f}s, "
+            f"deadline {deadline:.3f}s)")
+        return ok
+
+    held, broke = None, 1.0
+    while broke <= max_scale and holds(broke):
+        held, broke = broke, broke * 2
+    if broke > max_scale:
+        broke = None
+    elif held is not None:
+        for _ in range(bisect_steps):
+            middle = (held + broke) / 2
+            if holds(middle):
+                held = middle
+            else:
+                broke = middle
+
+    return {'deadline_seconds': round(deadline, 4), 'speedup': speedup, 'sustained_scale': held,
+            'breaking_scale': broke, 'trials': trials}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--hours', type=float, default=None,
+                        help='Virtual hours to replay (default: 24, or 2 per breaking-point trial)')
+    parser.add_argument('--scale', type=float, default=1.0, help='Multiplier on the recorded arrival rate')
+    parser.add_argument('--rate', type=float, default=None, help='Base arrival rate in posts/hour')
+    parser.add_argument('--interval-minutes', type=float, default=10.0, help='Virtual minutes between collections')
+    parser.add_argument('--encode-seconds', type=float, default=0.0, help='Simulated encoder seconds per post')
+    parser.add_argument('--speedup', type=float, default=720.0,
+                        help='Virtual/wall time ratio a tick must keep up with (default: 24h in 2 minutes)')
+    parser.add_argument('--find-breaking-point', action='store_true',
+                        help='Search for the input scale at which ticks overrun interval/speedup')
+    parser.add_argument('--output', help='Write the full JSON report here')
+    args = parser.parse_args()
+    # The ETL logs every stage; configured before it is imported so its INFO default doesn't apply
+    logging.basicConfig(level=logging.WARNING)
+
+    if args.find_breaking_point:
+        report = find_breaking_point(args.hours or 2.0, args.speedup, args.interval_minutes, args.encode_seconds)
+        print(f"deadline {report['deadline_seconds']}s per tick (speedup {args.speedup:g}x): "
+              f"sustained scale {report['sustained_scale']}, breaks at {report['breaking_scale']}")
+    else:
+        report = replay(args.hours or 24.0, args.scale, args.interval_minutes, args.encode_seconds, args.rate,
+                        deadline=args.interval_minutes * 60 / args.speedup)
+        print(f"{'hour':>4} {'wall s':>7} {'max tick':>8} {'loaded':>7} {'queue':>5} {'rss MB':>7} {'export KB':>9} {'written KB':>10}")
+        for hour in report['hourly']:
+            print(f"{hour['hour']:>4} {hour['wall_seconds']:>7.2f} {hour['max_tick_seconds']:>8.3f} "
+                  f"{hour['posts_loaded']:>7} {hour['queue_high_water']:>5} {hour['rss_mb'] or 0:>7.1f} "
+                  f"{hour['export_bytes'] / 1024:>9.1f} {hour['export_bytes_written'] / 1024:>10.1f}")
+        print(json.dumps(report['summary'], indent=2))
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2, default=str)
+
+
+if __name__ == '__main__':
+    main()
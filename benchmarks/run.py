@@ -0,0 +1,285 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark suite for the pipeline's hot functions, with stored baselines.
+
+Cases cover density.model across input sizes, _stratified_spatial_sample,
+encoder.run with a small sentence-transformers model, the BigQuery client's
+_sanitize_dataframe, labels.generate, topic_clusters.generate and the JSON
+export. Inputs are synthetic (a seeded Gaussian mixture in UMAP space) or
+the recorded corpus (data/posts.json). Everything runs on CPU without
+network access; the encoder case is skipped unless sentence-transformers,
+umap-learn and the model are already available locally.
+
+Each case runs once to warm up, then `--repeats` times; the median is
+compared against benchmarks/baselines.json and a case more than
+`--threshold` slower than its baseline is reported as a regression
+(`--check` exits non-zero on any). Baselines are only comparable on the
+machine that recorded them: re-record with `--save` after hardware changes
+or intended performance changes.
+
+Usage: python -m benchmarks.run [--filter density] [--repeats 5]
+                                [--check] [--threshold 0.25] [--save] [--output results.json]
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import weakref
+
+import numpy as np
+import pandas as pd
+
+from ETL.clients.recorded import load_recorded_posts
+
+BASELINES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baselines.json')
+
+
+class Skip(Exception):
+    """Raised by a case's setup when it cannot run here (missing optional dependency or model)"""
+
+
+def synthetic_posts(n, seed=42, components=5):
+    """`n` posts with UMAP coordinates from a seeded mixture of 7 Gaussian topic blobs"""
+    rng = np.random.default_rng(seed)
+    centers = rng.uniform(-10, 10, size=(7, components))
+    topics = rng.integers(0, len(centers), size=n)
+    coordinates = centers[topics] + rng.normal(0, 1.5, size=(n, components))
+    words = np.array(['vote', 'senate', 'album', 'tour', 'art', 'sketch', 'game', 'match',
+                      'rain', 'storm', 'code', 'python', 'movie', 'trailer'])
+    posts = pd.DataFrame({f'UMAP{i + 1}': coordinates[:, i] for i in range(components)})
+    posts['text'] = [' '.join(words[rng.integers(2 * t, 2 * t + 2, size=8)]) for t in topics]
+    posts['cluster'] = topics
+    return posts
+
+
+def recorded_posts():
+    posts = pd.DataFrame(load_recorded_posts())
+    return posts.dropna(subset=['UMAP1', 'UMAP2']).reset_index(drop=True)
+
+
+def _density_model(posts):
+    from ETL.feature_engineering import density
+    return lambda: density.model(posts, base_resolution=50, sigma=1.5)
+
+
+def _stratified_sample(posts, n_sample):
+    from ETL.feature_engineering.density import _stratified_spatial_sample
+    return lambda: _stratified_spatial_sample(posts, n_sample, 'UMAP1', 'UMAP2')
+
+
+def _encoder_run(n):
+    try:
+        import sentence_transformers  # noqa: F401
+        import umap  # noqa: F401
+    except ImportError as e:
+        raise Skip(f"encoder dependencies not installed ({e.name})")
+    from ETL.feature_engineering import encoder
+
+    # Never download: the suite must run offline
+    os.environ.setdefault('HF_HUB_OFFLINE', '1')
+    model_name = 'sentence-transformers/all-MiniLM-L6-v2'
+    try:
+        encoder._sentence_model(model_name, 'cpu')
+    except Exception as e:
+        raise Skip(f"{model_name} not available locally ({e})")
+
+    texts = recorded_posts()['text'].head(n).tolist()
+    return lambda: encoder.run([{'text': text} for text in texts], model_name=model_name,
+                               device='cpu', use_pca=False, n_neighbors=10)
+
+
+def _sanitize_dataframe(posts):
+    from ETL.clients.bigQuery import Client
+
+    # The sanitizer only needs the logger; skip the constructor's GCP client
+    client = Client.__new__(Client)
+    client.logger = logging.getLogger('Client')
+    client._active_jobs = weakref.WeakSet()
+    return lambda: client._sanitize_dataframe(posts)
+
+
+def _labels(posts):
+    from ETL.feature_engineering import labels
+    return lambda: labels.generate(posts, cluster_column='cluster', text_column='text', n_terms=2)
+
+
+def _topic_clusters(posts, columns):
+    from ETL.labels import topic_clusters
+    return lambda: topic_clusters.generate(posts, umap_columns=columns, n_clusters=7)
+
+
+def _export(posts, slices):
+    from ETL.etl import ATProtoETL
+
+    grid = np.linspace(-15, 15, 50)
+    x, y = np.meshgrid(grid, grid)
+    # The day before now, so the slices spread over the export's level-of-detail tiers as live ones do
+    start = pd.Timestamp.now(tz='UTC').floor('h') - pd.Timedelta(hours=24)
+    density_df = pd.concat([
+        pd.DataFrame({'x': x.ravel(), 'y': y.ravel(), 'density': np.random.default_rng(s).random(x.size),
+                      'calculated_at': start + pd.Timedelta(minutes=30 * s), 'posts_count': len(posts)})
+        for s in range(slices)
+    ], ignore_index=True)
+
+    etl = ATProtoETL()
+
+    def export():
+        # A fresh directory per call: a full export, not the no-op of re-exporting the same slices
+        etl.data_dir = tempfile.mkdtemp(prefix='bench-export-')
+        etl.write_visualization_data(density_df, posts)
+    return export
+
+
+def cases():
+    """(name, setup) pairs; setup returns the callable to time, or raises Skip"""
+    def recorded_with_clusters():
+        from ETL.labels import topic_clusters
+        return topic_clusters.generate(recorded_posts(), umap_columns=['UMAP1', 'UMAP2'], n_clusters=7)
+
+    def export_posts():
+        return recorded_posts()[['uri', 'text', 'author', 'like_count', 'reply_count', 'repost_count',
+                                 'UMAP1', 'UMAP2', 'created_at']]
+
+    return [
+        ('density.model[recorded]', lambda: _density_model(recorded_posts())),
+        ('density.model[1k]', lambda: _density_model(synthetic_posts(1_000))),
+        ('density.model[10k]', lambda: _density_model(synthetic_posts(10_000))),
+        ('density.model[100k]', lambda: _density_model(synthetic_posts(100_000))),
+        ('density._stratified_spatial_sample[10k->5k]', lambda: _stratified_sample(synthetic_posts(10_000), 5_000)),
+        ('density._stratified_spatial_sample[100k->10k]',
+         lambda: _stratified_sample(synthetic_posts(100_000), 10_000)),
+        ('encoder.run[minilm,200]', lambda: _encoder_run(200)),
+        ('bigquery._sanitize_dataframe[recorded]', lambda: _sanitize_dataframe(export_posts())),
+        ('labels.generate[recorded]', lambda: _labels(recorded_with_clusters())),
+        ('labels.generate[10k]', lambda: _labels(synthetic_posts(10_000))),
+        ('topic_clusters.generate[recorded]', lambda: _topic_clusters(recorded_posts(), ['UMAP1', 'UMAP2'])),
+        ('topic_clusters.generate[2k]',
+         lambda: _topic_clusters(synthetic_posts(2_000), [f'UMAP{i}' for i in range(1, 6)])),
+        ('export.write_visualization_data[recorded,48 slices]', lambda: _export(export_posts(), 48)),
+    ]
+
+
+def measure(func, repeats):
+    """Seconds per call: one warm-up call, then `repeats` timed calls"""
+    func()
+    timings = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+    return {
+        'median_seconds': round(statistics.median(timings), 6),
+        'min_seconds': round(min(timings), 6),
+        'max_seconds': round(max(timings), 6),
+        'repeats': repeats
+    }
+
+
+def run(name_filter=None, repeats=5):
+    """Run the (matching) cases; returns {case name: timings, or {'skipped': reason}}"""
+    results = {}
+    for name, setup in cases():
+        if name_filter and name_filter not in name:
+            continue
+        try:
+            func = setup()
+        except Skip as e:
+            results[name] = {'skipped': str(e)}
+            continue
+        results[name] = measure(func, repeats)
+    return results
+
+
+def compare(results, baselines, threshold=0.25):
+    """Median vs baseline per case; `regression` when slower by more than `threshold`"""
+    report = {}
+    for name, result in results.items():
+        baseline = baselines.get('cases', {}).get(name)
+        if 'skipped' in result or not baseline:
+            report[name] = {'status': 'skipped' if 'skipped' in result else 'new', **result}
+            continue
+        ratio = result['median_seconds'] / baseline['median_seconds']
+        status = 'regression' if ratio > 1 + threshold else 'improved' if ratio < 1 - threshold else 'ok'
+        report[name] = {'status': status, 'ratio': round(ratio, 3),
+                        'baseline_seconds': baseline['median_seconds'], **result}
+    return report
+
+
+def machine():
+    return {'platform': platform.platform(), 'python': platform.python_version(),
+            'processor': platform.processor() or platform.machine(), 'cpus': os.cpu_count()}
+
+
+def load_baselines(path=BASELINES_PATH):
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def save_baselines(results, path=BASELINES_PATH):
+    """Store the medians of the cases that ran, keeping baselines of cases not run this time"""
+    baselines = load_baselines(path)
+    baselines['machine'] = machine()
+    baselines['recorded_at'] = pd.Timestamp.now(tz='UTC').isoformat()
+    baselines.setdefault('cases', {}).update(
+        {name: {'median_seconds': result['median_seconds'], 'min_seconds': result['min_seconds']}
+         for name, result in results.items() if 'skipped' not in result}
+    )
+    with open(path, 'w') as f:
+        json.dump(baselines, f, indent=2, sort_keys=True)
+        f.write('\n')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--filter', help='Only run cases whose name contains this')
+    parser.add_argument('--repeats', type=int, default=5, help='Timed calls per case')
+    parser.add_argument('--threshold', type=float, default=0.25,
+                        help='Slowdown vs baseline reported as a regression (0.25 = 25%%)')
+    parser.add_argument('--check', action='store_true', help='Exit non-zero if any case regressed')
+    parser.add_argument('--save', action='store_true', help='Record these results as the baselines')
+    parser.add_argument('--output', help='Write the comparison report as JSON here')
+    args = parser.parse_args()
+    # density and the ETL log or print per call; keep the table readable
+    logging.basicConfig(level=logging.WARNING)
+
+    baselines = load_baselines()
+    if baselines.get('machine') and baselines['machine'] != machine():
+        print(f"note: baselines were recorded on {baselines['machine']}; timings may not be comparable")
+
+    with open(os.devnull, 'w') as devnull:
+        stdout, sys.stdout = sys.stdout, devnull
+        try:
+            results = run(args.filter, args.repeats)
+        finally:
+            sys.stdout = stdout
+    report = compare(results, baselines, args.threshold)
+
+    print(f"{'case':<52} {'median ms':>10} {'baseline':>10} {'ratio':>6}  status")
+    for name, row in report.items():
+        if row['status'] == 'skipped':
+            print(f"{name:<52} {'':>10} {'':>10} {'':>6}  skipped: {row['skipped']}")
+            continue
+        baseline = f"{row['baseline_seconds'] * 1000:.1f}" if 'baseline_seconds' in row else '-'
+        ratio = f"{row['ratio']:.2f}" if 'ratio' in row else '-'
+        print(f"{name:<52} {row['median_seconds'] * 1000:>10.1f} {baseline:>10} {ratio:>6}  {row['status']}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'machine': machine(), 'threshold': args.threshold, 'cases': report}, f, indent=2)
+    if args.save:
+        save_baselines(results)
+        print(f"Baselines saved to {BASELINES_PATH}")
+    if args.check and any(row['status'] == 'regression' for row in report.values()):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+Streaming consumer throughput and latency against a recorded Jetstream capture.
+
+The sink sleeps `--sink-seconds` per batch to stand in for transform and load,
+so the effect of batch size and the bounded queue on latency can be compared.
+
+Usage: python -m benchmarks.stream [--events 20000] [--sink-seconds 0.05]
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+from ETL.clients.recorded import write_capture
+from ETL.clients.jetstream import JetstreamConsumer, replay_capture
+
+
+def run(events=20000, batch_sizes=(50, 100, 500), sink_seconds=0.05, queue_size=1000):
+    """Return stream metrics for each batch size"""
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        capture = os.path.join(tmp, 'capture.jsonl')
+        write_capture(capture, events=events)
+
+        for batch_size in batch_sizes:
+            consumer = JetstreamConsumer(
+                lambda posts: time.sleep(sink_seconds),
+                batch_size=batch_size,
+                batch_seconds=1.0,
+                queue_size=queue_size,
+                source=replay_capture(capture)
+            )
+            metrics = asyncio.run(consumer.run())
+            results.append({'batch_size': batch_size, **metrics})
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--events', type=int, default=20000, help='Events in the synthetic capture')
+    parser.add_argument('--sink-seconds', type=float, default=0.05, help='Simulated seconds per batch load')
+    args = parser.parse_args()
+
+    print(f"{'batch':>5} {'events/s':>9} {'posts/s':>8} {'p50 s':>7} {'p95 s':>7} {'queue max':>9}")
+    for row in run(events=args.events, sink_seconds=args.sink_seconds):
+        print(f"{row['batch_size']:>5} {row['events_per_second']:>9} {row['posts_per_second']:>8} "
+              f"{row['latency_p50']:>7.3f} {row['latency_p95']:>7.3f} {row['queue_high_water']:>9}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Feed collection through the bare atproto request layer vs RateLimitedRequest.
+
+Both collect the same feed pages from a local fake PDS that injects latency,
+random 503s and a per-window rate limit (429s past it), and report how many
+pages came back, how many were lost to errors, and the retry/pacing counters.
+
+Usage: python -m benchmarks.transport [--pages 40] [--workers 4] [--rate-limit 30]
+                                      [--window 2] [--error-rate 0.1] [--latency 0.02]
+"""
+import argparse
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from atproto import Client as AtProtoClient
+from atproto_client.request import Request
+
+from ETL.clients.bluesky import Client
+from ETL.clients.recorded import load_recorded_posts
+from benchmarks.fakes import FakePDS
+from ETL.clients.transport import RateLimitedRequest
+
+
+def _collect(pds, request, pages, workers, session_path):
+    client = Client(client=AtProtoClient(base_url=pds.url, request=request), session_path=session_path)
+    client.handle, client.password = pds.handle, pds.password
+    if not client.authenticate():
+        raise RuntimeError("authentication failed")
+
+    # One feed per worker, each walked for its share of the pages
+    feeds = [f"at://did:plc:bench/app.bsky.feed.generator/feed-{n}" for n in range(workers)]
+    started = time.perf_counter()
+    pages_ok, errors = 0, 0
+
+    def walk(feed_uri):
+        ok, failed, cursor = 0, 0, None
+        for _ in range(pages // workers):
+            try:
+                _, cursor = client._fetch_feed_page(feed_uri, limit=25, min_length=0, cursor=cursor)
+                ok += 1
+            except Exception:
+                failed += 1
+        return ok, failed
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for ok, failed in pool.map(walk, feeds):
+            pages_ok += ok
+            errors += failed
+
+    return {
+        'pages_ok': pages_ok,
+        'pages_failed': errors,
+        'seconds': round(time.perf_counter() - started, 3),
+        'transport': client.transport_stats()
+    }
+
+
+def run(pages=40, workers=4, rate_limit=30, window=2.0, error_rate=0.1, latency=0.02):
+    """Return one result row per request layer"""
+    posts = load_recorded_posts()
+    layers = [
+        ('atproto Request', lambda: Request()),
+        ('RateLimitedRequest', lambda: RateLimitedRequest(backoff_base=0.05, backoff_max=window)),
+    ]
+    results = []
+    for name, make_request in layers:
+        with tempfile.TemporaryDirectory() as tmp, \
+                FakePDS(posts=posts, latency=latency, latency_jitter=latency, rate_limit=rate_limit,
+                        rate_window=window, error_rate=error_rate) as pds:
+            row = _collect(pds, make_request(), pages, workers, os.path.join(tmp, 'session'))
+            row['layer'] = name
+            row['server_statuses'] = dict(pds.statuses)
+            results.append(row)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--pages', type=int, default=40, help='Feed pages to collect in total')
+    parser.add_argument('--workers', type=int, default=4, help='Feeds walked concurrently')
+    parser.add_argument('--rate-limit', type=int, default=30, help='Requests allowed per window')
+    parser.add_argument('--window', type=float, default=2.0, help='Rate-limit window in seconds')
+    parser.add_argument('--error-rate', type=float, default=0.1, help='Share of requests answered with 503')
+    parser.add_argument('--latency', type=float, default=0.02, help='Simulated seconds per request')
+    args = parser.parse_args()
+
+    for row in run(args.pages, args.workers, args.rate_limit, args.window, args.error_rate, args.latency):
+        transport = row['transport'] or {}
+        print(f"{row['layer']:<20} pages ok {row['pages_ok']:>3}  failed {row['pages_failed']:>3}  "
+              f"{row['seconds']:.2f}s  retries {transport.get('retries', '-')}  "
+              f"pacing {transport.get('pacing_seconds', '-')}s  server {row['server_statuses']}")
+
+
+if __name__ == '__main__':
+    main()
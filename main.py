@@ -6,19 +6,89 @@ Runs the AT Proto synoptic chart ETL pipeline
 
 import sys
 import os
+import argparse
 from pathlib import Path
 
 # Add current directory to Python path
 sys.path.append(str(Path(__file__).parent))
 
-from ETL.etl import collect_and_process_posts
+from ETL.etl import ATProtoETL, collect_and_process_posts
+from ETL.scheduler import run_daemon
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="AT Proto synoptic chart ETL")
+    parser.add_argument('--offline', action='store_true',
+                        help='Run against local fakes: recorded feeds, DuckDB and a deterministic encoder')
+    parser.add_argument('--offline-dir', default='data/local/offline',
+                        help='Where offline runs write exports and traces (default: data/local/offline)')
+    parser.add_argument('--daemon', action='store_true',
+                        help='Run as a long-lived worker scheduling collection, density and export')
+    parser.add_argument('--stream', action='store_true',
+                        help='Consume the Jetstream event stream instead of polling feeds')
+    parser.add_argument('--replay', metavar='CAPTURE',
+                        help='Replay a recorded Jetstream capture file (implies --stream)')
+    parser.add_argument('--speed', type=float, default=None,
+                        help='Replay pacing relative to recorded event times (default: as fast as possible)')
+    parser.add_argument('--max-events', type=int, default=None, help='Stop the stream after N events')
+    parser.add_argument('--duration', type=float, default=None,
+                        help='Stop the stream (or daemon) after N seconds')
+    parser.add_argument('--profile-imports', action='store_true',
+                        help='Show the slowest imports of a cold start and exit')
+    parser.add_argument('--check-startup', action='store_true',
+                        help='Exit non-zero if cold start exceeds --budget or loads heavy ML/cloud modules')
+    parser.add_argument('--budget', type=float, default=2.0, help='Cold start budget in seconds (default: 2.0)')
+    return parser.parse_args()
+
+
+def report_startup(args):
+    """Handle --profile-imports / --check-startup; returns the exit code"""
+    from ETL.startup import check_startup, profile_imports
+    
+    if args.profile_imports:
+        profile = profile_imports()
+        print(f"Importing main takes {profile['total_ms']:.0f} ms; slowest modules (cumulative):")
+        for row in profile['modules']:
+            print(f"  {row['cumulative_ms']:9.1f} ms  {row['self_ms']:8.1f} ms self  {row['module']}")
+        return 0
+    
+    result = check_startup(args.budget)
+    print(f"Cold start {result['best_seconds']:.3f}s (budget {args.budget:.3f}s, runs {result['runs_seconds']})")
+    if result['heavy_modules_loaded']:
+        print(f"Heavy modules loaded at startup: {', '.join(result['heavy_modules_loaded'])}")
+    print("Startup check passed" if result['ok'] else "Startup check FAILED")
+    return 0 if result['ok'] else 1
+
 
 if __name__ == "__main__":
+    args = parse_args()
+    if args.profile_imports or args.check_startup:
+        sys.exit(report_startup(args))
+    
     print("Starting AT Proto ETL pipeline...")
     
     try:
-        # Run the ETL pipeline
-        result = collect_and_process_posts(None)
+        etl = None
+        if args.offline:
+            from ETL.offline import offline_capture, offline_etl
+            etl = offline_etl(args.offline_dir)
+            if args.stream and not args.replay:
+                args.replay = offline_capture(args.offline_dir)
+        
+        if args.daemon:
+            result = run_daemon(etl=etl, duration=args.duration)
+        elif args.stream or args.replay:
+            result = (etl or ATProtoETL()).run_stream(
+                replay_path=args.replay,
+                max_events=args.max_events,
+                duration=args.duration,
+                speed=args.speed
+            )
+        elif etl is not None:
+            result = etl.run_etl()
+        else:
+            # Run the ETL pipeline
+            result = collect_and_process_posts(None)
         
         print(f"ETL completed: {result}")
         
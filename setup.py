@@ -8,7 +8,7 @@ setup(
     long_description=open("README.md").read() if os.path.exists("README.md") else "",
     long_description_content_type="text/markdown",
     author="Muhammad Muhdhar",
-    packages=find_packages(),
+    packages=find_packages(exclude=["benchmarks", "benchmarks.*", "tests", "tests.*"]),
     install_requires=[
         line.strip()
         for line in open("requirements.txt").readlines()
@@ -0,0 +1,40 @@
+import pyarrow as pa
+
+from ETL.clients.arrow import cast_columns
+
+TYPES = {'count': pa.int64(), 'value': pa.float64()}
+
+
+def test_numeric_strings_cast_at_the_arrow_level():
+    table = pa.table({'count': ['1', '2', None], 'value': ['0.5', '1e3', '-2']})
+
+    casted = cast_columns(table, TYPES)
+
+    assert casted.schema.field('count').type == pa.int64()
+    assert casted.column('count').to_pylist() == [1, 2, None]
+    assert casted.column('value').to_pylist() == [0.5, 1000.0, -2.0]
+
+
+def test_mixed_string_column_is_coerced_like_to_numeric():
+    table = pa.table({'count': ['3', '4.5', '7.0', 'abc', '', None, 'inf'],
+                      'value': ['1.25', 'n/a', '2', None, '3.5', 'x', '0']})
+
+    casted = cast_columns(table, TYPES)
+
+    assert casted.schema.field('count').type == pa.int64()
+    # Non-integral counts round instead of failing the whole query; unparseable ones are null
+    assert casted.column('count').to_pylist() == [3, 4, 7, None, None, None, None]
+    assert casted.column('value').to_pylist() == [1.25, None, 2.0, None, 3.5, None, 0.0]
+
+
+def test_float_column_into_an_integer_type_rounds():
+    table = pa.table({'count': pa.array([1.0, 4.5, 5.6, None], type=pa.float64())})
+
+    assert cast_columns(table, TYPES).column('count').to_pylist() == [1, 4, 6, None]
+
+
+def test_missing_and_matching_columns_are_left_alone():
+    table = pa.table({'value': pa.array([1.0], type=pa.float64()), 'other': ['x']})
+
+    assert cast_columns(table, TYPES).equals(table)
+    assert cast_columns(table, None) is table
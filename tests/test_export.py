@@ -0,0 +1,165 @@
+import gzip
+import json
+import os
+import struct
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from ETL.export import ExportWriter, encode_density_slice, encode_posts_shard, lod_tiers
+
+T0 = pd.Timestamp('2026-01-01 00:00', tz='UTC')
+# Full detail for an hour, then 4-hour buckets at the same resolution
+TIERS = (
+    {'max_age_hours': 1, 'downsample': 1, 'merge_minutes': 0},
+    {'max_age_hours': None, 'downsample': 1, 'merge_minutes': 240},
+)
+
+
+def _stats():
+    return {'changed': False, 'files_written': 0, 'bytes_written': 0, 'files_removed': 0}
+
+
+def _slice(writer, timestamp, peak=1.0, lo=-5.0, hi=5.0, count=20):
+    """Export one Gaussian density slice at `timestamp` and return its manifest entry"""
+    centres = np.linspace(lo, hi, count)
+    x, y = np.meshgrid(centres, centres)
+    rows = pd.DataFrame({'x': x.ravel(), 'y': y.ravel(),
+                         'density': peak * np.exp(-(x ** 2 + y ** 2) / 4).ravel(), 'posts_count': 10})
+    entry, data = encode_density_slice(rows)
+    iso = timestamp.strftime('%Y-%m-%dT%H:%M:%S.%fZ')
+    return {'calculated_at': iso, **entry,
+            'file': writer._write_file('density', iso.replace(':', ''), data, 'bin', _stats())}
+
+
+def test_lod_tiers_fit_the_export_window():
+    assert [tier['max_age_hours'] for tier in lod_tiers(24)] == [6, 16, None]
+    assert [tier['max_age_hours'] for tier in lod_tiers(72)] == [6, 24, None]
+
+
+def test_apply_lod_merges_aged_slices_per_bucket(tmp_path):
+    writer = ExportWriter(str(tmp_path), tiers=TIERS)
+    slices = [_slice(writer, T0 + pd.Timedelta(minutes=30 * i)) for i in range(10)]
+    now = T0 + pd.Timedelta(hours=5, minutes=15)
+
+    kept = writer.apply_lod(slices, now, _stats())
+
+    # Slices from 04:30 on are under an hour old; the rest fill buckets 00:00 and 04:00
+    assert [entry.get('level', 0) for entry in kept] == [1, 1, 0]
+    assert [entry.get('merged', 1) for entry in kept] == [8, 1, 1]
+    assert kept[0]['start'] == slices[0]['calculated_at']
+    assert kept[0]['calculated_at'] == slices[7]['calculated_at']
+    assert kept[-1] is slices[-1]
+
+
+def test_absorbing_slices_one_at_a_time_matches_one_merge(tmp_path):
+    writer = ExportWriter(str(tmp_path), tiers=TIERS)
+    slices = [_slice(writer, T0 + pd.Timedelta(minutes=10 * i), peak=1 + i) for i in range(12)]
+
+    kept = []
+    for entry in slices:
+        kept = writer.apply_lod(kept + [entry], pd.Timestamp(entry['calculated_at']) + pd.Timedelta(hours=2), _stats())
+
+    (merged,) = kept
+    expected = np.mean([writer._read_density(entry) for entry in slices], axis=0)
+    assert merged['merged'] == 12
+    np.testing.assert_allclose(writer._read_density(merged), expected, rtol=1e-6, atol=1e-7)
+
+
+def test_absorbing_a_wider_slice_keeps_the_merged_grid_step(tmp_path):
+    writer = ExportWriter(str(tmp_path), tiers=TIERS)
+    first = _slice(writer, T0, lo=-5.0, hi=5.0, count=11)
+    (merged,) = writer.apply_lod([first], T0 + pd.Timedelta(hours=2), _stats())
+    wider = _slice(writer, T0 + pd.Timedelta(minutes=10), lo=-6.0, hi=6.0, count=13)
+
+    (absorbed,) = writer.apply_lod([merged, wider], T0 + pd.Timedelta(hours=2), _stats())
+
+    assert absorbed['grid']['x'] == {'min': -6.0, 'max': 6.0, 'count': 13}
+    # Both slices sit on the same lattice, so the average is exact
+    expected = (np.pad(writer._read_density(first), 1) + writer._read_density(wider)) / 2
+    np.testing.assert_allclose(writer._read_density(absorbed), expected, rtol=1e-6, atol=1e-7)
+
+
+def test_slices_past_the_last_tier_are_dropped(tmp_path):
+    tiers = ({'max_age_hours': 1, 'downsample': 1, 'merge_minutes': 0},
+             {'max_age_hours': 3, 'downsample': 2, 'merge_minutes': 60})
+    writer = ExportWriter(str(tmp_path), tiers=tiers)
+    slices = [_slice(writer, T0 + pd.Timedelta(hours=i)) for i in range(5)]
+
+    kept = writer.apply_lod(slices, T0 + pd.Timedelta(hours=4, minutes=30), _stats())
+
+    assert [entry.get('start', entry['calculated_at']) for entry in kept] == \
+        [slices[2]['calculated_at'], slices[3]['calculated_at'], slices[4]['calculated_at']]
+    assert kept[0]['grid']['x']['count'] == 10
+
+
+@pytest.mark.parametrize('subdir', ['density', 'posts'])
+def test_collect_garbage_removes_unreferenced_files(tmp_path, subdir):
+    writer = ExportWriter(str(tmp_path))
+    for name in ('kept.bin', 'stale.bin', 'kept.text.json.gz'):
+        os.makedirs(tmp_path / subdir, exist_ok=True)
+        (tmp_path / subdir / name).write_bytes(b'x')
+    (tmp_path / 'topic_clusters.json').write_text('{}')
+    manifest = writer.load_manifest()
+    if subdir == 'density':
+        manifest['density']['slices'] = [{'file': 'density/kept.bin'}]
+        referenced = ['kept.bin']
+    else:
+        manifest['posts'] = [{'file': 'posts/kept.bin', 'text': 'posts/kept.text.json.gz'}]
+        referenced = ['kept.bin', 'kept.text.json.gz']
+
+    removed = writer.collect_garbage(manifest)
+
+    assert removed == 3 - len(referenced)
+    assert sorted(os.listdir(tmp_path / subdir)) == sorted(referenced)
+    assert (tmp_path / 'topic_clusters.json').exists()
+
+
+def _read_posts_shard(columns_gz, text_gz):
+    data = gzip.decompress(columns_gz)
+    (header_length,) = struct.unpack('<I', data[:4])
+    # Typed arrays need their offsets 4-byte aligned
+    assert header_length % 4 == 0
+    header = json.loads(data[4:4 + header_length])
+    body = data[4 + header_length:]
+    columns = {column['name']: np.frombuffer(body, dtype='<f4' if column['dtype'] == 'float32' else '<u4',
+                                             count=header['count'], offset=column['offset'])
+               for column in header['columns']}
+    return header, columns, json.loads(gzip.decompress(text_gz))
+
+
+def test_encode_posts_shard_round_trips_in_created_order():
+    posts = pd.DataFrame({
+        'uri': ['at://did:b/app.bsky.feed.post/2', 'at://did:a/app.bsky.feed.post/1',
+                'at://did:a/app.bsky.feed.post/3'],
+        'author': ['bob', 'alice', None],
+        'text': ['second', 'first', None],
+        'UMAP1': [0.5, -1.25, 2.0],
+        'UMAP2': [1.0, 0.25, -3.5],
+        'created_at': ['2026-01-01T00:20:00Z', '2026-01-01T00:10:00Z', '2026-01-01T00:30:00Z'],
+        'like_count': [3, 1, None],
+        'reply_count': [0, 2, 1],
+        'repost_count': [1, None, 0],
+    })
+
+    columns_gz, text_gz = encode_posts_shard(posts)
+    header, columns, texts = _read_posts_shard(columns_gz, text_gz)
+
+    assert header['count'] == 3
+    assert texts == ['first', 'second', '']
+    uris = [header['uri_prefixes'][prefix] + rkey for prefix, rkey in zip(columns['uri_prefix'], header['rkeys'])]
+    assert uris == [posts['uri'][1], posts['uri'][0], posts['uri'][2]]
+    assert [header['authors'][code] for code in columns['author']] == ['alice', 'bob', '']
+    assert columns['UMAP1'].tolist() == [-1.25, 0.5, 2.0]
+    assert columns['like_count'].tolist() == [1, 3, 0]
+    assert columns['created_at'].tolist() == [
+        int(pd.Timestamp(ts).timestamp()) for ts in ('2026-01-01T00:10Z', '2026-01-01T00:20Z', '2026-01-01T00:30Z')]
+
+
+def test_encode_posts_shard_is_deterministic():
+    posts = pd.DataFrame({'uri': ['at://did:a/p/1'], 'author': ['a'], 'text': ['t'], 'UMAP1': [0.0],
+                          'UMAP2': [0.0], 'created_at': ['2026-01-01T00:00:00Z'],
+                          'like_count': [0], 'reply_count': [0], 'repost_count': [0]})
+
+    assert encode_posts_shard(posts) == encode_posts_shard(posts.copy())
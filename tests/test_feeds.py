@@ -0,0 +1,15 @@
+from ETL.offline import offline_etl
+
+CUSTOM_FEED = 'at://did:plc:example/app.bsky.feed.generator/custom'
+
+
+def test_walked_feeds_keep_their_source_tag(tmp_path):
+    client = offline_etl(str(tmp_path)).bluesky_client
+
+    hot_classic = client.fetch_feeds(['hot_classic'], pages=2)
+    streamed = [post for page in client.iter_feed_pages(['hot_classic'], pages=2) for post in page]
+    custom = client.fetch_feeds([CUSTOM_FEED])
+
+    assert {post.source for post in hot_classic + streamed} == {'hot_classic_feed'}
+    assert {post.feed_uri for post in hot_classic + streamed} == {None}
+    assert {(post.source, post.feed_uri) for post in custom} == {('custom_feed', CUSTOM_FEED)}
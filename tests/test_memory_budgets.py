@@ -0,0 +1,10 @@
+from benchmarks.memory import check, load_budgets, profile
+
+
+def test_stages_stay_within_memory_budgets(tmp_path):
+    budgets = load_budgets()
+
+    report = profile(budgets.get('posts', 5000), directory=str(tmp_path))
+
+    assert set(budgets['stages']) <= set(report['stages'])
+    assert check(report, budgets) == []
@@ -0,0 +1,107 @@
+from contextlib import contextmanager
+from types import SimpleNamespace
+
+import pandas as pd
+import pytest
+
+from ETL.clients.bigQuery import Client, merge_query
+from ETL.storage.local import DuckDBStorage
+
+COUNTS = ['like_count', 'reply_count', 'repost_count']
+
+
+def test_merge_query_casts_to_target_types():
+    query = merge_query(
+        'p.d.posts', 'p.d.posts_staging', 'uri', COUNTS,
+        {'uri': 'STRING', 'like_count': 'STRING', 'reply_count': 'INTEGER', 'repost_count': 'INT64'}
+    )
+
+    assert 'MERGE `p.d.posts` T' in query
+    assert 'USING `p.d.posts_staging` S' in query
+    assert 'ON T.uri = S.uri' in query
+    assert 'like_count = COALESCE(SAFE_CAST(S.like_count AS STRING), T.like_count)' in query
+    # Legacy schema names are spelled the standard SQL way
+    assert 'reply_count = COALESCE(SAFE_CAST(S.reply_count AS INT64), T.reply_count)' in query
+    assert 'repost_count = COALESCE(SAFE_CAST(S.repost_count AS INT64), T.repost_count)' in query
+
+
+class _FakeBigQuery:
+    """Records the queries and table drops a merge_update issues"""
+
+    def __init__(self, schema, fail_query=False):
+        self.schema = schema
+        self.fail_query = fail_query
+        self.queries = []
+        self.dropped = []
+
+    def get_table(self, table):
+        return SimpleNamespace(schema=[SimpleNamespace(name=name, field_type=field_type)
+                                       for name, field_type in self.schema.items()])
+
+    def delete_table(self, table, not_found_ok=False):
+        self.dropped.append(table)
+
+
+def _client(fake):
+    client = Client.__new__(Client)
+    client.project_id = 'p'
+    client.client = fake
+    client.job_timeout_ms = None
+    client.logger = SimpleNamespace(info=lambda *a: None, warning=lambda *a: None)
+    client.staged = []
+    client.get_healthy_client = lambda: fake
+    client.replace = lambda df, dataset_id, table_id: client.staged.append((table_id, df))
+
+    @contextmanager
+    def managed_query_job(query, job_config=None, query_name=None):
+        fake.queries.append(query)
+        if fake.fail_query:
+            raise RuntimeError('query failed')
+        yield SimpleNamespace(result=lambda timeout=None: None, num_dml_affected_rows=2)
+
+    client._managed_query_job = managed_query_job
+    return client
+
+
+def _engagement():
+    return pd.DataFrame({'uri': ['a', 'b'], 'like_count': [3, 4],
+                         'reply_count': [0, 1], 'repost_count': [1, None]}).astype(
+        {col: 'Int64' for col in COUNTS})
+
+
+def test_merge_update_against_string_counts_drops_staging():
+    fake = _FakeBigQuery({'uri': 'STRING', **{col: 'STRING' for col in COUNTS}})
+    client = _client(fake)
+
+    updated = client.merge_update(_engagement(), 'd', 'posts', 'uri', COUNTS)
+
+    assert updated == 2
+    assert client.staged[0][0] == 'posts_staging'
+    assert 'SAFE_CAST(S.like_count AS STRING)' in fake.queries[0]
+    assert 'INT64' not in fake.queries[0]
+    assert fake.dropped == ['p.d.posts_staging']
+
+
+def test_merge_update_drops_staging_when_merge_fails():
+    fake = _FakeBigQuery({'uri': 'STRING', **{col: 'INTEGER' for col in COUNTS}}, fail_query=True)
+
+    with pytest.raises(RuntimeError):
+        _client(fake).merge_update(_engagement(), 'd', 'posts', 'uri', COUNTS)
+
+    assert fake.dropped == ['p.d.posts_staging']
+
+
+def test_update_counts_keeps_string_typed_target():
+    storage = DuckDBStorage(':memory:')
+    storage.append(pd.DataFrame({'uri': ['a', 'b', 'c'], 'like_count': ['1', '2', '3'],
+                                 'reply_count': ['0', '0', '0'], 'repost_count': ['5', '5', '5']}),
+                   'posts')
+
+    updated = storage.update_counts(_engagement(), 'posts', key='uri', columns=COUNTS)
+
+    rows = storage._query_arrow('SELECT * FROM posts ORDER BY uri').to_pylist()
+    assert updated == 2
+    assert rows[0] == {'uri': 'a', 'like_count': '3', 'reply_count': '0', 'repost_count': '1'}
+    # Null staged counts keep the stored value; unmatched rows are untouched
+    assert rows[1] == {'uri': 'b', 'like_count': '4', 'reply_count': '1', 'repost_count': '5'}
+    assert rows[2] == {'uri': 'c', 'like_count': '3', 'reply_count': '0', 'repost_count': '5'}
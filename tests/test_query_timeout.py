@@ -0,0 +1,54 @@
+import time
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from types import SimpleNamespace
+
+import pytest
+
+from ETL.clients.bigQuery import Client
+from ETL.offline import offline_etl
+from ETL.storage.local import DuckDBStorage
+
+
+def test_duckdb_interrupts_a_query_past_the_timeout():
+    storage = DuckDBStorage(':memory:')
+    storage.set_query_timeout(0.2)
+
+    started = time.monotonic()
+    with pytest.raises(TimeoutError):
+        storage._query_arrow('SELECT COUNT(*) FROM range(100000000000) a')
+    assert time.monotonic() - started < 5
+
+    # The connection is still usable afterwards
+    assert storage._query_arrow('SELECT 1 AS one').column('one').to_pylist() == [1]
+
+
+def test_bigquery_wait_bounds_the_job_result():
+    client = Client.__new__(Client)
+    client.job_timeout_ms = 1500
+    waited = []
+
+    def result(timeout=None):
+        waited.append(timeout)
+        raise FutureTimeoutError()
+
+    with pytest.raises(TimeoutError):
+        client._wait(SimpleNamespace(job_id='job-1', result=result))
+    assert waited == [1.5]
+
+
+def test_a_timed_out_stage_is_skipped_not_the_run(tmp_path):
+    etl = offline_etl(str(tmp_path))
+    read_window = etl.storage.read_window
+
+    def slow_density_source(*args, **kwargs):
+        if kwargs.get('query_name') == 'density_source_posts':
+            raise TimeoutError("DuckDB query timed out after 0.1s")
+        return read_window(*args, **kwargs)
+
+    etl.storage.read_window = slow_density_source
+    result = etl.run_etl()
+
+    assert result['status'] == 'success'
+    assert result['posts_new'] > 0
+    assert result['density_calculated'] is False
+    assert result['data_exported'] is True
@@ -0,0 +1,53 @@
+from ETL.storage.seen import SeenIndex
+
+
+def test_partition_splits_new_and_repeat_posts(tmp_path):
+    index = SeenIndex(str(tmp_path / 'seen.bin'))
+    index.add(['at://a', 'at://b'])
+
+    new_posts, repeats = index.partition([{'uri': 'at://a'}, {'uri': 'at://c'}, {'uri': 'at://c'}])
+
+    assert [post['uri'] for post in new_posts] == ['at://c']
+    # A URI repeated within the batch is only new once
+    assert [post['uri'] for post in repeats] == ['at://a', 'at://c']
+
+
+def test_evicted_uris_stay_seen_through_the_bloom_filter(tmp_path):
+    index = SeenIndex(str(tmp_path / 'seen.bin'), lru_size=2)
+    index.add(['at://a', 'at://b', 'at://c'])
+
+    assert len(index) == 2
+    assert 'at://a' not in index.recent
+    assert 'at://a' in index
+    assert 'at://z' not in index
+
+
+def test_bloom_filter_rebuilds_from_recent_uris_at_capacity(tmp_path):
+    index = SeenIndex(str(tmp_path / 'seen.bin'), capacity=4, lru_size=2)
+    index.add([f'at://{i}' for i in range(5)])
+
+    assert index.bloom.count <= 4
+    assert 'at://3' in index and 'at://4' in index
+
+
+def test_save_and_load_round_trip(tmp_path):
+    path = str(tmp_path / 'seen.bin')
+    index = SeenIndex(path, capacity=1000, lru_size=10)
+    index.add([f'at://{i}' for i in range(20)])
+    index.record_encode_time(2.0, 100)
+    index.save()
+
+    loaded = SeenIndex(path)
+    assert loaded.load()
+    assert (loaded.capacity, loaded.lru_size) == (1000, 10)
+    assert list(loaded.recent) == list(index.recent)
+    assert loaded.encode_seconds_per_post == 0.02
+    assert all(f'at://{i}' in loaded for i in range(20))
+
+
+def test_load_reports_missing_or_corrupt_file(tmp_path):
+    path = tmp_path / 'seen.bin'
+    assert not SeenIndex(str(path)).load()
+
+    path.write_bytes(b'\x00\x00')
+    assert not SeenIndex(str(path)).load()
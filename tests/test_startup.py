@@ -0,0 +1,13 @@
+from ETL.startup import check_startup, loaded_heavy_modules
+
+STARTUP_BUDGET_SECONDS = 2.0
+
+
+def test_main_imports_no_heavy_modules():
+    assert loaded_heavy_modules('main') == []
+
+
+def test_cold_start_within_budget():
+    result = check_startup(STARTUP_BUDGET_SECONDS)
+
+    assert result['ok'], result
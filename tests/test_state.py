@@ -0,0 +1,102 @@
+from contextlib import contextmanager
+from types import SimpleNamespace
+
+import pandas as pd
+
+from ETL.clients.bigQuery import Client
+from ETL.storage.local import DuckDBStorage
+from ETL.storage.state import LAST_EXPORT, StateStore, watermark_key
+
+T0 = pd.Timestamp('2026-01-01 12:00', tz='UTC')
+
+
+def test_watermarks_only_move_forward():
+    state = StateStore(DuckDBStorage(':memory:'), 'state')
+    assert state.watermark('density') is None
+
+    state.advance_watermark('density', T0)
+    state.advance_watermark('density', T0 - pd.Timedelta(hours=1))
+    state.advance_watermark('density', None)
+    assert state.watermark('density') == T0
+
+    state.advance_watermark('density', T0 + pd.Timedelta(hours=1))
+    assert state.watermark('density') == T0 + pd.Timedelta(hours=1)
+
+
+def test_flush_round_trips_through_storage():
+    storage = DuckDBStorage(':memory:')
+    state = StateStore(storage, 'state')
+    state.advance_watermark('collect', T0)
+    state.set(LAST_EXPORT, T0, value='abc')
+    state.flush()
+
+    reloaded = StateStore(storage, 'state')
+    reloaded.load()
+    assert reloaded.watermark('collect') == T0
+    assert reloaded.get_timestamp(LAST_EXPORT) == T0
+    assert reloaded.get_value(LAST_EXPORT) == 'abc'
+
+
+class _RecordingStorage:
+    def __init__(self):
+        self.writes = []
+
+    def read_state(self, table_id):
+        return {}
+
+    def write_state(self, table_id, entries):
+        self.writes.append(dict(entries))
+
+
+def test_flush_writes_only_changed_keys_in_one_call():
+    storage = _RecordingStorage()
+    state = StateStore(storage, 'state')
+    state.advance_watermark('collect', T0)
+    state.advance_watermark('density', T0)
+    state.flush()
+    state.flush()
+    state.advance_watermark('density', T0 + pd.Timedelta(hours=1))
+    state.flush()
+
+    assert [sorted(write) for write in storage.writes] == [
+        [watermark_key('collect'), watermark_key('density')],
+        [watermark_key('density')]
+    ]
+
+
+def test_unflushed_changes_survive_a_forced_load():
+    storage = DuckDBStorage(':memory:')
+    state = StateStore(storage, 'state')
+    state.advance_watermark('collect', T0)
+    state.load(force=True)
+
+    assert state.watermark('collect') == T0
+
+
+def test_bigquery_state_write_is_one_merge():
+    queries = []
+    client = Client.__new__(Client)
+    client.project_id = 'p'
+    client.job_timeout_ms = None
+    client.logger = SimpleNamespace(info=lambda *a: None)
+
+    @contextmanager
+    def managed_query_job(query, job_config=None, query_name=None):
+        queries.append((query, job_config, query_name))
+        yield SimpleNamespace(result=lambda timeout=None: None, num_dml_affected_rows=3)
+
+    client._managed_query_job = managed_query_job
+    entries = {watermark_key(stage): {'timestamp': T0, 'value': None}
+               for stage in ('collect', 'density')}
+    entries[LAST_EXPORT] = {'timestamp': T0, 'value': 'abc'}
+
+    assert client.upsert_state('d', 'state', entries) == 3
+
+    assert len(queries) == 1
+    query, job_config, query_name = queries[0]
+    assert query_name == 'state_write'
+    assert 'USING (SELECT * FROM UNNEST(@entries)) S' in query
+    assert 'WHEN NOT MATCHED THEN' in query
+    (parameter,) = job_config.query_parameters
+    assert [struct.to_api_repr()['parameterValue']['structValues']['key']['value']
+            for struct in parameter.values] == list(entries)
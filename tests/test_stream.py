@@ -0,0 +1,25 @@
+from ETL.offline import offline_capture, offline_etl
+from ETL.storage.state import LAST_STREAM_CURSOR
+
+
+def test_a_failed_stream_batch_is_retried_before_the_cursor_moves(tmp_path):
+    capture = offline_capture(str(tmp_path), events=300)
+    etl = offline_etl(str(tmp_path))
+    etl.stream_batch_size = 50
+    append = etl.storage.append
+
+    def flaky_append(dataframe, table_id, **kwargs):
+        if table_id == etl.posts_table and not flaky_append.failed:
+            flaky_append.failed = True
+            raise ConnectionError("storage unavailable")
+        return append(dataframe, table_id, **kwargs)
+
+    flaky_append.failed = False
+    etl.storage.append = flaky_append
+    result = etl.run_stream(replay_path=capture)
+
+    assert result['status'] == 'success'
+    assert etl.stream_pending == []
+    loaded = etl.storage._connection.execute(f"SELECT COUNT(*) FROM {etl.posts_table}").fetchone()[0]
+    assert loaded == result['stream']['posts_loaded']
+    assert etl.state.get_value(LAST_STREAM_CURSOR) == str(result['stream']['cursor'])
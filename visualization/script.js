@@ -10,6 +10,7 @@ let timeSlices = [];
 let currentTimeIndex = 0;
 let isPlaying = false;
 let playInterval;
+let hoveredPost = null;
 
 // Tooltip
 const tooltip = d3.select(".tooltip");
@@ -27,12 +28,80 @@ const zoomOutButton = d3.select("#zoom-out");
 // Color scale
 const colorScale = d3.scaleSequential(d3.interpolateBlues).domain([0, 1]);
 
+// Fetch a gzipped export file and decompress it in the browser
+function gunzip(url) {
+    return fetch(url).then(response => {
+        if (!response.ok) throw new Error(`${response.status} ${response.statusText}: ${url}`);
+        return new Response(response.body.pipeThrough(new DecompressionStream("gzip"))).arrayBuffer();
+    });
+}
+
+// Posts shard: uint32 header length, JSON header (dictionaries and column offsets),
+// then little-endian Float32/Uint32 columns. Text stays in the shard's text file
+function decodePostsShard(buffer, textUrl) {
+    const headerLength = new DataView(buffer).getUint32(0, true);
+    const header = JSON.parse(new TextDecoder().decode(new Uint8Array(buffer, 4, headerLength)));
+    const columns = {};
+    header.columns.forEach(column => {
+        const ArrayType = column.dtype === "float32" ? Float32Array : Uint32Array;
+        columns[column.name] = new ArrayType(buffer, 4 + headerLength + column.offset, header.count);
+    });
+    
+    return Array.from({ length: header.count }, (_, i) => ({
+        uri: header.uri_prefixes[columns.uri_prefix[i]] + header.rkeys[i],
+        author: header.authors[columns.author[i]],
+        UMAP1: columns.UMAP1[i],
+        UMAP2: columns.UMAP2[i],
+        created_at: columns.created_at[i] * 1000,
+        like_count: columns.like_count[i],
+        reply_count: columns.reply_count[i],
+        repost_count: columns.repost_count[i],
+        textUrl: textUrl,
+        textIndex: i
+    }));
+}
+
+// Post text is fetched per shard the first time one of its posts is shown
+const textShards = new Map();
+function postText(post) {
+    if (!textShards.has(post.textUrl)) {
+        textShards.set(post.textUrl, gunzip(post.textUrl).then(buffer => JSON.parse(new TextDecoder().decode(buffer))));
+    }
+    return textShards.get(post.textUrl).then(texts => texts[post.textIndex]);
+}
+
+// Export: a manifest listing one immutable file per density slice (quantized
+// uint16 array, or float32 for merged slices, little-endian like every browser)
+// and per hour of posts
+function loadExport(url) {
+    return d3.json(url).then(manifest => {
+        const base = new URL(url, document.baseURI);
+        const fileUrl = file => new URL(file, base).href;
+        
+        // Older slices may be downsampled and merged: `start` is then their oldest slice
+        const density = Promise.all(manifest.density.slices.map(slice =>
+            d3.buffer(fileUrl(slice.file)).then(buffer => ({
+                calculated_at: slice.calculated_at,
+                start: slice.start || slice.calculated_at,
+                posts_count: slice.posts_count,
+                grid: slice.grid,
+                scale: slice.scale,
+                values: slice.dtype === "float32" ? new Float32Array(buffer) : new Uint16Array(buffer)
+            }))
+        ));
+        const posts = Promise.all(manifest.posts.map(shard =>
+            gunzip(fileUrl(shard.file)).then(buffer => decodePostsShard(buffer, fileUrl(shard.text)))
+        )).then(shards => shards.flat());
+        
+        return Promise.all([density, posts]);
+    });
+}
+
 // Load data and initialize visualization
 Promise.all([
-    d3.json("../data/density_data.json"),
-    d3.json("../data/posts.json"),
+    loadExport("../data/manifest.json"),
     d3.json("../data/topic_clusters.json")
-]).then(([density, posts, clusters]) => {
+]).then(([[density, posts], clusters]) => {
     densityData = density;
     postsData = posts;
     topicClusters = clusters;
@@ -44,10 +113,10 @@ Promise.all([
         !isNaN(post.UMAP1) && !isNaN(post.UMAP2)
     );
     
-    console.log(`Loaded ${densityData.length} density points and ${postsWithCoords.length} posts with coordinates`);
+    console.log(`Loaded ${d3.sum(densityData, d => d.values.length)} density points and ${postsWithCoords.length} posts with coordinates`);
     
-    // Group density data by time
-    dataByTime = d3.group(densityData, d => d.calculated_at);
+    // Index density slices by time
+    dataByTime = new Map(densityData.map(d => [d.calculated_at, d]));
     timeSlices = Array.from(dataByTime.keys()).sort();
     
     console.log(`Found ${timeSlices.length} time slices`);
@@ -93,8 +162,8 @@ function initializeVisualization() {
     g = svg.append("g");
     
     // Set up scales
-    const allX = densityData.map(d => d.x).concat(postsWithCoords.map(d => d.UMAP1));
-    const allY = densityData.map(d => d.y).concat(postsWithCoords.map(d => d.UMAP2));
+    const allX = densityData.flatMap(d => [d.grid.x.min, d.grid.x.max]).concat(postsWithCoords.map(d => d.UMAP1));
+    const allY = densityData.flatMap(d => [d.grid.y.min, d.grid.y.max]).concat(postsWithCoords.map(d => d.UMAP2));
     
     const margin = { top: 50, right: 50, bottom: 100, left: 100 };
     const plotSize = Math.min(width - margin.left - margin.right, height - margin.top - margin.bottom) * 0.8;
@@ -178,12 +247,13 @@ function handleZoom(event) {
 
 function getPostsForTimeSlice(targetTimestamp) {
     const targetTime = new Date(targetTimestamp);
+    const startTime = new Date(dataByTime.get(targetTimestamp).start);
     const thirtyMinutesMs = 30 * 60 * 1000; // 30 minutes in milliseconds
     
+    // Posts from 30 minutes before the slice (or before the oldest slice merged into it)
     const filteredPosts = postsWithCoords.filter(post => {
         const postTime = new Date(post.created_at);
-        const timeDiff = targetTime - postTime;
-        return timeDiff >= 0 && timeDiff <= thirtyMinutesMs;
+        return postTime <= targetTime && startTime - postTime <= thirtyMinutesMs;
     });
     
     console.log(`Time slice ${targetTimestamp}: Found ${filteredPosts.length} posts in 30-minute window`);
@@ -198,24 +268,39 @@ function updateVisualization() {
     const currentPosts = getPostsForTimeSlice(currentTime);
     
     // Update time display
-    timeDisplay.text(new Date(currentTime).toLocaleString());
+    timeDisplay.text(currentData.start !== currentTime
+        ? `${new Date(currentData.start).toLocaleString()} – ${new Date(currentTime).toLocaleString()}`
+        : new Date(currentTime).toLocaleString());
     
     // Create a proper density grid from the data
     const gridSize = 70;
     const densityGrid = new Array(gridSize * gridSize).fill(0);
     
     // Find density range for color scaling
-    const densityExtent = d3.extent(currentData, d => d.density);
+    const { grid, values, scale } = currentData;
+    const densityExtent = d3.extent(values).map(q => q * scale);
     const densityScale = d3.scaleLinear().domain(densityExtent).range([0, 1]);
     
-    currentData.forEach(d => {
-        const x = Math.floor((d.x - xScale.domain()[0]) / (xScale.domain()[1] - xScale.domain()[0]) * (gridSize - 1));
-        const y = Math.floor((d.y - yScale.domain()[0]) / (yScale.domain()[1] - yScale.domain()[0]) * (gridSize - 1));
+    // Cell centres are evenly spaced along each axis; values are row-major (y, x)
+    const nx = grid.x.count;
+    const ny = grid.y.count;
+    const stepX = nx > 1 ? (grid.x.max - grid.x.min) / (nx - 1) : 0;
+    const stepY = ny > 1 ? (grid.y.max - grid.y.min) / (ny - 1) : 0;
+    
+    for (let row = 0; row < ny; row++) {
+        const cellY = grid.y.min + row * stepY;
+        const y = Math.floor((cellY - yScale.domain()[0]) / (yScale.domain()[1] - yScale.domain()[0]) * (gridSize - 1));
+        if (y < 0 || y >= gridSize) continue;
         
-        if (x >= 0 && x < gridSize && y >= 0 && y < gridSize) {
-            densityGrid[y * gridSize + x] = Math.max(densityGrid[y * gridSize + x], d.density);
+        for (let col = 0; col < nx; col++) {
+            const cellX = grid.x.min + col * stepX;
+            const x = Math.floor((cellX - xScale.domain()[0]) / (xScale.domain()[1] - xScale.domain()[0]) * (gridSize - 1));
+            
+            if (x >= 0 && x < gridSize) {
+                densityGrid[y * gridSize + x] = Math.max(densityGrid[y * gridSize + x], values[row * nx + col] * scale);
+            }
         }
-    });
+    }
     
     // Generate contours
     const contours = d3.contours()
@@ -264,6 +349,7 @@ function updateVisualization() {
         .attr("cx", d => xScale(d.UMAP1))
         .attr("cy", d => yScale(d.UMAP2))
         .on("mouseover", function(event, d) {
+            hoveredPost = d;
             tooltip.transition()
                 .duration(200)
                 .style("opacity", .9);
@@ -272,14 +358,19 @@ function updateVisualization() {
                     <strong>@${d.author}</strong>
                     <span class="post-time">${new Date(d.created_at).toLocaleString()}</span>
                 </div>
-                <div class="post-content">
-                    ${d.text.substring(0, 200)}${d.text.length > 200 ? '...' : ''}
-                </div>
+                <div class="post-content">...</div>
             `)
                 .style("left", (event.pageX + 10) + "px")
                 .style("top", (event.pageY - 28) + "px");
+            
+            postText(d).then(text => {
+                if (hoveredPost !== d) return;
+                tooltip.select(".post-content")
+                    .text(`${text.substring(0, 200)}${text.length > 200 ? '...' : ''}`);
+            });
         })
         .on("mouseout", function() {
+            hoveredPost = null;
             tooltip.transition()
                 .duration(500)
                 .style("opacity", 0);